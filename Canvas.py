@@ -1,9 +1,13 @@
 from enum import IntEnum
 from copy import deepcopy
 import itertools
+import json
+
+import numpy as np
 
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtCore import QPoint
+from PyQt5.QtCore import QSize
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainter
 from PyQt5.QtGui import QPen
@@ -12,9 +16,13 @@ from PyQt5.QtWidgets import QFileDialog
 from PyQt5.QtWidgets import QLabel
 
 from GraphClass import Graph
+from GraphClass import LayerIndex
 from GraphClass import Line
 from GraphClass import Node
 from GraphClass import Path
+from History import History
+from ResultCache import ResultCache
+from Targets import TargetPaths
 from base64 import b64decode, b64encode
 
 
@@ -45,6 +53,10 @@ class Canvas(QLabel):
     message = pyqtSignal(str)
     main_mode_change = pyqtSignal()
     sub_mode_change = pyqtSignal(SubMode)
+    history_change = pyqtSignal(int, int)
+    # model units per pixel of the initial size, the window can be
+    # enlarged that much before two pixels fall on one model point
+    MODEL_RESOLUTION = 16
 
     def __init__(self, width, height):
         """
@@ -65,6 +77,14 @@ class Canvas(QLabel):
         self.width_ = width
         self.height_ = height
 
+        # Nodes keep their coordinates in the model space of the initial
+        # size on a grid MODEL_RESOLUTION times finer than the pixels,
+        # the view transform maps them to the current size.
+        self.model_width_ = width * self.MODEL_RESOLUTION
+        self.model_height_ = height * self.MODEL_RESOLUTION
+        self.scale_x_ = 1.0 / self.MODEL_RESOLUTION
+        self.scale_y_ = 1.0 / self.MODEL_RESOLUTION
+
         self.setAlignment(Qt.AlignCenter)
         whiteboard = QPixmap(self.width_, self.height_)
         whiteboard.fill(Qt.white)
@@ -82,17 +102,12 @@ class Canvas(QLabel):
         self.third_point = None
         self.showing_layer = False
 
-        self.last_graphs = []
-        self.next_graphs = []
-
-        self.last_main_mode = []
-        self.next_main_mode = []
-
-        self.last_sub_mode = []
-        self.next_sub_mode = []
+        self.history = History()
+        self.results = ResultCache()
 
         self.graph = Path(Nodes=[])
-        self.layers = []
+        self.layers = LayerIndex()
+        self.targets = None
 
         self.bad_node = []
         self.bad_edge = []
@@ -122,12 +137,62 @@ class Canvas(QLabel):
         Parameters:
         -----------
         x: int
-            x coordinate
+            x coordinate on the screen
+        y: int
+            y coordinate on the screen
+        """
+        self.x_, self.y_ = self.to_model(x, y)
+
+    def to_view(self, coord):
+        """
+        Map a coordinate of the model to the screen.
+
+        Parameters:
+        -----------
+        coord: tuple[int]
+            coordinate of a Node
+
+        Returns
+        -------
+        QPoint
+            the point on the screen
+        """
+        return QPoint(round(coord[0] * self.scale_x_),
+                      round(coord[1] * self.scale_y_))
+
+    def to_model(self, x, y):
+        """
+        Map a point on the screen to a coordinate of the model.
+
+        Parameters:
+        -----------
+        x: int
+            x coordinate on the screen
         y: int
-            y coordinate
+            y coordinate on the screen
+
+        Returns
+        -------
+        tuple[int]
+            coordinate in the model
+        """
+        return (round(x / self.scale_x_), round(y / self.scale_y_))
+
+    def hit_radius(self, radius):
         """
-        self.x_ = x
-        self.y_ = y
+        Convert a distance on the screen into the model.
+
+        Parameters:
+        -----------
+        radius: int
+            distance in pixels
+
+        Returns
+        -------
+        float
+            distance in the model
+        """
+        return radius / min(self.scale_x_, self.scale_y_)
 
     def setSubMode(self, mode=None):
         """
@@ -180,49 +245,43 @@ class Canvas(QLabel):
         point: tuple[int]
             the coordinate where the circle is drawn
         """
+        if (any(node.get_coord() == tuple(point)
+                for node in self.graph.getNodes())):
+            self.message.emit("There is a Node at this point already.")
+            return
         if (self.main_mode_ == MainMode.EDIT_MODE):
-            self.last_graphs.append(deepcopy(self.graph))
-            self.last_main_mode.append(self.main_mode_)
-            self.last_sub_mode.append(self.sub_mode_)
-            self.next_graphs.clear()
+            self.begin_step()
             self.layers.clear()
             pen.setColor(Qt.black)
             painter.setPen(pen)
-            painter.drawEllipse(QPoint(point[0], point[1]), 7, 7)
+            painter.drawEllipse(self.to_view(point), 7, 7)
             node = Node(str(self.i_), (point[0], point[1]))
             if (len(self.graph.getNodes()) > 0):
                 last_end = self.graph.getEnd()
                 self.graph.expandPath(node)
                 end = self.graph.getEnd()
                 painter.drawLine(
-                    last_end.get_coord()[0],
-                    last_end.get_coord()[1],
-                    end.get_coord()[0],
-                    end.get_coord()[1])
+                    self.to_view(last_end.get_coord()),
+                    self.to_view(end.get_coord()))
             else:
                 self.graph.expandPath(node)
             self.inc()
             self.message.emit("Added: " + str(node))
         else:
             if (not self.graph.crosses() and self.graph.is_spanning_path()):
-                self.last_graphs.append(deepcopy(self.graph))
-                self.last_main_mode.append(self.main_mode_)
-                self.last_sub_mode.append(self.sub_mode_)
-                self.next_graphs.clear()
+                self.begin_step()
                 self.layers.clear()
                 pen.setColor(Qt.black)
                 painter.setPen(pen)
-                painter.drawEllipse(QPoint(point[0], point[1]), 7, 7)
+                painter.drawEllipse(self.to_view(point), 7, 7)
                 node = Node(str(self.i_), (point[0], point[1]))
                 if (len(self.graph.getNodes()) > 0):
                     last_end = self.graph.getEnd()
                     self.graph.expandPath(node)
                     end = self.graph.getEnd()
                     painter.drawLine(
-                        last_end.get_coord()[0],
-                        last_end.get_coord()[1],
-                        end.get_coord()[0],
-                        end.get_coord()[1])
+                        self.to_view(last_end.get_coord()),
+                        self.to_view(end.get_coord()))
                 else:
                     self.graph.expandPath(node)
                 self.inc()
@@ -252,39 +311,29 @@ class Canvas(QLabel):
             second Node
         """
         if (self.main_mode_ == MainMode.EDIT_MODE):
-            self.last_graphs.append(deepcopy(self.graph))
-            self.last_main_mode.append(self.main_mode_)
-            self.last_sub_mode.append(self.sub_mode_)
-            self.next_graphs.clear()
+            self.begin_step()
             pen.setColor(Qt.black)
             pen.setWidth(1)
             painter.setPen(pen)
             if (not self.graph.is_connected(node1, node2)):
                 self.graph.connect(node1, node2)
             painter.drawLine(
-                node1.get_coord()[0],
-                node1.get_coord()[1],
-                node2.get_coord()[0],
-                node2.get_coord()[1])
+                self.to_view(node1.get_coord()),
+                self.to_view(node2.get_coord()))
             self.edge_diff = len(self.graph._Lines) + \
                 1 - len(self.graph._Nodes)
             self.message.emit(
                 "Connected: {" + str(node1) + ", " + str(node2) + "}")
         else:
             if (self.edge_diff < 1):
-                self.last_graphs.append(deepcopy(self.graph))
-                self.last_main_mode.append(self.main_mode_)
-                self.last_sub_mode.append(self.sub_mode_)
-                self.next_graphs.clear()
+                self.begin_step()
                 pen.setColor(Qt.black)
                 painter.setPen(pen)
                 if (not self.graph.is_connected(node1, node2)):
                     self.graph.connect(node1, node2)
                 painter.drawLine(
-                    node1.get_coord()[0],
-                    node1.get_coord()[1],
-                    node2.get_coord()[0],
-                    node2.get_coord()[1])
+                    self.to_view(node1.get_coord()),
+                    self.to_view(node2.get_coord()))
                 self.edge_diff = len(self.graph._Lines) + \
                     1 - len(self.graph._Nodes)
                 self.message.emit(
@@ -313,31 +362,22 @@ class Canvas(QLabel):
             second Node
         """
         if (self.main_mode_ == MainMode.EDIT_MODE):
-            self.last_graphs.append(deepcopy(self.graph))
-            self.last_main_mode.append(self.main_mode_)
-            self.last_sub_mode.append(self.sub_mode_)
-            self.next_graphs.clear()
+            self.begin_step()
             pen.setColor(Qt.white)
             painter.setPen(pen)
             if (self.graph.is_connected(node1, node2)):
                 self.graph.disconnect(node1, node2)
             painter.drawLine(
-                node1.get_coord()[0],
-                node1.get_coord()[1],
-                node2.get_coord()[0],
-                node2.get_coord()[1])
+                self.to_view(node1.get_coord()),
+                self.to_view(node2.get_coord()))
             pen.setColor(Qt.black)
             painter.setPen(pen)
             painter.drawEllipse(
-                QPoint(
-                    node1.get_coord()[0],
-                    node1.get_coord()[1]),
+                self.to_view(node1.get_coord()),
                 7,
                 7)
             painter.drawEllipse(
-                QPoint(
-                    node2.get_coord()[0],
-                    node2.get_coord()[1]),
+                self.to_view(node2.get_coord()),
                 7,
                 7)
             self.edge_diff = len(self.graph._Lines) + \
@@ -346,31 +386,22 @@ class Canvas(QLabel):
                 "Disconnected: {" + str(node1) + ", " + str(node2) + "}")
         else:
             if (self.edge_diff > -1):
-                self.last_graphs.append(deepcopy(self.graph))
-                self.last_main_mode.append(self.main_mode_)
-                self.last_sub_mode.append(self.sub_mode_)
-                self.next_graphs.clear()
+                self.begin_step()
                 pen.setColor(Qt.white)
                 painter.setPen(pen)
                 if (self.graph.is_connected(node1, node2)):
                     self.graph.disconnect(node1, node2)
                 painter.drawLine(
-                    node1.get_coord()[0],
-                    node1.get_coord()[1],
-                    node2.get_coord()[0],
-                    node2.get_coord()[1])
+                    self.to_view(node1.get_coord()),
+                    self.to_view(node2.get_coord()))
                 pen.setColor(Qt.black)
                 painter.setPen(pen)
                 painter.drawEllipse(
-                    QPoint(
-                        node1.get_coord()[0],
-                        node1.get_coord()[1]),
+                    self.to_view(node1.get_coord()),
                     7,
                     7)
                 painter.drawEllipse(
-                    QPoint(
-                        node2.get_coord()[0],
-                        node2.get_coord()[1]),
+                    self.to_view(node2.get_coord()),
                     7,
                     7)
                 self.edge_diff = len(self.graph._Lines) + \
@@ -395,10 +426,7 @@ class Canvas(QLabel):
         """
         if (self.main_mode_ == MainMode.EDIT_MODE):
             assert (node in self.graph.getNodes())
-            self.last_graphs.append(deepcopy(self.graph))
-            self.last_main_mode.append(self.main_mode_)
-            self.last_sub_mode.append(self.sub_mode_)
-            self.next_graphs.clear()
+            self.begin_step()
             self.layers.clear()
             pen.setColor(Qt.white)
             painter.setPen(pen)
@@ -409,31 +437,23 @@ class Canvas(QLabel):
                    for j in range(n) if self.graph.getAdjMatrix()[i][j] == 1]
             for point in adj:
                 painter.drawLine(
-                    node.get_coord()[0],
-                    node.get_coord()[1],
-                    point.get_coord()[0],
-                    point.get_coord()[1])
+                    self.to_view(node.get_coord()),
+                    self.to_view(point.get_coord()))
                 pen.setColor(Qt.black)
                 painter.setPen(pen)
                 painter.drawEllipse(
-                    QPoint(
-                        node.get_coord()[0],
-                        node.get_coord()[1]),
+                    self.to_view(node.get_coord()),
                     7,
                     7)
                 painter.drawEllipse(
-                    QPoint(
-                        point.get_coord()[0],
-                        point.get_coord()[1]),
+                    self.to_view(point.get_coord()),
                     7,
                     7)
                 self.graph.disconnect(node, point)
                 pen.setColor(Qt.white)
                 painter.setPen(pen)
             painter.drawEllipse(
-                QPoint(
-                    node.get_coord()[0],
-                    node.get_coord()[1]),
+                self.to_view(node.get_coord()),
                 7,
                 7)
             self.graph.removeNode(node)
@@ -454,13 +474,11 @@ class Canvas(QLabel):
         painter: QPainter
             the QPainter class
         """
-        self.last_graphs.append(deepcopy(self.graph))
-        self.last_main_mode.append(self.main_mode_)
-        self.last_sub_mode.append(self.sub_mode_)
-        self.next_graphs.clear()
+        self.begin_step()
         pen = QPen()
         nodelist = self.graph.getNodes()
-        nodelist = [v for v in nodelist if v.is_in(self.x_, self.y_)]
+        nodelist = [v for v in nodelist if v.is_in(
+            self.x_, self.y_, self.hit_radius(7))]
         if (len(nodelist) == 0):
             pass
         else:
@@ -469,9 +487,7 @@ class Canvas(QLabel):
                 pen.setColor(Qt.blue)
                 painter.setPen(pen)
                 painter.drawEllipse(
-                    QPoint(
-                        self.first_point.get_coord()[0],
-                        self.first_point.get_coord()[1]),
+                    self.to_view(self.first_point.get_coord()),
                     7,
                     7)
             else:
@@ -484,9 +500,7 @@ class Canvas(QLabel):
                         pen.setColor(Qt.red)
                         painter.setPen(pen)
                         painter.drawEllipse(
-                            QPoint(
-                                self.second_point.get_coord()[0],
-                                self.second_point.get_coord()[1]),
+                            self.to_view(self.second_point.get_coord()),
                             7,
                             7)
                 else:
@@ -496,46 +510,34 @@ class Canvas(QLabel):
                         pen.setColor(Qt.white)
                         painter.setPen(pen)
                         painter.drawLine(
-                            self.first_point.get_coord()[0],
-                            self.first_point.get_coord()[1],
-                            self.second_point.get_coord()[0],
-                            self.second_point.get_coord()[1])
+                            self.to_view(self.first_point.get_coord()),
+                            self.to_view(self.second_point.get_coord()))
                         pen.setColor(Qt.black)
                         painter.setPen(pen)
                         painter.drawEllipse(
-                            QPoint(
-                                self.first_point.get_coord()[0],
-                                self.first_point.get_coord()[1]),
+                            self.to_view(self.first_point.get_coord()),
                             7,
                             7)
                         painter.drawEllipse(
-                            QPoint(
-                                self.second_point.get_coord()[0],
-                                self.second_point.get_coord()[1]),
+                            self.to_view(self.second_point.get_coord()),
                             7,
                             7)
                         self.graph.disconnect(
                             self.first_point, self.second_point)
                         painter.drawLine(
-                            self.first_point.get_coord()[0],
-                            self.first_point.get_coord()[1],
-                            self.third_point.get_coord()[0],
-                            self.third_point.get_coord()[1])
+                            self.to_view(self.first_point.get_coord()),
+                            self.to_view(self.third_point.get_coord()))
                         self.graph.connect(self.first_point, self.third_point)
                         self.first_point, self.second_point, self.third_point = None, None, None
                     else:
                         pen.setColor(Qt.black)
                         painter.setPen(pen)
                         painter.drawEllipse(
-                            QPoint(
-                                self.first_point.get_coord()[0],
-                                self.first_point.get_coord()[1]),
+                            self.to_view(self.first_point.get_coord()),
                             7,
                             7)
                         painter.drawEllipse(
-                            QPoint(
-                                self.second_point.get_coord()[0],
-                                self.second_point.get_coord()[1]),
+                            self.to_view(self.second_point.get_coord()),
                             7,
                             7)
                         self.first_point, self.second_point, self.third_point = None, None, None
@@ -544,13 +546,13 @@ class Canvas(QLabel):
         """
         Compute the layers of the graph.
         """
-        self.layers.clear()
+        layers = []
         nodelist = deepcopy(self.graph.getNodes())
         while (nodelist):
             graph_copy = Graph(Nodes=nodelist, Lines=[])
             if (len(nodelist) == 1):
                 convex_hull = Graph(Nodes=graph_copy.getNodes())
-                self.layers.append(convex_hull)
+                layers.append(convex_hull)
                 nodelist = [
                     node for node in nodelist if node not in convex_hull.getNodes()]
             elif (len(nodelist) == 2):
@@ -558,7 +560,7 @@ class Canvas(QLabel):
                 first = convex_hull.getNodes()[0]
                 second = convex_hull.getNodes()[1]
                 convex_hull.connect(first, second)
-                self.layers.append(convex_hull)
+                layers.append(convex_hull)
                 nodelist = [
                     node for node in nodelist if node not in convex_hull.getNodes()]
             else:
@@ -571,63 +573,41 @@ class Canvas(QLabel):
                 first = convex_hull.getNodes()[0]
                 second = convex_hull.getNodes()[n - 1]
                 convex_hull.connect(first, second)
-                self.layers.append(convex_hull)
+                layers.append(convex_hull)
                 nodelist = [
                     node for node in nodelist if node not in convex_hull.getNodes()]
+        self.layers = LayerIndex(layers)
+
+    def target_paths(self):
+        """
+        Get the canonical and wrapping paths of the point set.
+
+        The TargetPaths are kept as long as the coordinates do not change.
+
+        Returns
+        -------
+        TargetPaths
+        """
+        if (self.targets is None
+                or not self.targets.matches(self.graph.coord_array())):
+            self.compute_ch()
+            self.targets = TargetPaths(self.graph, self.layers)
+        return self.targets
 
     def show_ch(self):
         """
         Display the layer of the Node list on the screen.
         """
-        self.layers.clear()
+        self.compute_ch()
         pen = QPen(Qt.darkGreen, Qt.DashLine)
         painter = QPainter(self.pixmap())
         painter.setPen(pen)
-        nodelist = deepcopy(self.graph.getNodes())
-        while (nodelist):
-            graph_copy = Graph(Nodes=nodelist, Lines=[])
-            if (len(nodelist) == 1):
-                convex_hull = Graph(Nodes=graph_copy.getNodes())
-                self.layers.append(convex_hull)
-                nodelist = [
-                    node for node in nodelist if node not in convex_hull.getNodes()]
-            elif (len(nodelist) == 2):
-                convex_hull = Graph(Nodes=graph_copy.getNodes())
-                first = convex_hull.getNodes()[0]
-                second = convex_hull.getNodes()[1]
-                painter.drawLine(
-                    first.get_coord()[0],
-                    first.get_coord()[1],
-                    second.get_coord()[0],
-                    second.get_coord()[1])
-                convex_hull.connect(first, second)
-                self.layers.append(convex_hull)
-                nodelist = [
-                    node for node in nodelist if node not in convex_hull.getNodes()]
-            else:
-                convex_hull = Graph(graph_copy.compute_ch())
-                n = len(convex_hull.getNodes())
-                for i in range(n - 1):
-                    first = convex_hull.getNodes()[i]
-                    second = convex_hull.getNodes()[i + 1]
-                    painter.drawLine(
-                        first.get_coord()[0],
-                        first.get_coord()[1],
-                        second.get_coord()[0],
-                        second.get_coord()[1])
-                    convex_hull.connect(first, second)
-                first = convex_hull.getNodes()[0]
-                second = convex_hull.getNodes()[n - 1]
-                convex_hull.connect(first, second)
+        for layer in self.layers:
+            for line in layer.getLines():
+                points = line.getPoints()
                 painter.drawLine(
-                    first.get_coord()[0],
-                    first.get_coord()[1],
-                    second.get_coord()[0],
-                    second.get_coord()[1])
-                self.layers.append(convex_hull)
-                nodelist = [
-                    node for node in nodelist if node not in convex_hull.getNodes()]
-            self.update()
+                    self.to_view(points[0]), self.to_view(points[1]))
+        self.update()
         painter.end()
         self.showing_layer = True
         self.message.emit("Showing layer. Click anywhere to disable.")
@@ -637,16 +617,11 @@ class Canvas(QLabel):
         Reset the whole Canvas and all member variables.
         Graphs are removed and reset to empty.
         """
-        self.last_graphs.append(deepcopy(self.graph))
-        self.last_main_mode.append(self.main_mode_)
-        self.last_sub_mode.append(self.sub_mode_)
-        self.next_graphs.clear()
         self.clear()
         whiteboard = QPixmap(self.width_, self.height_)
         whiteboard.fill(Qt.white)
         self.setPixmap(whiteboard)
-        del self.graph
-        self.graph = Path(Nodes=[], start=None, end=None, Lines=[])
+        self.replace_graph(Path(Nodes=[], start=None, end=None, Lines=[]))
         self.layers.clear()
         self.i_ = 0
         self.edge_diff = 0
@@ -654,6 +629,49 @@ class Canvas(QLabel):
         self.message.emit("Cleared.")
         self.main_mode_change.emit()
 
+    def begin_step(self):
+        """
+        Start a new step in the history, following changes of the graph
+        are undone together.
+        """
+        self.history.begin(self.graph, self.main_mode_, self.sub_mode_)
+        self.history_change.emit(self.history.position(), len(self.history))
+
+    def replace_graph(self, graph):
+        """
+        Replace the graph by another one as an undoable step.
+
+        Parameters:
+        -----------
+        graph: Path
+            the new graph
+        """
+        self.begin_step()
+        old_graph = self.graph
+        self.graph = graph
+        self.history.replace(old_graph, graph)
+
+    def replay(self, ops):
+        """
+        Apply a flip sequence stored in the ResultCache, every edit
+        is drawn and undoable as if done in FLIP mode.
+
+        Parameters:
+        -----------
+        ops: list[tuple]
+            operations ("connect" or "disconnect", i, j) on Node indices
+        """
+        painter = QPainter(self.pixmap())
+        pen = QPen()
+        nodes = self.graph.getNodes()
+        for kind, i, j in ops:
+            if (kind == "connect"):
+                self.draw_edge(painter, pen, nodes[i], nodes[j])
+            else:
+                self.delete_edge(painter, pen, nodes[i], nodes[j])
+        painter.end()
+        self.update()
+
     def problem_node(self):
         """
         If the Path does not fulfill the condition,
@@ -687,9 +705,17 @@ class Canvas(QLabel):
         deg1 = [v for v in self.graph._Nodes if self.graph.deg(v) == 1]
         deg2 = [v for v in self.graph._Nodes if self.graph.deg(v) == 2]
         deg3 = [v for v in self.graph._Nodes if self.graph.deg(v) > 2]
+        # crossings are looked up in the table instead of trying each edge
+        table = self.graph.crossing_table()
+        edges = self.graph.edge_array()
+        mask = table.mask(edges)
+        index = {id(v): i for i, v in enumerate(self.graph._Nodes)}
 
         # added one edge
         if (self.edge_diff == 1):
+            crossed = table.crossing_matrix(edges)
+            total = np.count_nonzero(crossed)
+            position = {(i, j): k for k, (i, j) in enumerate(edges.tolist())}
             for v in deg2 + deg3:
                 adj = self.graph.adj(v)
                 for w in adj:
@@ -697,22 +723,33 @@ class Canvas(QLabel):
                         Line(
                             v.get_coord(),
                             w.get_coord()) in self.graph._Lines)
+                    # all crossings have to involve the edge
+                    # (a loop at v crosses nothing)
+                    k = position.get(tuple(sorted((index[id(v)], index[id(w)]))))
+                    involved = 0 if k is None else np.count_nonzero(crossed[k])
+                    if (2 * involved != total):
+                        continue
                     self.graph.disconnect(v, w)
-                    if (not self.graph.crosses()
-                            and self.graph.is_spanning_path()):
+                    if (self.graph.is_spanning_path()):
                         lines.append(Line(v.get_coord(), w.get_coord()))
                     self.graph.connect(v, w)
         # deleted one edge
-        elif (self.edge_diff == -1):
+        elif (self.edge_diff == -1 and not table.has_crossing(edges)):
             for v in deg2 + deg1:
                 nodelist = self.graph._Nodes
-                nodelist = [w for w in nodelist if w not in self.graph.adj(v)]
-                for w in nodelist:
+                nodelist = [w for w in nodelist
+                            if w not in self.graph.adj(v) and w is not v]
+                if (not nodelist):
+                    continue
+                candidates = [(index[id(v)], index[id(w)]) for w in nodelist]
+                crossing = table.crosses(candidates, mask)
+                for w, c in zip(nodelist, crossing):
                     assert (Line(v.get_coord(), w.get_coord())
                             not in self.graph._Lines)
+                    if (c):
+                        continue
                     self.graph.connect(v, w)
-                    if (not self.graph.crosses()
-                            and self.graph.is_spanning_path()):
+                    if (self.graph.is_spanning_path()):
                         lines.append(Line(v.get_coord(), w.get_coord()))
                     self.graph.disconnect(v, w)
 
@@ -733,7 +770,7 @@ class Canvas(QLabel):
         if (self.main_mode_ == MainMode.EDIT_MODE):
             pass
         else:
-            if (not self.graph.crosses() and self.graph.is_spanning_path()):
+            if (not self.graph.has_crossing() and self.graph.is_spanning_path()):
                 self.clear()
                 whiteboard = QPixmap(self.width_, self.height_)
                 whiteboard.fill(Qt.white)
@@ -744,18 +781,13 @@ class Canvas(QLabel):
                 painter.setPen(pen)
                 for node in self.graph._Nodes:
                     painter.drawEllipse(
-                        QPoint(
-                            node.get_coord()[0],
-                            node.get_coord()[1]),
+                        self.to_view(node.get_coord()),
                         7,
                         7)
                 for line in self.graph._Lines:
                     points = line.getPoints()
                     painter.drawLine(
-                        points[0][0],
-                        points[0][1],
-                        points[1][0],
-                        points[1][1])
+                        self.to_view(points[0]), self.to_view(points[1]))
                 self.update()
                 painter.end()
             else:
@@ -767,9 +799,7 @@ class Canvas(QLabel):
                 for node in self.bad_node:
                     painter.setPen(pen)
                     painter.drawEllipse(
-                        QPoint(
-                            node.get_coord()[0],
-                            node.get_coord()[1]),
+                        self.to_view(node.get_coord()),
                         7,
                         7)
                 if (self.edge_diff == 1):
@@ -777,20 +807,20 @@ class Canvas(QLabel):
                         painter.setPen(pen)
                         points = line.getPoints()
                         painter.drawLine(
-                            points[0][0], points[0][1], points[1][0], points[1][1])
+                            self.to_view(points[0]), self.to_view(points[1]))
                 elif (self.edge_diff == -1):
                     for line in self.bad_edge:
                         pen.setStyle(Qt.DashDotLine)
                         painter.setPen(pen)
                         points = line.getPoints()
                         painter.drawLine(
-                            points[0][0], points[0][1], points[1][0], points[1][1])
+                            self.to_view(points[0]), self.to_view(points[1]))
                 elif (self.edge_diff == 0):
                     for line in self.bad_edge:
                         painter.setPen(pen)
                         points = line.getPoints()
                         painter.drawLine(
-                            points[0][0], points[0][1], points[1][0], points[1][1])
+                            self.to_view(points[0]), self.to_view(points[1]))
                 self.update()
                 painter.end()
 
@@ -804,18 +834,13 @@ class Canvas(QLabel):
         painter.setPen(pen)
         for node in self.graph.getNodes():
             painter.drawEllipse(
-                QPoint(
-                    node.get_coord()[0],
-                    node.get_coord()[1]),
+                self.to_view(node.get_coord()),
                 7,
                 7)
         for line in self.graph.getLines():
             points = line.getPoints()
             painter.drawLine(
-                points[0][0],
-                points[0][1],
-                points[1][0],
-                points[1][1])
+                self.to_view(points[0]), self.to_view(points[1]))
         if (len(self.graph.getNodes()) == 0):
             self.i_ = 0
         else:
@@ -839,7 +864,7 @@ class Canvas(QLabel):
             "graph lines": [l.toJson() for l in self.graph.getLines()],
             "main mode": self.main_mode_,
             "sub mode": self.sub_mode_,
-            "size": (self.size().width(), self.size().height())
+            "size": (self.model_width_, self.model_height_)
         }
         data = b64encode(json.dumps(data).encode())
         try:
@@ -867,45 +892,29 @@ class Canvas(QLabel):
                 self.main_mode_change.emit()
             self.sub_mode_change.emit(new_sub)
             new_nodes = [json.loads(n) for n in new_list["graph nodes"]]
-            self.graph._Nodes = [Node(d["_name"], tuple(d["_coord"])) for d in new_nodes]
-            new_lines = [json.loads(l) for l in new_list["graph lines"]]
-            self.graph._Lines = [Line(tuple(d["_point1"]), tuple(d["_point2"]))
-                                for d in new_lines]
-            self.graph._adj_matrix = np.array(new_list["graph adj matrix"])
+            r_w = self.model_width_ / new_size.width()
+            r_h = self.model_height_ / new_size.height()
+            coords = np.array([d["_coord"] for d in new_nodes],
+                              dtype=float).reshape(-1, 2)
+            coords = np.rint(coords * (r_w, r_h)).astype(np.int32)
+            edges = np.argwhere(
+                np.triu(np.array(new_list["graph adj matrix"]), 1) == 1)
+            graph = Path.from_arrays(
+                coords, edges, [d["_name"] for d in new_nodes])
+            self.replace_graph(graph)
             self.layers.clear()
-            if (new_size != self.size()):
-                r_w = self.size().width() / new_size.width()
-                r_h = self.size().height() / new_size.height()
-                graph = self.graph
-                for p in graph._Nodes:
-                    p.set_coord(int(r_w * p._coord[0]), int(r_h * p._coord[1]))
-                for l in graph._Lines:
-                    ps = l.getPoints()
-                    p1, p2 = ps[0], ps[1]
-                    new_p1 = (int(r_w * p1[0]), int(r_h * p1[1]))
-                    new_p2 = (int(r_w * p2[0]), int(r_h * p2[1]))
-                    l.setPoints(new_p1, new_p2)
-                whiteboard = QPixmap(self.size().width(), self.size().height())
-                whiteboard.fill(Qt.white)
-                self.setPixmap(whiteboard)
-            self.drawGraph()
+            self.redraw()
             self.message.emit("Welcome again.")
         except BaseException:
             self.message.emit("Load failed")
-    
 
     def undo(self):
         """
         Undo a change done on the Canvas/graph.
         """
         try:
-            last_graph = self.last_graphs.pop(-1)
-            last_mainmode = self.last_main_mode.pop(-1)
-            last_submode = self.last_sub_mode.pop(-1)
-
-            self.next_graphs.append(deepcopy(self.graph))
-            self.next_main_mode.append(self.main_mode_)
-            self.next_sub_mode.append(self.sub_mode_)
+            graph, last_mainmode, last_submode = self.history.undo(
+                self.graph, self.main_mode_, self.sub_mode_)
 
             if (self.main_mode_ != last_mainmode):
                 self.main_mode_change.emit()
@@ -914,17 +923,8 @@ class Canvas(QLabel):
             self.main_mode_ = last_mainmode
             self.sub_mode_ = last_submode
 
-            self.graph = deepcopy(last_graph)
-            self.clear()
-            whiteboard = QPixmap(self.width_, self.height_)
-            whiteboard.fill(Qt.white)
-            self.setPixmap(whiteboard)
-            self.drawGraph()
-            self.i_ = max([int(node.get_name())
-                          for node in self.graph.getNodes()]) + 1
-            self.edge_diff = len(self.graph._Lines) + \
-                1 - len(self.graph._Nodes)
-            self.identify_problems()
+            self.graph = graph
+            self.redraw()
             self.message.emit("Changed reverted.")
         except BaseException:
             self.message.emit("Nothing to undo.")
@@ -934,13 +934,8 @@ class Canvas(QLabel):
         Redo a change previously undone on the Canvas/graph.
         """
         try:
-            next_graph = self.next_graphs.pop(-1)
-            next_mainmode = self.next_main_mode.pop(-1)
-            next_submode = self.next_sub_mode.pop(-1)
-
-            self.last_graphs.append(deepcopy(self.graph))
-            self.last_main_mode.append(self.main_mode_)
-            self.last_sub_mode.append(self.sub_mode_)
+            graph, next_mainmode, next_submode = self.history.redo(
+                self.graph, self.main_mode_, self.sub_mode_)
 
             if (self.main_mode_ != next_mainmode):
                 self.main_mode_change.emit()
@@ -949,17 +944,8 @@ class Canvas(QLabel):
             self.main_mode_ = next_mainmode
             self.sub_mode_ = next_submode
 
-            self.graph = deepcopy(next_graph)
-            self.clear()
-            whiteboard = QPixmap(self.width_, self.height_)
-            whiteboard.fill(Qt.white)
-            self.setPixmap(whiteboard)
-            self.drawGraph()
-            self.i_ = max([int(node.get_name())
-                          for node in self.graph.getNodes()]) + 1
-            self.edge_diff = len(self.graph._Lines) + \
-                1 - len(self.graph._Nodes)
-            self.identify_problems()
+            self.graph = graph
+            self.redraw()
             self.message.emit("Changed reverted.")
         except BaseException:
             self.message.emit("Nothing to redo.")
@@ -968,87 +954,78 @@ class Canvas(QLabel):
         """
         Go to the very start, i.e. Undo until there is nothing to uodo.
         """
-        if (len(self.last_graphs) == 0):
+        if (not self.history.can_undo()):
             self.message.emit("Nothing to undo")
         else:
-            while (len(self.last_graphs) > 0):
-                try:
-                    last_graph = self.last_graphs.pop(-1)
-                    self.next_graphs.append(deepcopy(self.graph))
-                    self.next_main_mode.append(self.main_mode_)
-                    self.next_sub_mode.append(self.sub_mode_)
-                    self.graph = deepcopy(last_graph)
-                except BaseException:
-                    break
-            self.clear()
-            whiteboard = QPixmap(self.width_, self.height_)
-            whiteboard.fill(Qt.white)
-            self.setPixmap(whiteboard)
-            self.drawGraph()
-            if (len(self.graph.getNodes()) == 0):
-                self.i_ = 0
-            else:
-                self.i_ = max([int(node.get_name())
-                              for node in self.graph.getNodes()]) + 1
-            self.edge_diff = len(self.graph._Lines) + \
-                1 - len(self.graph._Nodes)
-            self.identify_problems()
+            self.seek(0)
             self.message.emit("Back to start")
 
     def to_end(self):
         """
         Go to the very end, i.e. Redo until there is nothing to redo.
         """
-        if (len(self.next_graphs) == 0):
+        if (not self.history.can_redo()):
             self.message.emit("Nothing to redo")
         else:
-            while (len(self.next_graphs) > 0):
-                try:
-                    next_graph = self.next_graphs.pop(-1)
-                    self.last_graphs.append(deepcopy(self.graph))
-                    self.last_main_mode.append(self.main_mode_)
-                    self.last_sub_mode.append(self.sub_mode_)
-                    self.graph = deepcopy(next_graph)
-                except BaseException:
-                    break
-            self.clear()
-            whiteboard = QPixmap(self.width_, self.height_)
-            whiteboard.fill(Qt.white)
-            self.setPixmap(whiteboard)
-            self.drawGraph()
-            if (len(self.graph.getNodes()) == 0):
-                self.i_ = 0
-            else:
-                self.i_ = max([int(node.get_name())
-                              for node in self.graph.getNodes()]) + 1
-            self.edge_diff = len(self.graph._Lines) + \
-                1 - len(self.graph._Nodes)
-            self.identify_problems()
+            self.seek(len(self.history))
             self.message.emit("Back to end")
 
+    def seek(self, position):
+        """
+        Go to a step of the history.
+
+        Parameters:
+        -----------
+        position: int
+            number of steps done, 0 is the very start
+        """
+        graph, main_mode, sub_mode = self.history.seek(
+            self.graph, self.main_mode_, self.sub_mode_, position)
+
+        if (self.main_mode_ != main_mode):
+            self.main_mode_change.emit()
+        if (self.sub_mode_ != sub_mode):
+            self.sub_mode_change.emit(self.sub_mode_)
+        self.main_mode_ = main_mode
+        self.sub_mode_ = sub_mode
+
+        self.graph = graph
+        self.redraw()
+
+    def redraw(self):
+        """
+        Clean the whiteboard and draw the graph after it has been
+        restored from the history.
+        """
+        self.clear()
+        whiteboard = QPixmap(self.width_, self.height_)
+        whiteboard.fill(Qt.white)
+        self.setPixmap(whiteboard)
+        self.drawGraph()
+        if (len(self.graph.getNodes()) == 0):
+            self.i_ = 0
+        else:
+            self.i_ = max([int(node.get_name())
+                          for node in self.graph.getNodes()]) + 1
+        self.edge_diff = len(self.graph._Lines) + \
+            1 - len(self.graph._Nodes)
+        self.identify_problems()
+        self.history_change.emit(self.history.position(), len(self.history))
+
     def resizeEvent(self, e):
         """
-        Resize the canvas and the graphs inside the screen.
+        Resize the canvas, the graph is only drawn with the new
+        view transform, its coordinates stay the same.
 
         Parameters
         ----------
         e: PyQt5.QtGui.QResizeEvent
             the resize event
         """
-        r_w = e.size().width() / e.oldSize().width()
-        r_h = e.size().height() / e.oldSize().height()
-        graphs = [self.graph] + self.last_graphs + self.next_graphs
-        for graph in graphs:
-            for p in graph._Nodes:
-                p.set_coord(int(r_w * p._coord[0]), int(r_h * p._coord[1]))
-            for l in graph._Lines:
-                ps = l.getPoints()
-                p1, p2 = ps[0], ps[1]
-                new_p1 = (int(r_w * p1[0]), int(r_h * p1[1]))
-                new_p2 = (int(r_w * p2[0]), int(r_h * p2[1]))
-                l.setPoints(new_p1, new_p2)
         self.width_ = e.size().width()
         self.height_ = e.size().height()
+        self.scale_x_ = self.width_ / self.model_width_
+        self.scale_y_ = self.height_ / self.model_height_
         whiteboard = QPixmap(e.size().width(), e.size().height())
         whiteboard.fill(Qt.white)
         self.setPixmap(whiteboard)
@@ -1076,18 +1053,13 @@ class Canvas(QLabel):
             painter.setPen(pen)
             for node in self.graph.getNodes():
                 painter.drawEllipse(
-                    QPoint(
-                        node.get_coord()[0],
-                        node.get_coord()[1]),
+                    self.to_view(node.get_coord()),
                     7,
                     7)
             for line in self.graph.getLines():
                 points = line.getPoints()
                 painter.drawLine(
-                    points[0][0],
-                    points[0][1],
-                    points[1][0],
-                    points[1][1])
+                    self.to_view(points[0]), self.to_view(points[1]))
             if (not self.graph.getNodes()):
                 self.i_ = 0
             else:
@@ -1113,11 +1085,11 @@ class Canvas(QLabel):
                     nodelist = self.graph.getNodes()
                     nodelist = [
                         v for v in nodelist if v.is_in(
-                            self.x_, self.y_)]
+                            self.x_, self.y_, self.hit_radius(7))]
                     linelist = self.bad_edge
                     linelist = [
                         l for l in linelist if l.is_in(
-                            (self.x_, self.y_))]
+                            (self.x_, self.y_), self.hit_radius(5))]
                     if (len(linelist) == 0 or self.edge_diff != -1):
                         pass
                     else:
@@ -1133,9 +1105,7 @@ class Canvas(QLabel):
                             pen = QPen(Qt.magenta)
                             painter.setPen(pen)
                             painter.drawEllipse(
-                                QPoint(
-                                    self.first_point.get_coord()[0],
-                                    self.first_point.get_coord()[1]),
+                                self.to_view(self.first_point.get_coord()),
                                 7,
                                 7)
                         else:
@@ -1144,9 +1114,7 @@ class Canvas(QLabel):
                             pen.setColor(Qt.black)
                             painter.setPen(pen)
                             painter.drawEllipse(
-                                QPoint(
-                                    self.first_point.get_coord()[0],
-                                    self.first_point.get_coord()[1]),
+                                self.to_view(self.first_point.get_coord()),
                                 7,
                                 7)
                             if (self.first_point != self.second_point):
@@ -1162,7 +1130,7 @@ class Canvas(QLabel):
                         nodelist = self.graph.getNodes()
                         nodelist = [
                             v for v in nodelist if v.is_in(
-                                self.x_, self.y_)]
+                                self.x_, self.y_, self.hit_radius(7))]
                         if (len(nodelist) == 0):
                             pass
                         else:
@@ -1175,7 +1143,7 @@ class Canvas(QLabel):
                     nodelist = self.graph.getNodes()
                     nodelist = [
                         v for v in nodelist if v.is_in(
-                            self.x_, self.y_)]
+                            self.x_, self.y_, self.hit_radius(7))]
                     if (len(nodelist) == 0):
                         pass
                     else:
@@ -1183,9 +1151,7 @@ class Canvas(QLabel):
                             self.message.emit(f"Selected: {nodelist[0]}")
                             self.first_point = nodelist[0]
                             painter.drawEllipse(
-                                QPoint(
-                                    self.first_point.get_coord()[0],
-                                    self.first_point.get_coord()[1]),
+                                self.to_view(self.first_point.get_coord()),
                                 7,
                                 7)
                         else:
@@ -1194,9 +1160,7 @@ class Canvas(QLabel):
                             pen.setColor(Qt.black)
                             painter.setPen(pen)
                             painter.drawEllipse(
-                                QPoint(
-                                    self.first_point.get_coord()[0],
-                                    self.first_point.get_coord()[1]),
+                                self.to_view(self.first_point.get_coord()),
                                 7,
                                 7)
                             if (self.first_point != self.second_point):
@@ -1213,7 +1177,8 @@ class Canvas(QLabel):
                 pen = QPen()
                 painter = QPainter(self.pixmap())
                 linelist = self.graph.getLines()
-                linelist = [l for l in linelist if l.is_in((self.x_, self.y_))]
+                linelist = [l for l in linelist if l.is_in(
+                    (self.x_, self.y_), self.hit_radius(5))]
                 if (len(linelist) == 1):
                     line = linelist[0]
                     if (self.main_mode_ == MainMode.FLIP_MODE and self.edge_diff !=
@@ -1,10 +1,55 @@
 import numpy as np
-import itertools
 from collections import Counter
+from collections import OrderedDict
+from functools import cmp_to_key
+import hashlib
 import json
 
+from Kernels import SAFE_COORD
+from Kernels import convex_hull
+from Kernels import orientations
+from Kernels import path_walk
+from Kernels import segments_intersect
+
+
+def coord_array(nodes):
+    """
+    Collect the coordinates of Nodes in an array.
+
+    Parameters:
+    -----------
+    nodes: list[Node]
+        the Nodes
+
+    Returns
+    -------
+    numpy.ndarray
+        n x 2 int32 array
+    """
+    return np.array([node.get_coord() for node in nodes],
+                    dtype=np.int32).reshape(-1, 2)
+
+
+def line_array(lines):
+    """
+    Collect the end points of Lines in an array.
+
+    Parameters:
+    -----------
+    lines: list[Line]
+        the Lines
+
+    Returns
+    -------
+    numpy.ndarray
+        m x 4 array of rows (x1, y1, x2, y2)
+    """
+    return np.array([line.getPoints() for line in lines],
+                    dtype=np.int64).reshape(-1, 4)
+
 
 class Node:
+    __slots__ = ("_name", "_coord")
 
     def __init__(self, name, coord, adj=[]):
         """
@@ -77,7 +122,7 @@ class Node:
         """
         return np.sqrt(pow(x - self._coord[0], 2) + pow(y - self._coord[1], 2))
 
-    def is_in(self, x, y):
+    def is_in(self, x, y, radius=7):
         """
         Determine if the point (x,y) lies in the node
 
@@ -87,12 +132,14 @@ class Node:
             coordinate x of the point
         y: int
             coordinate y of the point
+        radius: float
+            radius of the node
 
         Returns
         -------
         bool
         """
-        return self.dist(x, y) < 7
+        return self.dist(x, y) < radius
 
     def __eq__(self, node):
         if (node is not None):
@@ -106,10 +153,11 @@ class Node:
         return hash((self._name, self._coord))
 
     def toJson(self):
-        return json.dumps(self, default=lambda o: o.__dict__)
+        return json.dumps({"_name": self._name, "_coord": self._coord})
 
 
 class Line:
+    __slots__ = ("_point1", "_point2")
 
     def __init__(self, point1, point2):
         """
@@ -234,7 +282,7 @@ class Line:
         den = np.sqrt(pow(x_d, 2) + pow(y_d, 2))
         return num / den
 
-    def is_in(self, point):
+    def is_in(self, point, radius=5):
         """
         Check if the point is close enough to the Line
 
@@ -242,13 +290,31 @@ class Line:
         -----------
         point: tuple[int]
             the coordinate of the point
+        radius: float
+            the maximal distance
 
         Returns
         -------
         bool
-            whether the distance is less than 5
+            whether the distance is less than radius
+        """
+        return self.dist(point) < radius
+
+    def key(self):
+        """
+        Get the canonical key of the Line.
+
+        The key does not depend on the order of the end points, so that
+        it can be used to look up undirected edges in dictionaries.
+
+        Returns
+        -------
+        tuple[tuple[int]]
+            the sorted tuple of both end points
         """
-        return self.dist(point) < 5
+        if (self._point1 <= self._point2):
+            return (self._point1, self._point2)
+        return (self._point2, self._point1)
 
     def __repr__(self):
         return "{" + str(self._point1) + ", " + str(self._point2) + "}"
@@ -257,462 +323,2610 @@ class Line:
         return hash((self._point1, self._point2))
 
     def toJson(self):
-        return json.dumps(self, default=lambda o: o.__dict__)
+        return json.dumps({"_point1": self._point1, "_point2": self._point2})
 
 
-class Graph:
+class PointSet:
 
-    def __init__(self, Nodes=[], Lines=[]):
+    def __init__(self, coords, names=None):
         """
-        The Graph class.
-
-        Simulates a mathematical graph.
+        The PointSet class.
 
-        Connectivity of nodes are represented in adjacency matrix
+        Stores a fixed set of points as arrays and hands out one shared
+        Node (and Line) object per point (and pair of points), which are
+        created on first use.
 
         Parameters:
         -----------
-        Nodes: list[Node]
-            list of nodes in a graph
+        coords: numpy.ndarray
+            n x 2 array of coordinates
+        names: list[str]
+            names of the points, the indices if not given
+        """
+        self._coords = np.asarray(coords, dtype=np.int32).reshape(-1, 2)
+        self._names = names
+        self._nodes = [None] * len(self._coords)
+        self._lines = {}
+        self._index = None
 
-        Lines: list[Line]
-            list of lines (edges) in a graph
+    @classmethod
+    def from_nodes(cls, nodes):
         """
-        self._Nodes = Nodes
-        self._Lines = []
+        Create a PointSet which hands out the given Nodes.
 
-        self._adj_matrix = np.zeros(
-            (len(self._Nodes), len(self._Nodes)), dtype=int)
-        for line in Lines:
-            nodes = self.whichNodes(line)
-            self.connect(nodes[0], nodes[1])
+        Parameters:
+        -----------
+        nodes: list[Node]
+            the Nodes
 
-    def getNodes(self):
+        Returns
+        -------
+        PointSet
         """
-        Getter of Node list of a Graph.
+        points = cls(coord_array(nodes), [v.get_name() for v in nodes])
+        points._nodes = list(nodes)
+        return points
+
+    def coord_array(self):
+        """
+        Get the coordinates of all points.
 
         Returns
         -------
-        list[Node]
-            list of nodes in a graph
+        numpy.ndarray
+            n x 2 int32 array
         """
-        return self._Nodes
+        return self._coords
 
-    def getAdjMatrix(self):
+    def node(self, i):
         """
-        Getter of adjacency matrix of a graph.
+        Get the Node of the i-th point.
+
+        Parameters:
+        -----------
+        i: int
+            index of the point
 
         Returns
         -------
-        numpy.ndarray
-            adjacency matrix of a graph
+        Node
         """
-        return self._adj_matrix
+        node = self._nodes[i]
+        if (node is None):
+            x, y = self._coords[i]
+            name = str(i) if self._names is None else self._names[i]
+            node = Node(name, (int(x), int(y)))
+            self._nodes[i] = node
+        return node
 
-    def getLines(self):
+    def nodes(self):
         """
-        Get the Line list of the Path
+        Get the Nodes of all points.
 
         Returns
         -------
-        list[Line]
-            Line list
+        list[Node]
         """
-        return self._Lines
+        return [self.node(i) for i in range(len(self._nodes))]
 
-    def adj(self, node: Node):
+    def line(self, i, j):
         """
-        Get all adjacent Nodes of a Node in the Path
+        Get the Line between the i-th and the j-th point.
 
         Parameters:
         -----------
-        node: Node
-            the Node
+        i: int
+            index of the first point
+        j: int
+            index of the second point
 
         Returns
         -------
-        list[Node]
-            list of Nodes that are adjacent to "node"
+        Line
         """
-        assert (node in self._Nodes)
-        return [v for v in self._Nodes if self.is_connected(node, v)]
+        key = (i, j) if i < j else (j, i)
+        line = self._lines.get(key)
+        if (line is None):
+            line = Line(self.node(key[0]).get_coord(),
+                        self.node(key[1]).get_coord())
+            self._lines[key] = line
+        return line
 
-    def whichNodes(self, line: Line) -> tuple[Node, Node]:
+    def index(self, coord):
         """
-        Find the Nodes connected to the Line
+        Get the index of the point at a coordinate.
 
         Parameters:
         -----------
-        line: Line
-            the Line to be checked
+        coord: tuple[int]
+            the coordinate
 
         Returns
         -------
-        list[Node]
-            list of Nodes that are connected to the Line
+        int
+            None if there is no such point
         """
-        vs = [v for v in self.getNodes() if v.get_coord() in line.getPoints()]
-        return vs
+        if (self._index is None):
+            self._index = {(int(x), int(y)): i
+                           for i, (x, y) in enumerate(self._coords)}
+        return self._index.get(tuple(coord))
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+class OrderType:
+    # point sets up to this size keep the orientations of all triples
+    DENSE_LIMIT = 256
+    # number of blocks kept for larger point sets
+    MAX_BLOCKS = 64
 
-    def addNode(self, node: Node):
+    def __init__(self, coords):
         """
-        Add a single Node in the Graph.
+        The OrderType class.
 
-        Adjacency matrix is expanded along the way.
+        Orientations of all triples of a point set. The orientation of
+        (a, b, c) is the sign of the cross product (b - a) x (c - a),
+        positive if a, b, c are clockwise on the Canvas (whose y axis
+        points down), as in Line.intersect().
+
+        The orientations are computed in blocks, block a holds all
+        triples starting with point a. Up to DENSE_LIMIT points the
+        blocks form an n x n x n int8 array, for more points at most
+        MAX_BLOCKS recently used blocks are kept.
 
         Parameters:
         -----------
-        node: Node
-            the Node to be added
-        """
-        if (node not in self._Nodes):
-            self._Nodes.append(node)
-            self._adj_matrix = np.column_stack(
-                (self._adj_matrix, np.zeros(
-                    self._adj_matrix.shape[0], dtype=int)))
-            self._adj_matrix = np.row_stack(
-                (self._adj_matrix, np.zeros(
-                    self._adj_matrix.shape[1], dtype=int)))
+        coords: numpy.ndarray
+            n x 2 array of coordinates
+        """
+        self._coords = np.array(coords).reshape(-1, 2)
+        n = len(self._coords)
+        self._n = n
+        if (n <= self.DENSE_LIMIT):
+            self._dense = np.zeros((n, n, n), dtype=np.int8)
+            self._known = np.zeros(n, dtype=bool)
+        else:
+            self._dense = None
+            self._blocks = OrderedDict()
 
-    def removeNode(self, node: Node):
+    def matches(self, coords):
         """
-        Remove a Node from a Graph.
-
-        Adjacency matrix is changed along the way.
+        Check if the order type belongs to a point set.
 
         Parameters:
         -----------
-        node: Node
-            the Node to be added
+        coords: numpy.ndarray
+            n x 2 array of coordinates
+
+        Returns
+        -------
+        bool
         """
-        assert (node in self._Nodes)
-        i = self._Nodes.index(node)
-        self._adj_matrix = np.delete(self._adj_matrix, (i), axis=0)
-        self._adj_matrix = np.delete(self._adj_matrix, (i), axis=1)
-        self._Nodes.remove(node)
-        del node
+        return np.array_equal(coords, self._coords)
 
-    def addLine(self, line: Line):
+    def _compute_block(self, a):
         """
-        Add a Line to the Line list
+        Compute the orientations of all triples starting with point a.
+        """
+        coords = self._coords
+        if (len(coords) > 0 and np.abs(coords).max() >= SAFE_COORD):
+            coords = coords.astype(object)
+        else:
+            coords = coords.astype(np.int64)
+        dx = coords[:, 0] - coords[a, 0]
+        dy = coords[:, 1] - coords[a, 1]
+        d = dx[:, None] * dy[None, :] - dy[:, None] * dx[None, :]
+        return np.asarray(d > 0, dtype=np.int8) - np.asarray(d < 0, dtype=np.int8)
+
+    def block(self, a):
+        """
+        Get the orientations of all triples starting with a point.
 
         Parameters:
         -----------
-        line: Line
-            the Line
+        a: int
+            index of the point
+
+        Returns
+        -------
+        numpy.ndarray
+            n x n int8 array, entry [b, c] is the orientation of (a, b, c)
+        """
+        if (self._dense is not None):
+            if (not self._known[a]):
+                self._dense[a] = self._compute_block(a)
+                self._known[a] = True
+            return self._dense[a]
+        if (a in self._blocks):
+            self._blocks.move_to_end(a)
+        else:
+            self._blocks[a] = self._compute_block(a)
+            if (len(self._blocks) > self.MAX_BLOCKS):
+                self._blocks.popitem(last=False)
+        return self._blocks[a]
+
+    def table(self):
         """
-        self.getLines().append(line)
+        Get the orientations of all triples.
 
-    def delLine(self, line: Line):
+        Returns
+        -------
+        numpy.ndarray
+            n x n x n int8 array, None if there are more than
+            DENSE_LIMIT points
         """
-        delete a Line in the Line list
+        if (self._dense is None):
+            return None
+        for a in np.flatnonzero(~self._known):
+            self.block(a)
+        return self._dense
+
+    def orientation(self, a, b, c):
+        """
+        Get the orientation of triples of points.
 
         Parameters:
         -----------
-        line: Line
-            the Line
-        """
-        assert (line in self.getLines())
-        self.getLines().remove(line)
-        del line
+        a: numpy.ndarray
+            indices of the first points, or a single index
+        b: numpy.ndarray
+            indices of the second points
+        c: numpy.ndarray
+            indices of the third points
 
-    def is_connected(self, node1: Node, node2: Node) -> bool:
-        """
-        Check if two Nodes are connected in a Graph.
+        Returns
+        -------
+        numpy.ndarray
+            int8 signs, a single one for single indices
+        """
+        single = np.ndim(a) == 0 and np.ndim(b) == 0 and np.ndim(c) == 0
+        a, b, c = np.broadcast_arrays(np.asarray(a, dtype=np.int64),
+                                      np.asarray(b, dtype=np.int64),
+                                      np.asarray(c, dtype=np.int64))
+        if (single):
+            return self.block(int(a))[b, c]
+        firsts = np.unique(a)
+        if (self._dense is not None):
+            for u in firsts[~self._known[firsts]]:
+                self.block(u)
+            return self._dense[a, b, c]
+        if (len(firsts) > self.MAX_BLOCKS):
+            return orientations(self._coords, np.stack(
+                (a.ravel(), b.ravel(), c.ravel()), axis=1)).reshape(a.shape)
+        result = np.zeros(a.shape, dtype=np.int8)
+        for u in firsts:
+            selected = a == u
+            result[selected] = self.block(u)[b[selected], c[selected]]
+        return result
+
+    def is_clockwise(self, a, b, c):
+        """
+        Check if triples of points are clockwise on the Canvas.
 
         Parameters:
         -----------
-        node1: Node
-            first node
-        node2: Node
-            second node
+        a: numpy.ndarray
+            indices of the first points, or a single index
+        b: numpy.ndarray
+            indices of the second points
+        c: numpy.ndarray
+            indices of the third points
 
         Returns
         -------
-        bool
-            whether node1 and node2 are connected
+        numpy.ndarray
+            bool array, a single bool for single indices
         """
-        assert (node1 in self._Nodes and node2 in self._Nodes)
-        i = self._Nodes.index(node1)
-        j = self._Nodes.index(node2)
-        return self._adj_matrix[i][j] == 1
+        return self.orientation(a, b, c) > 0
 
-    def deg(self, node: Node) -> int:
+    def intersect(self, first, second):
         """
-        Get the degree of a Node in a Graph, i.e. number of Nodes connected to it
+        Check pairs of segments for intersection as Line.intersect() does,
+        the i-th segment of first with the i-th segment of second.
 
         Parameters:
         -----------
-        node: Node
-            the node
+        first: numpy.ndarray
+            k x 2 array of point indices, segments from the first
+            to the second point
+        second: numpy.ndarray
+            k x 2 array of point indices
 
         Returns
         -------
-        int
-            degree of node
+        numpy.ndarray
+            k bool array
         """
-        assert (node in self._Nodes)
-        i = self._Nodes.index(node)
-        return np.sum(self._adj_matrix[i])
+        first = np.asarray(first, dtype=np.int64).reshape(-1, 2)
+        second = np.asarray(second, dtype=np.int64).reshape(-1, 2)
+        A, B = first[:, 0], first[:, 1]
+        C, D = second[:, 0], second[:, 1]
+        coords = self._coords
 
-    def angle(self, node1: Node, node2: Node, node3: Node) -> float:
+        def same(p, q): return np.all(coords[p] == coords[q], axis=1)
+        touching = same(A, C) | same(A, D) | same(B, C) | same(B, D)
+        return (self.is_clockwise(A, C, D) != self.is_clockwise(B, C, D)) \
+            & (self.is_clockwise(A, B, C) != self.is_clockwise(A, B, D)) \
+            & ~touching
+
+    def signature(self):
         """
-        Get the angle of (node1, node2, node3), where node2 is the center
+        Get a key of the order type that does not depend on the order
+        of the points, together with the relabeling into that order.
 
-        The angle is relative to the polygon formed by the graph and thus is possible to be greater equal 180 degree.
+        Every vertex of the convex hull is tried as first point, the
+        other points follow in angular order around it (clockwise or,
+        for the mirror image, counterclockwise). The labeling whose
+        orientations are lexicographically smallest is used, so point
+        sets with the same order type up to reflection get the same key.
+
+        Returns
+        -------
+        tuple[str, numpy.ndarray]
+            the key and the permutation, its k-th entry is the index
+            of the point with label k; None if there are more than
+            DENSE_LIMIT points
+        """
+        table = self.table()
+        if (table is None):
+            return None
+        n = self._n
+        coords = self._coords.astype(np.int64)
+        starts = convex_hull(coords) if n >= 3 else np.arange(n)
+        best, best_perm = None, np.arange(n)
+        for p in starts:
+            block = table[p]
+            distance = np.abs(coords - coords[p]).sum(axis=1)
+            for direction in (1, -1):
+                def compare(b, c):
+                    turn = int(block[b, c]) * direction
+                    if (turn != 0):
+                        return -turn
+                    return int(distance[b] - distance[c])
+                others = sorted([q for q in range(n) if q != p],
+                                key=cmp_to_key(compare))
+                perm = np.array([p] + others, dtype=np.int64)
+                labeled = (table[np.ix_(perm, perm, perm)] * direction).tobytes()
+                if (best is None or labeled < best):
+                    best, best_perm = labeled, perm
+        key = hashlib.sha1(str(n).encode() + b":" + (best or b"")).hexdigest()
+        return key, best_perm
+
+    def __len__(self):
+        return self._n
+
+
+class AngularOrder:
+
+    def __init__(self, order_type):
+        """
+        The AngularOrder class.
+
+        For every point, the other points sorted by their polar angle
+        around it, computed from the OrderType with integer comparisons
+        only. The order around a point is computed when first needed.
+
+        Angles between points are compared exactly as well, so ties are
+        real ties and not the result of rounding.
 
         Parameters:
         -----------
-        node1: Node
-            first node
-        node2: Node
-            second node
-        node3: Node
-            third node
+        order_type: OrderType
+            the OrderType of the point set
+        """
+        self._order_type = order_type
+        coords = order_type._coords
+        if (len(coords) > 0 and np.abs(coords).max() >= SAFE_COORD):
+            self._coords = coords.astype(object)
+        else:
+            self._coords = coords.astype(np.int64)
+        self._orders = {}
+        self._ranks = {}
+
+    def matches(self, coords):
+        """
+        Check if the table belongs to a point set.
+
+        Parameters:
+        -----------
+        coords: numpy.ndarray
+            n x 2 array of coordinates
 
         Returns
         -------
-        float
-            the degree value of the angle
+        bool
         """
-        # assume node2 is center
-        node1_rel = (node1.get_coord()[
-                     0] - node2.get_coord()[0]) + (node1.get_coord()[1] - node2.get_coord()[1]) * 1j
-        node3_rel = (node3.get_coord()[
-                     0] - node2.get_coord()[0]) + (node3.get_coord()[1] - node2.get_coord()[1]) * 1j
-        val3 = np.angle(node3_rel, deg=True)
-        val1 = np.angle(node1_rel, deg=True)
-        val = val1 - val3
-        if (val < 0):
-            val += 360
-        return val
+        return self._order_type.matches(coords)
 
-    def compute_ch(self):
+    def order(self, c):
         """
-        Construct a convex hull of the graph.
+        Get the other points sorted by polar angle around a point.
 
-        (Not constructed directly, but the list of Nodes are given in order, such that
-        a convex hull can be constructed by simply connecting each node and its next one)
+        The angle is counted from the direction of the x axis towards
+        the one of the y axis, points in the same direction are sorted
+        by their distance.
 
-        Algorithm used: Graham Scan
+        Parameters:
+        -----------
+        c: int
+            index of the center point
 
         Returns
         -------
-        list[node]
-            list of Nodes that forms the convex hull
-        """
-        # Graham Scan
-        try:
-            nodelist = sorted(
-                self._Nodes,
-                key=lambda node: node.get_coord()[1],
-                reverse=True)
-            first_node = nodelist.pop(0)
-            nodelist = sorted(
-                nodelist, key=lambda node: np.angle(
-                    (node.get_coord()[0] - first_node.get_coord()[0]) + (
-                        node.get_coord()[1] - first_node.get_coord()[1]) * 1j))
-            nodelist.insert(0, first_node)
-            n = len(nodelist)
-            stack = [nodelist[0], nodelist[1], nodelist[2]]
-            for i in range(3, n):
-                while (self.angle(stack[-2], stack[-1], nodelist[i]) > 180):
-                    stack.pop()
-                stack.append(nodelist[i])
-            return stack
-        except BaseException:
-            pass
+        numpy.ndarray
+            indices of the other points
+        """
+        if (c not in self._orders):
+            block = self._order_type.block(c)
+            d = self._coords - self._coords[c]
+            dx, dy = d[:, 0], d[:, 1]
+            # 0 for the angles in [0, 180), 1 for [180, 360)
+            half = np.where((dy > 0) | ((dy == 0) & (dx > 0)), 0, 1)
+            distance = np.abs(dx) + np.abs(dy)
+            others = np.delete(np.arange(len(d)), c)
+            # sorted by the rounded angle first, then neighbours are
+            # swapped until the integer comparisons agree
+            angle = np.arctan2(dy[others].astype(float), dx[others].astype(float))
+            angle[angle < 0] += 2 * np.pi
+            order = others[np.lexsort((distance[others], angle, half[others]))]
+            swapped = True
+            while (swapped):
+                swapped = False
+                for start in (0, 1):
+                    a, b = order[start:-1:2], order[start + 1::2]
+                    a = a[:len(b)]
+                    turn = block[a, b]
+                    wrong = (half[a] > half[b]) | ((half[a] == half[b]) & (
+                        (turn < 0) | ((turn == 0) & (distance[a] > distance[b]))))
+                    if (np.any(wrong)):
+                        k = start + 2 * np.flatnonzero(wrong)
+                        order[k], order[k + 1] = order[k + 1], order[k].copy()
+                        swapped = True
+            order = order.astype(np.int64)
+            rank = np.full(len(d), -1, dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            self._orders[c] = order
+            self._ranks[c] = rank
+        return self._orders[c]
+
+    def rank(self, c):
+        """
+        Get the position of every point in order(c).
 
-    def crosses(self):
-        """
-        Find all the Lines that intersect in the Path
+        Parameters:
+        -----------
+        c: int
+            index of the center point
 
         Returns
         -------
-        list[Line]
-            A Line list, such that each intersects with at least one other in the list
+        numpy.ndarray
+            n array, -1 for the center point itself
         """
-        lines = []
-        for l1, l2 in itertools.combinations(self._Lines, 2):
-            if (l1.intersect(l2)):
-                if (l1 not in lines):
-                    lines.append(l1)
-                if (l2 not in lines):
-                    lines.append(l2)
-        return lines
+        self.order(c)
+        return self._ranks[c]
 
-    def connect(self, node1: Node, node2: Node):
+    def compare(self, c, ref, a, b):
         """
-        Overloaded method of Graph.connect()
+        Compare the angles (ref, c, a) and (ref, c, b), both between
+        0 and 180 degrees.
 
         Parameters:
-        ----------
-        node1: Node
-            first Node
-        node2: Node
-            second Node
-        """
-        # assert(node1 in self._Nodes and node2 in self._Nodes)
-        i = self._Nodes.index(node1)
-        j = self._Nodes.index(node2)
-        if (not Line(node1.get_coord(), node2.get_coord()) in self._Lines):
-            self.addLine(Line(node1.get_coord(), node2.get_coord()))
-        self._adj_matrix[i][j] = 1
-        self._adj_matrix[j][i] = 1
+        -----------
+        c: int
+            index of the center point
+        ref: int
+            index of the point giving the reference direction
+        a: int
+            index of the first point
+        b: int
+            index of the second point
 
-    def disconnect(self, node1: Node, node2: Node):
-        """
-        Overloaded method of Graph.disconnect()
+        Returns
+        -------
+        int
+            -1, 0 or 1 if the first angle is smaller, equal or larger
+        """
+        u = self._coords[ref] - self._coords[c]
+        va = self._coords[a] - self._coords[c]
+        vb = self._coords[b] - self._coords[c]
+        dot_a, dot_b = int(u @ va), int(u @ vb)
+        norm_a, norm_b = int(va @ va), int(vb @ vb)
+        # the smaller angle has the larger cosine dot / |v|, compare
+        # dot_a * |vb| with dot_b * |va| without square roots
+        sign_a = (dot_a > 0) - (dot_a < 0)
+        sign_b = (dot_b > 0) - (dot_b < 0)
+        if (sign_a != sign_b):
+            return -1 if sign_a > sign_b else 1
+        left, right = dot_a * dot_a * norm_b, dot_b * dot_b * norm_a
+        if (left == right):
+            return 0
+        return -1 if (left > right) == (sign_a > 0) else 1
+
+    def widest(self, c, ref, alive, position):
+        """
+        Find the point with the largest angle (ref, c, p), p among the
+        alive points.
+
+        The points are walked in angular order around c starting after
+        ref, the largest angle is at the last point less than 180
+        degrees ahead or the first point more than 180 degrees ahead.
 
         Parameters:
-        ----------
-        node1: Node
-            first Node
-        node2: Node
-            second Node
-        """
-        assert (node1 in self._Nodes and node2 in self._Nodes)
-        i = self._Nodes.index(node1)
-        j = self._Nodes.index(node2)
-        if (Line(node1.get_coord(), node2.get_coord()) in self._Lines):
-            self.delLine(Line(node1.get_coord(), node2.get_coord()))
-        self._adj_matrix[i][j] = 0
-        self._adj_matrix[j][i] = 0
+        -----------
+        c: int
+            index of the center point
+        ref: int
+            index of the point giving the reference direction
+        alive: numpy.ndarray
+            n bool array of the points to choose from
+        position: numpy.ndarray
+            n array, of the points with the same angle the one with the
+            smallest position is taken
 
-    def __repr__(self):
-        return "Nodes: " + str(self._Nodes) + "\nLines: " + str(self._Lines) + \
+        Returns
+        -------
+        int
+            index of the point, None if no point is alive
+        """
+        order = self.order(c)
+        r = self.rank(c)[ref]
+        walk = np.concatenate((order[r + 1:], order[:r]))
+        walk = walk[alive[walk]]
+        if (len(walk) == 0):
+            return None
+        block = self._order_type.block(c)
+        turn = block[ref, walk]
+        d = self._coords[walk] - self._coords[c]
+        dot = d @ (self._coords[ref] - self._coords[c])
+        ahead = walk[(turn > 0) | ((turn == 0) & (dot < 0))]
+        behind = walk[turn < 0]
+        groups = []
+        if (len(ahead) > 0):
+            last = ahead[-1]
+            groups.append(ahead[block[last, ahead] == 0])
+        if (len(behind) > 0):
+            first = behind[0]
+            groups.append(behind[block[first, behind] == 0])
+        if (len(groups) == 2):
+            k = self.compare(c, ref, groups[0][0], groups[1][0])
+            if (k != 0):
+                groups = [groups[0] if k > 0 else groups[1]]
+        if (not groups):
+            # all points lie in the direction of ref
+            groups = [walk]
+        candidates = np.concatenate(groups)
+        return int(candidates[np.argmin(position[candidates])])
+
+
+class Graph:
+
+    def __init__(self, Nodes=[], Lines=[]):
+        """
+        The Graph class.
+
+        Simulates a mathematical graph.
+
+        Connectivity of nodes are represented in adjacency matrix
+
+        Parameters:
+        -----------
+        Nodes: list[Node]
+            list of nodes in a graph
+
+        Lines: list[Line]
+            list of lines (edges) in a graph
+        """
+        self._Nodes = Nodes
+        self._Lines = []
+        self._listeners = []
+
+        # coordinates of the Nodes in the order of the Node list
+        self._coords = coord_array(self._Nodes)
+        # OrderType, AngularOrder and CrossingTable of the coordinates,
+        # shared with clones
+        self._order = None
+        self._angular = None
+        self._table = None
+        self._adj_matrix = np.zeros(
+            (len(self._Nodes), len(self._Nodes)), dtype=int)
+        for line in Lines:
+            nodes = self.whichNodes(line)
+            self.connect(nodes[0], nodes[1])
+
+    @classmethod
+    def from_arrays(cls, coords, edges, names=None):
+        """
+        Create a Graph from arrays.
+
+        Parameters:
+        -----------
+        coords: numpy.ndarray
+            n x 2 array of coordinates, used without copying if it is int32
+        edges: numpy.ndarray
+            m x 2 array of Node indices, each edge given once
+        names: list[str]
+            names of the Nodes, the indices if not given
+
+        Returns
+        -------
+        Graph
+        """
+        return cls.from_points(PointSet(coords, names), edges)
+
+    @classmethod
+    def from_points(cls, points, edges):
+        """
+        Create a Graph on the Nodes of a PointSet.
+
+        Apart from allocating the adjacency matrix this takes O(n + m).
+
+        Parameters:
+        -----------
+        points: PointSet
+            the points
+        edges: numpy.ndarray
+            m x 2 array of Node indices, each edge given once
+
+        Returns
+        -------
+        Graph
+        """
+        edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+        n = len(points)
+        graph = cls.__new__(cls)
+        graph._Nodes = points.nodes()
+        graph._Lines = [points.line(i, j) for i, j in edges]
+        graph._listeners = []
+        graph._coords = points.coord_array()
+        graph._order = None
+        graph._angular = None
+        graph._table = None
+        graph._adj_matrix = np.zeros((n, n), dtype=int)
+        graph._adj_matrix[edges[:, 0], edges[:, 1]] = 1
+        graph._adj_matrix[edges[:, 1], edges[:, 0]] = 1
+        return graph
+
+    @classmethod
+    def from_lines(cls, nodes, lines):
+        """
+        Create a Graph from Nodes and the Lines between them.
+
+        Parameters:
+        -----------
+        nodes: list[Node]
+            the Nodes
+        lines: list[Line]
+            the Lines, their end points have to be coordinates of Nodes
+
+        Returns
+        -------
+        Graph
+        """
+        points = PointSet.from_nodes(nodes)
+        edges = [(points.index(line.getPoints()[0]),
+                  points.index(line.getPoints()[1])) for line in lines]
+        return cls.from_points(points, edges)
+
+    def add_listener(self, listener):
+        """
+        Register an object that is notified about every change of the Graph.
+
+        The listener has to provide the methods on_add_node(node, i),
+        on_remove_node(node, i), on_connect(node1, node2)
+        and on_disconnect(node1, node2).
+
+        Parameters:
+        -----------
+        listener: object
+            the listener
+        """
+        if (listener not in self._listeners):
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a listener of the Graph.
+
+        Parameters:
+        -----------
+        listener: object
+            the listener
+        """
+        if (listener in self._listeners):
+            self._listeners.remove(listener)
+
+    def getNodes(self):
+        """
+        Getter of Node list of a Graph.
+
+        Returns
+        -------
+        list[Node]
+            list of nodes in a graph
+        """
+        return self._Nodes
+
+    def getAdjMatrix(self):
+        """
+        Getter of adjacency matrix of a graph.
+
+        Returns
+        -------
+        numpy.ndarray
+            adjacency matrix of a graph
+        """
+        return self._adj_matrix
+
+    def getLines(self):
+        """
+        Get the Line list of the Path
+
+        Returns
+        -------
+        list[Line]
+            Line list
+        """
+        return self._Lines
+
+    def coord_array(self):
+        """
+        Get the coordinates of all Nodes.
+
+        The array is shared with the Graph and must not be modified.
+
+        Returns
+        -------
+        numpy.ndarray
+            n x 2 int32 array, row i belongs to the i-th Node
+        """
+        return self._coords
+
+    def segment_array(self):
+        """
+        Get the end points of all edges.
+
+        Returns
+        -------
+        numpy.ndarray
+            m x 4 int64 array of rows (x1, y1, x2, y2), in the order of
+            edge_array()
+        """
+        edges = self.edge_array()
+        coords = self._coords.astype(np.int64)
+        return np.hstack((coords[edges[:, 0]], coords[edges[:, 1]]))
+
+    def edge_array(self):
+        """
+        Get the edges of the Graph as pairs of Node indices.
+
+        Returns
+        -------
+        numpy.ndarray
+            (m, 2) array, each row holds the indices (in the Node list)
+            of the two end points of an edge
+        """
+        return np.argwhere(np.triu(self._adj_matrix, 1) == 1)
+
+    def adj(self, node: Node):
+        """
+        Get all adjacent Nodes of a Node in the Path
+
+        Parameters:
+        -----------
+        node: Node
+            the Node
+
+        Returns
+        -------
+        list[Node]
+            list of Nodes that are adjacent to "node"
+        """
+        assert (node in self._Nodes)
+        return [v for v in self._Nodes if self.is_connected(node, v)]
+
+    def whichNodes(self, line: Line) -> tuple[Node, Node]:
+        """
+        Find the Nodes connected to the Line
+
+        Parameters:
+        -----------
+        line: Line
+            the Line to be checked
+
+        Returns
+        -------
+        list[Node]
+            list of Nodes that are connected to the Line
+        """
+        vs = [v for v in self.getNodes() if v.get_coord() in line.getPoints()]
+        return vs
+
+    def addNode(self, node: Node, i=None):
+        """
+        Add a single Node in the Graph.
+
+        Adjacency matrix is expanded along the way.
+
+        Parameters:
+        -----------
+        node: Node
+            the Node to be added
+        i: int
+            position in the Node list, the Node is appended if not given
+        """
+        if (node not in self._Nodes):
+            if (i is None):
+                i = len(self._Nodes)
+            self._Nodes.insert(i, node)
+            self._coords = np.insert(
+                self._coords, i, node.get_coord(), axis=0)
+            self._adj_matrix = np.insert(self._adj_matrix, i, 0, axis=0)
+            self._adj_matrix = np.insert(self._adj_matrix, i, 0, axis=1)
+            for listener in self._listeners:
+                listener.on_add_node(node, i)
+
+    def removeNode(self, node: Node):
+        """
+        Remove a Node from a Graph.
+
+        Adjacency matrix is changed along the way.
+
+        Parameters:
+        -----------
+        node: Node
+            the Node to be added
+        """
+        assert (node in self._Nodes)
+        for other in self.adj(node):
+            self.disconnect(node, other)
+        i = self._Nodes.index(node)
+        self._coords = np.delete(self._coords, (i), axis=0)
+        self._adj_matrix = np.delete(self._adj_matrix, (i), axis=0)
+        self._adj_matrix = np.delete(self._adj_matrix, (i), axis=1)
+        self._Nodes.remove(node)
+        for listener in self._listeners:
+            listener.on_remove_node(node, i)
+        del node
+
+    def addLine(self, line: Line):
+        """
+        Add a Line to the Line list
+
+        Parameters:
+        -----------
+        line: Line
+            the Line
+        """
+        self.getLines().append(line)
+
+    def delLine(self, line: Line):
+        """
+        delete a Line in the Line list
+
+        Parameters:
+        -----------
+        line: Line
+            the Line
+        """
+        assert (line in self.getLines())
+        self.getLines().remove(line)
+        del line
+
+    def is_connected(self, node1: Node, node2: Node) -> bool:
+        """
+        Check if two Nodes are connected in a Graph.
+
+        Parameters:
+        -----------
+        node1: Node
+            first node
+        node2: Node
+            second node
+
+        Returns
+        -------
+        bool
+            whether node1 and node2 are connected
+        """
+        assert (node1 in self._Nodes and node2 in self._Nodes)
+        i = self._Nodes.index(node1)
+        j = self._Nodes.index(node2)
+        return self._adj_matrix[i][j] == 1
+
+    def deg(self, node: Node) -> int:
+        """
+        Get the degree of a Node in a Graph, i.e. number of Nodes connected to it
+
+        Parameters:
+        -----------
+        node: Node
+            the node
+
+        Returns
+        -------
+        int
+            degree of node
+        """
+        assert (node in self._Nodes)
+        i = self._Nodes.index(node)
+        return np.sum(self._adj_matrix[i])
+
+    def angle(self, node1: Node, node2: Node, node3: Node) -> float:
+        """
+        Get the angle of (node1, node2, node3), where node2 is the center
+
+        The angle is relative to the polygon formed by the graph and thus is possible to be greater equal 180 degree.
+
+        Parameters:
+        -----------
+        node1: Node
+            first node
+        node2: Node
+            second node
+        node3: Node
+            third node
+
+        Returns
+        -------
+        float
+            the degree value of the angle
+        """
+        # assume node2 is center
+        node1_rel = (node1.get_coord()[
+                     0] - node2.get_coord()[0]) + (node1.get_coord()[1] - node2.get_coord()[1]) * 1j
+        node3_rel = (node3.get_coord()[
+                     0] - node2.get_coord()[0]) + (node3.get_coord()[1] - node2.get_coord()[1]) * 1j
+        val3 = np.angle(node3_rel, deg=True)
+        val1 = np.angle(node1_rel, deg=True)
+        val = val1 - val3
+        if (val < 0):
+            val += 360
+        return val
+
+    def compute_ch(self):
+        """
+        Construct a convex hull of the graph.
+
+        (Not constructed directly, but the list of Nodes are given in order, such that
+        a convex hull can be constructed by simply connecting each node and its next one)
+
+        Algorithm used: Graham Scan
+
+        Returns
+        -------
+        list[node]
+            list of Nodes that forms the convex hull
+        """
+        # Graham Scan
+        if (len(self._Nodes) < 3):
+            return None
+        return [self._Nodes[i] for i in convex_hull(self._coords)]
+
+    def _line_edges(self):
+        """
+        Get the Lines of the Graph as pairs of Node indices, in the
+        direction they are stored in, None if an end point of a Line is
+        not a Node.
+        """
+        index = {tuple(c): i for i, c in enumerate(self._coords.tolist())}
+        try:
+            return [(index[tuple(line.getPoints()[0])],
+                     index[tuple(line.getPoints()[1])]) for line in self._Lines]
+        except KeyError:
+            return None
+
+    def _line_crossings(self):
+        """
+        Check which Lines of the Graph intersect, with Line.intersect()
+        on the Lines as they are stored, i.e. in their direction.
+
+        Returns
+        -------
+        numpy.ndarray
+            symmetric bool array over the Lines
+        """
+        edges = self._line_edges()
+        if (edges is not None and len(self._Lines) > 1
+                and all(i != j for i, j in edges)):
+            # pairs of point indices, results go through the CrossingCache
+            crossing = self.crossing_table().crossing_matrix(edges)
+        else:
+            segments = line_array(self._Lines)
+            crossing = segments_intersect(segments, segments)
+        return crossing
+
+    def crosses(self):
+        """
+        Find all the Lines that intersect in the Path
+
+        Returns
+        -------
+        list[Line]
+            A Line list, such that each intersects with at least one other in the list
+        """
+        pairs = np.argwhere(np.triu(self._line_crossings(), 1))
+        # order of first appearance, as when testing pair after pair
+        order = dict.fromkeys(pairs.ravel().tolist())
+        return [self._Lines[i] for i in order]
+
+    def order_type(self):
+        """
+        Get the OrderType of the point set of the Graph.
+
+        Like the CrossingTable it is kept as long as the coordinates
+        do not change and is shared with the clones of the Graph.
+
+        Returns
+        -------
+        OrderType
+        """
+        if (self._order is None or not self._order.matches(self._coords)):
+            self._order = OrderType(self._coords)
+        return self._order
+
+    def angular_order(self):
+        """
+        Get the AngularOrder of the point set of the Graph.
+
+        Returns
+        -------
+        AngularOrder
+        """
+        if (self._angular is None or not self._angular.matches(self._coords)):
+            self._angular = AngularOrder(self.order_type())
+        return self._angular
+
+    def crossing_table(self):
+        """
+        Get the CrossingTable of the point set of the Graph.
+
+        The table is kept as long as the coordinates do not change and
+        is shared with the clones of the Graph.
+
+        Returns
+        -------
+        CrossingTable
+        """
+        if (self._table is None or not self._table.matches(self._coords)):
+            self._table = CrossingTable(
+                self._coords, order_type=self.order_type())
+        return self._table
+
+    def has_crossing(self):
+        """
+        Check if any two Lines of the Graph intersect.
+
+        Same as bool(self.crosses()), without building the Line list.
+
+        Returns
+        -------
+        bool
+        """
+        return bool(self._line_crossings().any())
+
+    def edge_mask(self):
+        """
+        Get the edges of the Graph as a bitset over the CrossingTable.
+
+        Returns
+        -------
+        EdgeMask
+        """
+        return EdgeMask.from_edges(self.crossing_table(), self.edge_array())
+
+    def connect(self, node1: Node, node2: Node):
+        """
+        Overloaded method of Graph.connect()
+
+        Parameters:
+        ----------
+        node1: Node
+            first Node
+        node2: Node
+            second Node
+        """
+        # assert(node1 in self._Nodes and node2 in self._Nodes)
+        i = self._Nodes.index(node1)
+        j = self._Nodes.index(node2)
+        if (not Line(node1.get_coord(), node2.get_coord()) in self._Lines):
+            self.addLine(Line(node1.get_coord(), node2.get_coord()))
+        changed = self._adj_matrix[i][j] == 0
+        self._adj_matrix[i][j] = 1
+        self._adj_matrix[j][i] = 1
+        if (changed):
+            for listener in self._listeners:
+                listener.on_connect(node1, node2)
+
+    def disconnect(self, node1: Node, node2: Node):
+        """
+        Overloaded method of Graph.disconnect()
+
+        Parameters:
+        ----------
+        node1: Node
+            first Node
+        node2: Node
+            second Node
+        """
+        assert (node1 in self._Nodes and node2 in self._Nodes)
+        i = self._Nodes.index(node1)
+        j = self._Nodes.index(node2)
+        if (Line(node1.get_coord(), node2.get_coord()) in self._Lines):
+            self.delLine(Line(node1.get_coord(), node2.get_coord()))
+        changed = self._adj_matrix[i][j] == 1
+        self._adj_matrix[i][j] = 0
+        self._adj_matrix[j][i] = 0
+        if (changed):
+            for listener in self._listeners:
+                listener.on_disconnect(node1, node2)
+
+    def snapshot(self):
+        """
+        Get the state of the Graph without copying its Nodes.
+
+        Returns
+        -------
+        tuple
+            Node list and adjacency matrix
+        """
+        return (list(self._Nodes), self._adj_matrix.copy())
+
+    def restore(self, state):
+        """
+        Bring the Graph back to a state taken by snapshot().
+
+        Lines are rebuilt from the coordinates of the Nodes.
+
+        Parameters:
+        -----------
+        state: tuple
+            the state
+        """
+        self._Nodes = list(state[0])
+        self._coords = coord_array(self._Nodes)
+        self._adj_matrix = state[1].copy()
+        self._Lines = [Line(self._Nodes[i].get_coord(),
+                            self._Nodes[j].get_coord())
+                       for i, j in self.edge_array()]
+
+    def __repr__(self):
+        return "Nodes: " + str(self._Nodes) + "\nLines: " + str(self._Lines) + \
             "\nAdj. Matrix: \n" + str(self._adj_matrix) + "\n"
 
-    def __eq__(self, graph):
-        if (graph is not None):
-            return Counter(
-                self._Nodes) == Counter(
-                graph._Nodes) and Counter(
-                self._Lines) == Counter(
-                graph._Lines)
+    def __eq__(self, graph):
+        if (graph is not None):
+            return Counter(
+                self._Nodes) == Counter(
+                graph._Nodes) and Counter(
+                self._Lines) == Counter(
+                graph._Lines)
+
+    def __hash__(self):
+        return hash((tuple(self._Nodes), tuple(self._Lines)))
+
+    def clone(self):
+        """
+        Copy the Graph.
+
+        Nodes, Lines and the coordinate array are shared with the copy,
+        only the lists and the adjacency matrix are copied.
+
+        Returns
+        -------
+        Graph
+            the copy, of the same class as the Graph
+        """
+        graph = self.__class__.__new__(self.__class__)
+        graph.__dict__.update(self.__dict__)
+        graph._Nodes = list(self._Nodes)
+        graph._Lines = list(self._Lines)
+        graph._adj_matrix = self._adj_matrix.copy()
+        graph._listeners = []
+        return graph
+
+    def __copy__(self):
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def __getstate__(self):
+        # listeners belong to the original Graph, copies start without
+        state = self.__dict__.copy()
+        state["_listeners"] = []
+        return state
+
+    def toJson(self):
+        return json.dumps(self, default=lambda o: o.__dict__)
+
+
+class Path(Graph):
+
+    def __init__(self, Nodes=[], start=None, end=None, Lines=[]):
+        """
+        the Path class.
+
+        Built upon the Graph class, this class offers additional functionalities
+        specified for the thesis, i.e. path detection, cross detection, etc.
+
+        Parameters:
+        -----------
+        Nodes: list[Node]
+            Node list
+        start: Node
+            the starting Node of the Path
+        end: Node
+            the Node other than "start" of the Path
+            (Note: start and end are in most cases interchangeable)
+        Lines: list[Line]
+            Line list
+        """
+        super().__init__(Nodes)
+        self._start = start
+        self._end = end
+
+    @classmethod
+    def from_points(cls, points, edges):
+        """
+        Overloaded method of Graph.from_points()
+
+        The Nodes of degree 1 become start and end Node.
+
+        Parameters:
+        -----------
+        points: PointSet
+            the points
+        edges: numpy.ndarray
+            m x 2 array of Node indices, each edge given once
+
+        Returns
+        -------
+        Path
+        """
+        path = super().from_points(points, edges)
+        edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+        deg = np.bincount(edges.ravel(), minlength=len(points))
+        ends = np.flatnonzero(deg == 1)
+        path._start, path._end = None, None
+        if (len(ends) == 2):
+            path._start, path._end = points.node(ends[0]), points.node(ends[1])
+        elif (len(points) == 1):
+            path._start, path._end = points.node(0), points.node(0)
+        return path
+
+    @classmethod
+    def from_order(cls, order, points=None):
+        """
+        Create the Path visiting Nodes in the given order.
+
+        Parameters:
+        -----------
+        order: list[Node]
+            the Nodes in the order of the Path, or indices of points
+        points: PointSet
+            the points the indices refer to, if order is not a list of Nodes
+
+        Returns
+        -------
+        Path
+        """
+        if (points is None):
+            points = PointSet.from_nodes(order)
+            order = np.arange(len(order))
+        order = np.asarray(order, dtype=np.intp)
+        path = cls.from_points(
+            points, np.column_stack((order[:-1], order[1:])))
+        if (len(order) > 0):
+            path._start = points.node(order[0])
+            path._end = points.node(order[-1])
+        return path
+
+    def getStart(self):
+        """
+        Get the start Node of the Path
+
+        Returns
+        -------
+        Node
+            start Node
+        """
+        return self._start
+
+    def getEnd(self):
+        """
+        Get the end Node of the Path
+
+        Returns
+        -------
+        Node
+            end Node
+        """
+        return self._end
+
+    def setEnds(self, start: Node, end: Node):
+        """
+        Set the start and end Node of the Path
+
+        Parameters:
+        -----------
+        start: Node
+            start Node
+        end: Node
+            end Node
+        """
+        self._start = start
+        self._end = end
+
+    def snapshot(self):
+        """
+        Overloaded method of Graph.snapshot()
+
+        Returns
+        -------
+        tuple
+            Node list, adjacency matrix, start and end Node
+        """
+        return super().snapshot() + (self._start, self._end)
+
+    def restore(self, state):
+        """
+        Overloaded method of Graph.restore()
+
+        Parameters:
+        -----------
+        state: tuple
+            the state
+        """
+        super().restore(state)
+        self._start, self._end = state[2], state[3]
+
+    def expandPath(self, node: Node):
+        """
+        Extend the Path from the Node by one vertex and edge.
+        Start and ende Nodes are changed along the function call.
+
+        Parameters:
+        -----------
+        node: Node
+            the node
+        """
+        if (len(self.getNodes()) == 0):
+            self.addNode(node)
+            self._start = node
+            self._end = node
+        else:
+            self.addNode(node)
+            self.connect(self._end, node)
+            self._end = node
+
+    def is_spanning_path(self):
+        """
+        Determine whether the Path graph is a spanning path.
+        i.e. a path that go through all Nodes
+
+        Returns
+        -------
+        bool
+            whether the Path is a spanning path
+        """
+        n = len(self._Nodes)
+        deg = self._adj_matrix.sum(axis=1)
+        endpoints = np.flatnonzero(deg == 1)
+        if (len(endpoints) != 2 or np.count_nonzero(deg == 2) != n - 2):
+            return False
+        else:
+            self._start = self._Nodes[endpoints[0]]
+            self._end = self._Nodes[endpoints[1]]
+            # walk along the path starting from _start
+            return len(self._walk()) == n
+
+    def _walk(self):
+        """
+        Walk along the Path from the start Node.
+
+        Returns
+        -------
+        numpy.ndarray
+            indices of the Nodes in the order of the walk
+        """
+        return path_walk(self.edge_array(), len(self._Nodes),
+                         self._Nodes.index(self._start))
+
+    def path_node_order(self):
+        """
+        Get the list of nodes ordered as in the path.
+
+        Returns
+        ---------
+        list[Node]
+            The list of nodes
+        """
+        assert (self.is_spanning_path())
+        return [self._Nodes[i] for i in self._walk()]
+
+    def evaluate_flip(self, remove, add, layers=None):
+        """
+        Find out what a flip would do to the Path, without doing it.
+
+        The Path is left as it is, the answer comes from the adjacency
+        matrix, the CrossingTable and the LayerIndex only.
+
+        Parameters:
+        -----------
+        remove: tuple[Node]
+            the end points of the edge to remove, an edge of the Path
+        add: tuple[Node]
+            the end points of the edge to add
+        layers: LayerIndex
+            the layer set, to get the layer edge vector and the layer
+            connectivity matrix after the flip
+
+        Returns
+        -------
+        FlipEvaluation
+        """
+        n = len(self._Nodes)
+        i, j = self._Nodes.index(remove[0]), self._Nodes.index(remove[1])
+        k, l = self._Nodes.index(add[0]), self._Nodes.index(add[1])
+        if (self._adj_matrix[i][j] == 0 or k == l
+                or (self._adj_matrix[k][l] == 1 and {i, j} != {k, l})):
+            return FlipEvaluation(False, False)
+        edges = self.edge_array()
+        edges = edges[~(((edges[:, 0] == i) & (edges[:, 1] == j))
+                        | ((edges[:, 0] == j) & (edges[:, 1] == i)))]
+        edges = np.concatenate((edges, [[min(k, l), max(k, l)]]))
+        deg = np.bincount(edges.ravel(), minlength=n)
+        ends = np.flatnonzero(deg == 1)
+        spanning = (len(ends) == 2 and np.count_nonzero(deg == 2) == n - 2
+                    and len(path_walk(edges, n, ends[0])) == n)
+        # the Lines keep their direction and the new one goes from k to
+        # l, as after disconnect() and connect(), so that the result is
+        # the one of has_crossing()
+        lines = self._line_edges()
+        if (lines is None):
+            crossing = self.crossing_table().has_crossing(edges)
+        else:
+            lines = [e for e in lines if {e[0], e[1]} != {i, j}] + [(k, l)]
+            crossing = bool(
+                self.crossing_table().crossing_matrix(lines).any())
+        if (layers is None):
+            return FlipEvaluation(spanning, crossing)
+        edge_vector = layers.layer_edge_vector(self, edges)
+        cross_matrix = layers.layer_cross_matrix(self, edges)
+        canonical = (np.array_equal(edge_vector, layers.bound_target())
+                     and np.array_equal(cross_matrix, layers.reference_matrix()))
+        return FlipEvaluation(spanning, crossing, edge_vector, cross_matrix,
+                              canonical)
+
+    def reconnections(self, node1: Node, node2: Node):
+        """
+        Get the edges which make the Path a spanning path again after
+        the edge between two Nodes is removed.
+
+        Parameters:
+        -----------
+        node1: Node
+            first Node of the edge
+        node2: Node
+            second Node of the edge
+
+        Returns
+        -------
+        list[tuple[Node]]
+            pairs of Nodes, one end of each of the two parts of the Path,
+            without the removed edge
+        """
+        if (not self.is_spanning_path()):
+            return []
+        order = self._walk()
+        position = np.empty(len(order), dtype=int)
+        position[order] = np.arange(len(order))
+        i, j = sorted([position[self._Nodes.index(node1)],
+                       position[self._Nodes.index(node2)]])
+        if (j != i + 1):
+            return []
+        pairs = []
+        for a in dict.fromkeys([order[0], order[i]]):
+            for b in dict.fromkeys([order[j], order[-1]]):
+                if ((a, b) != (order[i], order[j])):
+                    pairs.append((self._Nodes[a], self._Nodes[b]))
+        return pairs
+
+
+class FlipEvaluation:
+
+    def __init__(self, spanning, crossing, edge_vector=None,
+                 cross_matrix=None, canonical=None):
+        """
+        the FlipEvaluation class.
+
+        What a flip would do to a Path, see Path.evaluate_flip().
+        It is true if the flip leads to a spanning path without crossings.
+
+        Parameters:
+        -----------
+        spanning: bool
+            whether the Path would be a spanning path
+        crossing: bool
+            whether two edges of the Path would intersect
+        edge_vector: numpy.ndarray(int)
+            layer edge vector after the flip, None without layers
+        cross_matrix: numpy.ndarray(int)
+            layer connectivity matrix after the flip, None without layers
+        canonical: bool
+            whether the Path would be a canonical path, None without layers
+        """
+        self.spanning = spanning
+        self.crossing = crossing
+        self.valid = spanning and not crossing
+        self.edge_vector = edge_vector
+        self.cross_matrix = cross_matrix
+        self.canonical = None if canonical is None else (
+            canonical and self.valid)
+
+    def __bool__(self):
+        return bool(self.valid)
+
+    def __repr__(self):
+        return "FlipEvaluation(valid=" + str(self.valid) + \
+            ", canonical=" + str(self.canonical) + ")"
+
+
+class CrossingCache:
+    # entries of a set, the key is searched in all of them at once
+    WAYS = 4
+    # default number of entries
+    CAPACITY = 1 << 20
+
+    def __init__(self, capacity=None):
+        """
+        The CrossingCache class.
+
+        Bounded cache of results of the intersection test for pairs of
+        segments, keyed by an integer id of the pair.
+
+        The cache is a hash table of sets of WAYS entries and works on
+        arrays of keys. A missing result replaces the first entry of its
+        set from the hand of the set on that was not used since the hand
+        last passed it (CLOCK). The entries passed lose their mark, when
+        all of them were used the one under the hand is replaced. The
+        hand then moves on past the new entry.
+
+        The arrays are allocated when the first result is stored.
+
+        Parameters:
+        -----------
+        capacity: int
+            number of entries, rounded up to a power of two,
+            CAPACITY if not given
+        """
+        capacity = self.CAPACITY if capacity is None else capacity
+        sets = 1
+        while (sets * self.WAYS < capacity):
+            sets *= 2
+        self._set_count = sets
+        self._keys = None
+        self.hits = 0
+        self.misses = 0
+
+    def capacity(self):
+        """
+        Get the number of entries of the cache.
+
+        Returns
+        -------
+        int
+        """
+        return self._set_count * self.WAYS
+
+    def _allocate(self):
+        sets = self._set_count
+        self._keys = np.full((sets, self.WAYS), -1, dtype=np.int64)
+        self._values = np.zeros((sets, self.WAYS), dtype=bool)
+        self._used = np.zeros((sets, self.WAYS), dtype=bool)
+        self._hand = np.zeros(sets, dtype=np.int64)
+
+    def _sets(self, keys):
+        """
+        Get the sets of keys by multiplicative hashing.
+        """
+        hashed = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        return (hashed >> np.uint64(32)).astype(np.int64) \
+            & (self._set_count - 1)
+
+    def lookup(self, keys, compute):
+        """
+        Get the results for keys, computing the ones not in the cache.
+
+        Parameters:
+        -----------
+        keys: numpy.ndarray
+            non-negative int64 keys
+        compute: callable
+            takes an array of positions in keys and returns
+            the results for the keys there
+
+        Returns
+        -------
+        numpy.ndarray
+            bool array of the results
+        """
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        result = np.zeros(len(keys), dtype=bool)
+        if (len(keys) == 0):
+            return result
+        if (self._keys is None):
+            self._allocate()
+        sets = self._sets(keys)
+        ways = self._keys[sets] == keys[:, None]
+        found = ways.any(axis=1)
+        hit_sets, hit_ways = sets[found], np.argmax(ways[found], axis=1)
+        result[found] = self._values[hit_sets, hit_ways]
+        self._used[hit_sets, hit_ways] = True
+        missing = np.flatnonzero(~found)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if (len(missing) > 0):
+            values = np.asarray(compute(missing), dtype=bool)
+            result[missing] = values
+            self._store(keys[missing], values)
+        return result
+
+    def _store(self, keys, values):
+        """
+        Put results into the cache.
+
+        Keys of the same set are stored one after the other, so that
+        each one moves the hand of the set on and none of them replaces
+        another one of the same call while the set has room.
+        """
+        keys, first = np.unique(keys, return_index=True)
+        values = values[first]
+        sets = self._sets(keys)
+        while (len(keys) > 0):
+            # one key per set in each round
+            _, first = np.unique(sets, return_index=True)
+            rows, hand = sets[first], self._hand[sets[first]]
+            ways = (hand[:, None] + np.arange(self.WAYS)) % self.WAYS
+            used = self._used[rows[:, None], ways]
+            # the first way from the hand on that was not used, the
+            # ones passed lose their mark; if all were used, the one
+            # under the hand
+            offset = np.argmin(used, axis=1)
+            passed = (np.arange(self.WAYS) < offset[:, None]) \
+                | used.all(axis=1)[:, None]
+            self._used[np.broadcast_to(rows[:, None], ways.shape)[passed],
+                       ways[passed]] = False
+            way = (hand + offset) % self.WAYS
+            self._keys[rows, way] = keys[first]
+            self._values[rows, way] = values[first]
+            self._used[rows, way] = False
+            self._hand[rows] = (way + 1) % self.WAYS
+            rest = np.ones(len(keys), dtype=bool)
+            rest[first] = False
+            keys, values, sets = keys[rest], values[rest], sets[rest]
+
+    def hit_rate(self):
+        """
+        Get the share of looked up keys that were found in the cache.
+
+        Returns
+        -------
+        float
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def clear(self):
+        """
+        Remove all entries and reset the statistics.
+        """
+        self._keys = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        if (self._keys is None):
+            return 0
+        return int(np.count_nonzero(self._keys >= 0))
+
+    def __repr__(self):
+        return "CrossingCache: " + str(len(self)) + "/" + str(self.capacity()) \
+            + " entries, hit rate " + "{:.3f}".format(self.hit_rate())
+
+
+class CrossingTable:
+    # point sets with more segments keep no rows, see __init__()
+    MAX_SEGMENTS = 1 << 14
+
+    def __init__(self, coords, capacity=None, order_type=None):
+        """
+        The CrossingTable class.
+
+        For a fixed point set there are n(n-1)/2 possible segments. The
+        table stores for every segment the set of segments it crosses as a
+        packed bitset of uint64 words, so that checking a segment against
+        all edges of a graph is one AND with the edge mask of the graph.
+
+        Rows are computed from the OrderType when first needed,
+        segments go from the point with the smaller index to the other
+        one. (Line.intersect() may depend on the direction of the Lines
+        if an end point of one lies on the other.) A full table takes
+        O(n^4) bits, so for more than MAX_SEGMENTS segments no rows are
+        kept and single pairs of segments are tested instead. Those results, and the ones of crossing_matrix(), are
+        kept in a CrossingCache.
+
+        Parameters:
+        -----------
+        coords: numpy.ndarray
+            n x 2 array of coordinates, point i is the i-th Node of
+            the graphs the table is used with
+        capacity: int
+            number of entries of the CrossingCache, by default one per
+            key of a pair of segments, at most CrossingCache.CAPACITY
+        order_type: OrderType
+            the OrderType of the point set, created if not given
+        """
+        self._coords = np.array(coords).reshape(-1, 2)
+        n = len(self._coords)
+        self._n = n
+        self._size = n * (n - 1) // 2
+        self._words = max((self._size + 63) // 64, 1)
+        if (capacity is None):
+            # a pair of segments has 4 keys, one per direction of each
+            capacity = min(CrossingCache.CAPACITY, 4 * self._size * self._size)
+        self._cache = CrossingCache(capacity)
+        if (order_type is None or not order_type.matches(self._coords)):
+            order_type = OrderType(self._coords)
+        self._order = order_type
+        self._rows = None
+        if (self._size <= self.MAX_SEGMENTS):
+            self._segments = np.column_stack(np.triu_indices(n, 1))
+            self._rows = np.zeros((self._size, self._words), dtype=np.uint64)
+            self._known = np.zeros(self._size, dtype=bool)
+
+    def matches(self, coords):
+        """
+        Check if the table belongs to a point set.
+
+        Parameters:
+        -----------
+        coords: numpy.ndarray
+            n x 2 array of coordinates
+
+        Returns
+        -------
+        bool
+        """
+        return np.array_equal(coords, self._coords)
+
+    def getCache(self):
+        """
+        Get the cache of pairwise results.
+
+        Returns
+        -------
+        CrossingCache
+        """
+        return self._cache
+
+    def segment_ids(self, edges):
+        """
+        Get the ids of segments.
+
+        Parameters:
+        -----------
+        edges: numpy.ndarray
+            m x 2 array of point indices
+
+        Returns
+        -------
+        numpy.ndarray
+            m array of segment ids
+        """
+        edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2))
+        i, j = edges[:, 0], edges[:, 1]
+        return i * (2 * self._n - i - 1) // 2 + (j - i - 1)
+
+    def endpoints(self, ids):
+        """
+        Get the point indices of segments, inverse of segment_ids().
+
+        Parameters:
+        -----------
+        ids: numpy.ndarray
+            segment ids
+
+        Returns
+        -------
+        numpy.ndarray
+            m x 2 array of point indices, the smaller one first
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        n = self._n
+        i = n - 2 - np.floor(
+            np.sqrt(4.0 * n * (n - 1) - 8.0 * ids - 7) / 2 - 0.5).astype(np.int64)
+        # correct rounding of the square root
+        i -= ids < i * (2 * n - i - 1) // 2
+        i += ids >= (i + 1) * (2 * n - i - 2) // 2
+        j = ids - i * (2 * n - i - 1) // 2 + i + 1
+        return np.column_stack((i, j))
+
+    def mask(self, edges):
+        """
+        Get the bitset of a set of segments.
+
+        Parameters:
+        -----------
+        edges: numpy.ndarray
+            m x 2 array of point indices
+
+        Returns
+        -------
+        numpy.ndarray
+            bitset as uint64 words
+        """
+        ids = self.segment_ids(edges)
+        words = np.zeros(self._words, dtype=np.uint64)
+        np.bitwise_or.at(words, ids // 64,
+                         np.left_shift(np.uint64(1), (ids % 64).astype(np.uint64)))
+        return words
+
+    def rows(self, ids):
+        """
+        Get the bitsets of the segments crossing the given segments.
+
+        Only available for at most MAX_SEGMENTS segments.
+
+        Parameters:
+        -----------
+        ids: numpy.ndarray
+            segment ids
+
+        Returns
+        -------
+        numpy.ndarray
+            len(ids) x words uint64 array
+        """
+        if (self._rows is None):
+            raise ValueError("The table keeps no rows for "
+                             + str(self._size) + " segments")
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        missing = np.unique(ids[~self._known[ids]])
+        chunk = max(1, (1 << 20) // max(self._size, 1))
+        for s in range(0, len(missing), chunk):
+            part = missing[s:s + chunk]
+            crossing = self._order.intersect(
+                np.repeat(self._segments[part], self._size, axis=0),
+                np.tile(self._segments, (len(part), 1)))
+            bits = np.packbits(crossing.reshape(len(part), self._size),
+                               axis=1, bitorder="little")
+            padded = np.zeros((len(part), self._words * 8), dtype=np.uint8)
+            padded[:, :bits.shape[1]] = bits
+            self._rows[part] = padded.view("<u8")
+            self._known[part] = True
+        return self._rows[ids]
+
+    def pairs(self, first, second, reversed_first=None, reversed_second=None):
+        """
+        Check pairs of segments for intersection, the i-th segment
+        of first with the i-th segment of second.
+
+        Results are looked up in and added to the CrossingCache, the key
+        of a pair is made of both segment ids and their directions.
+
+        Parameters:
+        -----------
+        first: numpy.ndarray
+            segment ids
+        second: numpy.ndarray
+            segment ids
+        reversed_first: numpy.ndarray
+            bool array, which segments of first go from the point with
+            the larger index to the other one
+        reversed_second: numpy.ndarray
+            the same for second
+
+        Returns
+        -------
+        numpy.ndarray
+            bool array
+        """
+        first = np.asarray(first, dtype=np.int64).reshape(-1)
+        second = np.asarray(second, dtype=np.int64).reshape(-1)
+        flip_first = np.zeros(len(first), dtype=np.int64) \
+            if reversed_first is None else np.asarray(reversed_first, dtype=np.int64)
+        flip_second = np.zeros(len(second), dtype=np.int64) \
+            if reversed_second is None else np.asarray(reversed_second, dtype=np.int64)
+        # the predicate is symmetric in its two segments
+        swap = first > second
+        low, high = np.where(swap, second, first), np.where(swap, first, second)
+        flip_low = np.where(swap, flip_second, flip_first)
+        flip_high = np.where(swap, flip_first, flip_second)
+
+        def compute(k):
+            a = self.endpoints(low[k])
+            b = self.endpoints(high[k])
+            a[flip_low[k] == 1] = a[flip_low[k] == 1][:, ::-1]
+            b[flip_high[k] == 1] = b[flip_high[k] == 1][:, ::-1]
+            return self._order.intersect(a, b)
+        return self._cache.lookup(
+            (low * self._size + high) * 4 + flip_low * 2 + flip_high, compute)
+
+    def crossing_matrix(self, edges):
+        """
+        Check which segments of a set cross each other.
+
+        Unlike the rows of the table, the segments go from
+        the first to the second point of each edge.
+
+        Parameters:
+        -----------
+        edges: numpy.ndarray
+            m x 2 array of point indices
+
+        Returns
+        -------
+        numpy.ndarray
+            symmetric m x m bool array
+        """
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        ids = self.segment_ids(edges)
+        flips = edges[:, 0] > edges[:, 1]
+        first, second = np.triu_indices(len(ids), 1)
+        matrix = np.zeros((len(ids), len(ids)), dtype=bool)
+        matrix[first, second] = self.pairs(ids[first], ids[second],
+                                           flips[first], flips[second])
+        return matrix | matrix.T
+
+    def segments(self, mask):
+        """
+        Get the ids of the segments in a bitset.
+
+        Parameters:
+        -----------
+        mask: numpy.ndarray
+            bitset of segments
+
+        Returns
+        -------
+        numpy.ndarray
+            segment ids in increasing order
+        """
+        bits = np.unpackbits(mask.view(np.uint8), bitorder="little")
+        return np.flatnonzero(bits[:self._size])
+
+    def crosses(self, edges, mask):
+        """
+        Check for segments if they cross any segment of a bitset.
+
+        Parameters:
+        -----------
+        edges: numpy.ndarray
+            m x 2 array of point indices
+        mask: numpy.ndarray
+            bitset of segments, e.g. the edges of a graph
+
+        Returns
+        -------
+        numpy.ndarray
+            m bool array
+        """
+        ids = self.segment_ids(edges)
+        if (self._rows is not None):
+            return np.any(self.rows(ids) & mask, axis=1)
+        others = self.segments(mask)
+        crossing = self.pairs(np.repeat(ids, len(others)),
+                              np.tile(others, len(ids)))
+        return crossing.reshape(len(ids), len(others)).any(axis=1)
+
+    def has_crossing(self, edges):
+        """
+        Check if any two of the segments cross.
+
+        Parameters:
+        -----------
+        edges: numpy.ndarray
+            m x 2 array of point indices
+
+        Returns
+        -------
+        bool
+        """
+        if (self._rows is None):
+            return bool(self.crossing_matrix(edges).any())
+        return bool(np.any(self.crosses(edges, self.mask(edges))))
+
+    def __len__(self):
+        return self._size
+
+
+class EdgeMask:
+
+    def __init__(self, table, words, order=None):
+        """
+        The EdgeMask class.
+
+        Edge set of a Path (or Graph) on a fixed point set, stored as a
+        bitset over all segments of a CrossingTable. Comparing, hashing
+        and checking crossings take O(n^2 / 64) word operations instead
+        of going through Nodes and Lines.
+
+        Parameters:
+        -----------
+        table: CrossingTable
+            the table of the point set
+        words: numpy.ndarray
+            the bitset as uint64 words
+        order: numpy.ndarray
+            indices of the points in the order of the Path, if known
+        """
+        self._table = table
+        self._words = words
+        self._order = order
+
+    @classmethod
+    def from_edges(cls, table, edges):
+        """
+        Create the EdgeMask of a set of edges.
+
+        Parameters:
+        -----------
+        table: CrossingTable
+            the table of the point set
+        edges: numpy.ndarray
+            m x 2 array of point indices
+
+        Returns
+        -------
+        EdgeMask
+        """
+        return cls(table, table.mask(edges))
+
+    @classmethod
+    def from_order(cls, table, order):
+        """
+        Create the EdgeMask of the Path visiting points in the given order.
+
+        Parameters:
+        -----------
+        table: CrossingTable
+            the table of the point set
+        order: list[int]
+            indices of the points in the order of the Path
+
+        Returns
+        -------
+        EdgeMask
+        """
+        order = np.asarray(order, dtype=np.int64)
+        return cls(table, table.mask(np.column_stack((order[:-1], order[1:]))),
+                   order)
+
+    def getWords(self):
+        """
+        Get the bitset.
+
+        Returns
+        -------
+        numpy.ndarray
+            uint64 words
+        """
+        return self._words
+
+    def getOrder(self):
+        """
+        Get the order of the points along the Path.
+
+        Returns
+        -------
+        numpy.ndarray
+            point indices, None if not known
+        """
+        return self._order
+
+    def distance(self, other):
+        """
+        Get the number of edges in exactly one of two edge sets.
+
+        For two spanning paths this is twice the number of edges
+        that have to be exchanged.
+
+        Parameters:
+        -----------
+        other: EdgeMask
+            the other edge set
+
+        Returns
+        -------
+        int
+        """
+        return int(np.unpackbits((self._words ^ other._words).view(np.uint8)).sum())
+
+    def crosses(self, edges):
+        """
+        Check for segments if they cross any edge of the set.
+
+        Parameters:
+        -----------
+        edges: numpy.ndarray
+            m x 2 array of point indices
+
+        Returns
+        -------
+        numpy.ndarray
+            m bool array
+        """
+        return self._table.crosses(edges, self._words)
+
+    def has_crossing(self):
+        """
+        Check if any two edges of the set cross.
+
+        Returns
+        -------
+        bool
+        """
+        return self._table.has_crossing(
+            self._table.endpoints(self._table.segments(self._words)))
+
+    def __len__(self):
+        return int(np.unpackbits(self._words.view(np.uint8)).sum())
+
+    def __eq__(self, other):
+        if (not isinstance(other, EdgeMask)):
+            return NotImplemented
+        return np.array_equal(self._words, other._words) and (
+            self._table is other._table
+            or self._table.matches(other._table._coords))
 
     def __hash__(self):
-        return hash((tuple(self._Nodes), tuple(self._Lines)))
+        return hash(self._words.tobytes())
 
-    def toJson(self):
-        return json.dumps(self, default=lambda o: o.__dict__)
+    def __repr__(self):
+        return "EdgeMask: " + str(self._table.segments(self._words))
 
 
-class Path(Graph):
+class LayerIndex:
 
-    def __init__(self, Nodes=[], start=None, end=None, Lines=[]):
+    def __init__(self, layers=[]):
         """
-        the Path class.
+        the LayerIndex class.
 
-        Built upon the Graph class, this class offers additional functionalities
-        specified for the thesis, i.e. path detection, cross detection, etc.
+        Holds the layer set (the iteratively constructed convex hulls)
+        and answers to which layer a Node or a Line belongs in O(1).
+
+        It is built once per layer computation and behaves like
+        the list of layers otherwise.
 
         Parameters:
         -----------
-        Nodes: list[Node]
-            Node list
-        start: Node
-            the starting Node of the Path
-        end: Node
-            the Node other than "start" of the Path
-            (Note: start and end are in most cases interchangeable)
-        Lines: list[Line]
-            Line list
+        layers: list[Graph]
+            the layer set, from the outermost to the innermost layer
+        """
+        self._layers = list(layers)
+        self._point_layer = {}
+        self._point_position = {}
+        self._line_layer = {}
+        for i, layer in enumerate(self._layers):
+            for j, node in enumerate(layer.getNodes()):
+                self._point_layer[node.get_coord()] = i
+                self._point_position[node.get_coord()] = j
+            for line in layer.getLines():
+                self._line_layer[line.key()] = i
+        self._build_arrays()
+
+    @classmethod
+    def from_arrays(cls, coords, layers):
+        """
+        Create the LayerIndex from the point indices of every layer.
+
+        Parameters:
+        -----------
+        coords: numpy.ndarray
+            n x 2 array of coordinates
+        layers: list[list[int]]
+            indices of the points of every layer, in the order of the
+            layer, from the outermost to the innermost layer
+
+        Returns
+        -------
+        LayerIndex
+        """
+        graphs = []
+        for layer in layers:
+            k = len(layer)
+            edges = [(i, i + 1) for i in range(k - 1)]
+            if (k > 2):
+                edges.append((0, k - 1))
+            graphs.append(Graph.from_arrays(
+                coords[layer], np.array(edges, dtype=np.intp).reshape(-1, 2)))
+        return cls(graphs)
+
+    def _build_arrays(self):
+        """
+        Precompute the layer sizes, the layer edge vector and
+        the layer connectivity matrix a canonical path must have.
+        """
+        n = len(self._layers)
+        self._sizes = np.array(
+            [len(layer.getNodes()) for layer in self._layers], dtype=int)
+        self._bound = np.array(
+            [len(layer.getLines()) - 1 for layer in self._layers], dtype=int)
+        if (n > 0 and self._sizes[-1] in [1, 2]):
+            self._bound[-1] += 1
+        self._reference = np.eye(n, k=1, dtype=int) + \
+            np.eye(n, k=-1, dtype=int)
+        self._nodes = None
+        self._node_ids = None
+        self._node_pos = None
+
+    def getLayers(self):
+        """
+        Get the layer set.
+
+        Returns
+        -------
+        list[Graph]
+            the layer set
         """
-        super().__init__(Nodes)
-        self._start = start
-        self._end = end
+        return self._layers
 
-    def getStart(self):
+    def point_layer(self, point):
         """
-        Get the start Node of the Path
+        Get the layer id of a point.
+
+        Parameters:
+        -----------
+        point: tuple[int]
+            coordinate of the point
 
         Returns
         -------
-        Node
-            start Node
+        int
+            index of the layer, None if the point is in no layer
         """
-        return self._start
+        return self._point_layer.get(point)
 
-    def getEnd(self):
+    def node_layer(self, node: Node):
         """
-        Get the end Node of the Path
+        Get the layer id of a Node.
+
+        Parameters:
+        -----------
+        node: Node
+            the Node
 
         Returns
         -------
-        Node
-            end Node
+        int
+            index of the layer, None if the Node is in no layer
         """
-        return self._end
+        return self._point_layer.get(node.get_coord())
 
-    def expandPath(self, node: Node):
+    def node_position(self, node: Node):
         """
-        Extend the Path from the Node by one vertex and edge.
-        Start and ende Nodes are changed along the function call.
+        Get the position of a Node inside the Node list of its layer.
 
         Parameters:
         -----------
         node: Node
-            the node
+            the Node
+
+        Returns
+        -------
+        int
+            index of the Node in its layer, None if the Node is in no layer
         """
-        if (len(self.getNodes()) == 0):
-            self.addNode(node)
-            self._start = node
-            self._end = node
-        else:
-            self.addNode(node)
-            self.connect(self._end, node)
-            self._end = node
+        return self._point_position.get(node.get_coord())
 
-    def is_spanning_path(self):
+    def line_layer(self, line: Line):
         """
-        Determine whether the Path graph is a spanning path.
-        i.e. a path that go through all Nodes
+        Get the layer id of a Line.
+
+        Parameters:
+        -----------
+        line: Line
+            the Line
+
+        Returns
+        -------
+        int
+            index of the layer, None if the Line is not an edge of a layer
+        """
+        return self._line_layer.get(line.key())
+
+    def bound_target(self):
+        """
+        Get the layer edge vector of a canonical path.
+
+        Returns
+        -------
+        numpy.ndarray(int)
+            number of edges a canonical path has on each layer
+        """
+        return self._bound
+
+    def reference_matrix(self):
+        """
+        Get the layer connectivity matrix of a canonical path.
+
+        Returns
+        -------
+        numpy.ndarray(int)
+            tridiagonal matrix, i.e. exactly one edge between two
+            consecutive layers
+        """
+        return self._reference
+
+    def node_arrays(self, nodes):
+        """
+        Get the layer id and the position inside the layer of every Node.
+
+        The arrays are cached for the last Node list asked for.
+
+        Parameters:
+        -----------
+        nodes: list[Node]
+            the Node list of a Graph
+
+        Returns
+        -------
+        tuple[numpy.ndarray(int)]
+            layer ids and positions, aligned with the Node list
+        """
+        if (self._nodes is not nodes or len(self._node_ids) != len(nodes)):
+            self._nodes = nodes
+            self._node_ids = np.array(
+                [self._point_layer[node.get_coord()] for node in nodes],
+                dtype=int)
+            self._node_pos = np.array(
+                [self._point_position[node.get_coord()] for node in nodes],
+                dtype=int)
+        return self._node_ids, self._node_pos
+
+    def edge_layer_ids(self, graph: Graph, edges=None):
+        """
+        Get the layer ids of the end points of all edges of a Graph.
+
+        Parameters:
+        -----------
+        graph: Graph
+            the Graph
+        edges: numpy.ndarray
+            m x 2 array of Node indices to use instead of the edges
+            of the Graph
+
+        Returns
+        -------
+        tuple[numpy.ndarray]
+            layer ids of the first and second end points, and whether
+            the edge is an edge of a layer
+        """
+        ids, pos = self.node_arrays(graph.getNodes())
+        if (edges is None):
+            edges = graph.edge_array()
+        li = ids[edges[:, 0]]
+        lj = ids[edges[:, 1]]
+        d = np.abs(pos[edges[:, 0]] - pos[edges[:, 1]])
+        on_layer = (li == lj) & ((d == 1) | (d == self._sizes[li] - 1))
+        return li, lj, on_layer
+
+    def layer_edge_vector(self, graph: Graph, edges=None):
+        """
+        Get the number of edges of a Graph on each layer.
+
+        Parameters:
+        -----------
+        graph: Graph
+            the Graph
+        edges: numpy.ndarray
+            m x 2 array of Node indices to use instead of the edges
+            of the Graph
+
+        Returns
+        -------
+        numpy.ndarray(int)
+            number of edges on each layer
+        """
+        li, lj, on_layer = self.edge_layer_ids(graph, edges)
+        return np.bincount(li[on_layer], minlength=len(self._layers))
+
+    def layer_cross_matrix(self, graph: Graph, edges=None):
+        """
+        Get the number of edges of a Graph between each pair of layers.
+
+        Edges which are not an edge of a layer, but connect two nodes of
+        the same layer, are counted twice on the diagonal.
+
+        Parameters:
+        -----------
+        graph: Graph
+            the Graph
+        edges: numpy.ndarray
+            m x 2 array of Node indices to use instead of the edges
+            of the Graph
+
+        Returns
+        -------
+        numpy.ndarray(int)
+            symmetric matrix of edge counts between layers
+        """
+        li, lj, on_layer = self.edge_layer_ids(graph, edges)
+        n = len(self._layers)
+        arr = np.zeros((n, n), dtype=int)
+        li, lj = li[~on_layer], lj[~on_layer]
+        np.add.at(arr, (li, lj), 1)
+        np.add.at(arr, (lj, li), 1)
+        return arr
+
+    def clear(self):
+        """
+        Remove all layers.
+        """
+        self._layers.clear()
+        self._point_layer.clear()
+        self._point_position.clear()
+        self._line_layer.clear()
+        self._build_arrays()
+
+    def index(self, layer):
+        """
+        Get the layer id of a layer.
+
+        Parameters:
+        -----------
+        layer: Graph
+            the layer
+
+        Returns
+        -------
+        int
+            index of the layer
+        """
+        return self._layers.index(layer)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __iter__(self):
+        return iter(self._layers)
+
+    def __getitem__(self, i):
+        return self._layers[i]
+
+    def __repr__(self):
+        return "Layers: " + str(self._layers)
+
+
+class CanonicalTracker:
+
+    def __init__(self, path: Path, layers: LayerIndex):
+        """
+        the CanonicalTracker class.
+
+        Keeps the layer edge vector and the layer connectivity matrix
+        of a Path up to date while the Path is being flipped.
+
+        The tracker listens to the Path, every added or removed edge
+        updates both in O(1), so that the layer conditions of
+        a canonical path can be answered without recomputation.
+
+        Parameters:
+        -----------
+        path: Path
+            the Path to be tracked
+        layers: LayerIndex
+            the layer set of the Path
+        """
+        self._path = path
+        self._layers = layers
+        self._stale = False
+        self._bound = layers.layer_edge_vector(path)
+        self._cross = layers.layer_cross_matrix(path)
+        self._bound_bad = int(
+            np.count_nonzero(self._bound != layers.bound_target()))
+        self._cross_bad = int(
+            np.count_nonzero(self._cross != layers.reference_matrix()))
+        path.add_listener(self)
+
+    def detach(self):
+        """
+        Stop tracking the Path.
+        """
+        self._path.remove_listener(self)
+        self._stale = True
+
+    def tracks(self, path: Path, layers: LayerIndex):
+        """
+        Check if the tracker holds valid data for the Path and the layer set.
+
+        Parameters:
+        -----------
+        path: Path
+            the Path
+        layers: LayerIndex
+            the layer set
 
         Returns
         -------
         bool
-            whether the Path is a spanning path
         """
-        endpoints = [v for v in self._Nodes if self.deg(v) == 1]
-        innerpoints = [v for v in self._Nodes if self.deg(v) == 2]
-        if (len(endpoints) != 2 or len(innerpoints) != len(self._Nodes) - 2):
-            return False
-        else:
-            self._start = endpoints[0]
-            self._end = endpoints[1]
-            # run BFS starting from _start
-            queue = []
-            explored = [self._start]
-            queue.append(self._start)
-            while (len(queue) > 0):
-                v = queue.pop(0)
-                for w in self.adj(v):
-                    if (w not in explored):
-                        explored.append(w)
-                        queue.append(w)
-            if (len(explored) < len(self._Nodes)):
-                return False
-            else:
-                return True
+        return (not self._stale and path is self._path
+                and layers is self._layers)
 
-    def path_node_order(self):
+    def layer_edge_vector(self):
         """
-        Get the list of nodes ordered as in the path.
+        Get the layer edge vector of the Path.
 
         Returns
-        ---------
-        list[Node]
-            The list of nodes
+        -------
+        numpy.ndarray(int)
+            number of edges on each layer
         """
-        assert (self.is_spanning_path())
-        queue = []
-        explored = [self._start]
-        queue.append(self._start)
-        while (queue):
-            v = queue.pop(0)
-            for w in self.adj(v):
-                if (w not in explored):
-                    explored.append(w)
-                    queue.append(w)
-        return explored
+        return self._bound
+
+    def layer_cross_matrix(self):
+        """
+        Get the layer connectivity matrix of the Path.
+
+        Returns
+        -------
+        numpy.ndarray(int)
+            number of edges between each pair of layers
+        """
+        return self._cross
+
+    def is_canonical(self):
+        """
+        Check if the layer edge vector and the layer connectivity matrix
+        fulfill the conditions of a canonical path.
+
+        Returns
+        -------
+        bool
+        """
+        return self._bound_bad == 0 and self._cross_bad == 0
+
+    def _update(self, node1: Node, node2: Node, value):
+        """
+        Count an added (value 1) or removed (value -1) edge.
+        """
+        layers = self._layers
+        li = layers.node_layer(node1)
+        lj = layers.node_layer(node2)
+        if (li is None or lj is None):
+            self._stale = True
+            return
+        line = Line(node1.get_coord(), node2.get_coord())
+        if (layers.line_layer(line) is not None):
+            target = layers.bound_target()[li]
+            self._bound_bad -= self._bound[li] != target
+            self._bound[li] += value
+            self._bound_bad += self._bound[li] != target
+        else:
+            # edges inside a layer are counted twice on the diagonal
+            reference = layers.reference_matrix()
+            if (li == lj):
+                entries = [(li, li, 2 * value)]
+            else:
+                entries = [(li, lj, value), (lj, li, value)]
+            for i, j, k in entries:
+                self._cross_bad -= self._cross[i][j] != reference[i][j]
+                self._cross[i][j] += k
+                self._cross_bad += self._cross[i][j] != reference[i][j]
+
+    def on_connect(self, node1: Node, node2: Node):
+        self._update(node1, node2, 1)
+
+    def on_disconnect(self, node1: Node, node2: Node):
+        self._update(node1, node2, -1)
+
+    def on_add_node(self, node: Node, i):
+        # the layer set does not fit the Path anymore
+        self._stale = True
+
+    def on_remove_node(self, node: Node, i):
+        self._stale = True
@@ -0,0 +1,387 @@
+class EditStep:
+
+    def __init__(self, main_mode, sub_mode, start, end):
+        """
+        The EditStep class.
+
+        One undoable user action (or solver step), stored as the list of
+        edit operations it consists of.
+
+        Each operation is a tuple (kind, node1, node2), where kind is one of
+        "add_node", "remove_node", "connect", "disconnect" and "replace".
+        For node operations node2 is the index of the node in the Node list,
+        for "replace" both entries are a graph together with its snapshot
+        (see Graph.snapshot()), i.e. the graph before and after.
+
+        Parameters
+        ----------
+        main_mode: MainMode
+            main mode of the Canvas before the step
+        sub_mode: SubMode
+            sub mode of the Canvas before the step
+        start: Node
+            start Node of the path before the step
+        end: Node
+            end Node of the path before the step
+        """
+        self.ops = []
+        self.before = (main_mode, sub_mode, start, end)
+        self.after = None
+
+    def record(self, op):
+        """
+        Append an operation to the step.
+
+        Connecting and disconnecting the same pair of nodes cancel
+        each other out, so trial edits that are reverted within
+        the same step are not stored.
+
+        Parameters
+        ----------
+        op: tuple
+            the operation
+        """
+        kind = op[0]
+        if (kind in ["connect", "disconnect"]):
+            inverse = "disconnect" if kind == "connect" else "connect"
+            for i in range(len(self.ops) - 1, -1, -1):
+                other = self.ops[i]
+                if (other[0] not in ["connect", "disconnect"]):
+                    break
+                if ({other[1], other[2]} == {op[1], op[2]}):
+                    if (other[0] == inverse):
+                        del self.ops[i]
+                        return
+                    break
+        self.ops.append(op)
+
+    def is_empty(self):
+        """
+        Check if the step changes nothing.
+
+        Returns
+        -------
+        bool
+        """
+        return not self.ops and self.before == self.after
+
+
+class History:
+    # every CHECKPOINT_INTERVAL steps a full snapshot is kept
+    CHECKPOINT_INTERVAL = 50
+
+    def __init__(self):
+        """
+        The History class.
+
+        Undo/redo history of the Canvas stored as a log of edit operations.
+
+        Instead of copying the whole graph for every action, the history
+        listens to the graph and records which nodes were added or removed
+        and which edges were connected or disconnected. Undo and redo apply
+        these operations inversely or again, so the memory needed is
+        proportional to the number of changes.
+
+        Every CHECKPOINT_INTERVAL steps a snapshot of the graph is kept.
+        Snapshots share the Nodes with the graph, only the Node list and
+        the adjacency matrix are copied.
+        """
+        self._steps = []
+        self._cursor = 0
+        self._checkpoints = {}
+        self._graph = None
+        self._open = False
+
+    def can_undo(self):
+        """
+        Check if there is a step to undo.
+
+        Returns
+        -------
+        bool
+        """
+        return self._cursor > 0
+
+    def can_redo(self):
+        """
+        Check if there is a step to redo.
+
+        Returns
+        -------
+        bool
+        """
+        return self._cursor < len(self._steps)
+
+    def _attach(self, graph):
+        """
+        Start recording the changes of a graph.
+
+        Parameters
+        ----------
+        graph: Path
+            the graph
+        """
+        if (self._graph is not graph):
+            if (self._graph is not None):
+                self._graph.remove_listener(self)
+            self._graph = graph
+            graph.add_listener(self)
+
+    def _detach(self):
+        """
+        Stop recording the changes of the current graph.
+        """
+        if (self._graph is not None):
+            self._graph.remove_listener(self)
+            self._graph = None
+
+    def _close(self, graph, main_mode, sub_mode):
+        """
+        Close the currently recorded step.
+
+        Parameters
+        ----------
+        graph: Path
+            the graph after the step
+        main_mode: MainMode
+            main mode after the step
+        sub_mode: SubMode
+            sub mode after the step
+        """
+        if (self._open):
+            self._open = False
+            step = self._steps[self._cursor - 1]
+            step.after = (main_mode, sub_mode,
+                          graph.getStart(), graph.getEnd())
+            if (step.is_empty()):
+                self._steps.pop(self._cursor - 1)
+                self._cursor -= 1
+
+    def begin(self, graph, main_mode, sub_mode):
+        """
+        Start a new step, all following changes of the graph belong to it.
+
+        Steps that were undone before are discarded.
+
+        Parameters
+        ----------
+        graph: Path
+            the graph before the step
+        main_mode: MainMode
+            main mode before the step
+        sub_mode: SubMode
+            sub mode before the step
+        """
+        self._close(graph, main_mode, sub_mode)
+        del self._steps[self._cursor:]
+        for k in [k for k in self._checkpoints if k > self._cursor]:
+            del self._checkpoints[k]
+        if (self._cursor % self.CHECKPOINT_INTERVAL == 0):
+            self._checkpoints[self._cursor] = (
+                graph, graph.snapshot(), main_mode, sub_mode)
+        self._steps.append(EditStep(
+            main_mode, sub_mode, graph.getStart(), graph.getEnd()))
+        self._cursor += 1
+        self._open = True
+        self._attach(graph)
+
+    def replace(self, old_graph, new_graph):
+        """
+        Record that the graph was replaced by another one as part of
+        the current step.
+
+        Parameters
+        ----------
+        old_graph: Path
+            the graph before
+        new_graph: Path
+            the graph after
+        """
+        if (self._open):
+            self._steps[self._cursor - 1].record(
+                ("replace", (old_graph, old_graph.snapshot()),
+                 (new_graph, new_graph.snapshot())))
+        self._attach(new_graph)
+
+    def _apply(self, graph, op, inverse):
+        """
+        Apply an operation on the graph.
+
+        Parameters
+        ----------
+        graph: Path
+            the graph
+        op: tuple
+            the operation
+        inverse: bool
+            whether the operation is undone
+
+        Returns
+        -------
+        Path
+            the graph after the operation
+        """
+        kind, first, second = op
+        if (kind == "replace"):
+            graph, state = first if inverse else second
+            graph.restore(state)
+            return graph
+        if (inverse):
+            kind = {"add_node": "remove_node", "remove_node": "add_node",
+                    "connect": "disconnect", "disconnect": "connect"}[kind]
+        if (kind == "add_node"):
+            graph.addNode(first, second)
+        elif (kind == "remove_node"):
+            graph.removeNode(first)
+        elif (kind == "connect"):
+            graph.connect(first, second)
+        else:
+            graph.disconnect(first, second)
+        return graph
+
+    def undo(self, graph, main_mode, sub_mode):
+        """
+        Undo the last step.
+
+        Parameters
+        ----------
+        graph: Path
+            the current graph
+        main_mode: MainMode
+            the current main mode
+        sub_mode: SubMode
+            the current sub mode
+
+        Returns
+        -------
+        tuple[Path, MainMode, SubMode]
+            the graph and the modes before the step
+        """
+        self._close(graph, main_mode, sub_mode)
+        if (not self.can_undo()):
+            raise IndexError("Nothing to undo")
+        self._detach()
+        step = self._steps[self._cursor - 1]
+        for op in reversed(step.ops):
+            graph = self._apply(graph, op, True)
+        main_mode, sub_mode, start, end = step.before
+        graph.setEnds(start, end)
+        self._cursor -= 1
+        return graph, main_mode, sub_mode
+
+    def redo(self, graph, main_mode, sub_mode):
+        """
+        Redo the last undone step.
+
+        Parameters
+        ----------
+        graph: Path
+            the current graph
+        main_mode: MainMode
+            the current main mode
+        sub_mode: SubMode
+            the current sub mode
+
+        Returns
+        -------
+        tuple[Path, MainMode, SubMode]
+            the graph and the modes after the step
+        """
+        self._close(graph, main_mode, sub_mode)
+        if (not self.can_redo()):
+            raise IndexError("Nothing to redo")
+        self._detach()
+        step = self._steps[self._cursor]
+        for op in step.ops:
+            graph = self._apply(graph, op, False)
+        main_mode, sub_mode, start, end = step.after
+        graph.setEnds(start, end)
+        self._cursor += 1
+        return graph, main_mode, sub_mode
+
+    def __len__(self):
+        return len(self._steps)
+
+    def position(self):
+        """
+        Get the position of the cursor, i.e. the number of steps done.
+
+        Returns
+        -------
+        int
+        """
+        return self._cursor
+
+    def _checkpoint_before(self, position):
+        """
+        Get the position of the last checkpoint not after a position.
+
+        Parameters
+        ----------
+        position: int
+            the position
+
+        Returns
+        -------
+        int
+            None if there is no checkpoint
+        """
+        c = position - position % self.CHECKPOINT_INTERVAL
+        while (c >= 0 and c not in self._checkpoints):
+            c -= self.CHECKPOINT_INTERVAL
+        return c if c >= 0 else None
+
+    def seek(self, graph, main_mode, sub_mode, position):
+        """
+        Jump to a position of the history.
+
+        The graph is restored from the closest checkpoint before the
+        position and the remaining steps are redone, unless walking from
+        the current position needs fewer steps. So at most
+        CHECKPOINT_INTERVAL steps are applied.
+
+        Parameters
+        ----------
+        graph: Path
+            the current graph
+        main_mode: MainMode
+            the current main mode
+        sub_mode: SubMode
+            the current sub mode
+        position: int
+            the position, clamped to 0 ... len(self)
+
+        Returns
+        -------
+        tuple[Path, MainMode, SubMode]
+            the graph and the modes at the position
+        """
+        self._close(graph, main_mode, sub_mode)
+        position = min(max(position, 0), len(self._steps))
+        c = self._checkpoint_before(position)
+        if (c is not None and abs(position - self._cursor) > position - c):
+            graph, state, main_mode, sub_mode = self._checkpoints[c]
+            self._detach()
+            graph.restore(state)
+            self._cursor = c
+        while (self._cursor > position):
+            graph, main_mode, sub_mode = self.undo(graph, main_mode, sub_mode)
+        while (self._cursor < position):
+            graph, main_mode, sub_mode = self.redo(graph, main_mode, sub_mode)
+        return graph, main_mode, sub_mode
+
+    def on_add_node(self, node, i):
+        if (self._open):
+            self._steps[self._cursor - 1].record(("add_node", node, i))
+
+    def on_remove_node(self, node, i):
+        if (self._open):
+            self._steps[self._cursor - 1].record(("remove_node", node, i))
+
+    def on_connect(self, node1, node2):
+        if (self._open):
+            self._steps[self._cursor - 1].record(("connect", node1, node2))
+
+    def on_disconnect(self, node1, node2):
+        if (self._open):
+            self._steps[self._cursor - 1].record(("disconnect", node1, node2))
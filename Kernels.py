@@ -0,0 +1,365 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# number of segment pairs tested at once by segments_intersect()
+INTERSECT_CHUNK = 1 << 20
+
+# coordinates below this bound keep orientation products inside int64
+SAFE_COORD = 1 << 30
+
+
+def _is_clockwise(ax, ay, bx, by, cx, cy):
+    """
+    Elementwise version of the orientation test used by Line.intersect().
+    """
+    return np.asarray((cy - ay) * (bx - ax) > (by - ay) * (cx - ax),
+                      dtype=bool)
+
+
+def _same_point(ax, ay, bx, by):
+    """
+    Elementwise check if two points coincide.
+    """
+    return np.asarray(ax == bx, dtype=bool) & np.asarray(ay == by, dtype=bool)
+
+
+def _dtype(*arrays):
+    """
+    Get the integer type that is safe for orientation tests on arrays.
+    """
+    limit = max([np.abs(a).max() for a in arrays if len(a) > 0] + [0])
+    return np.int64 if limit < SAFE_COORD else object
+
+
+def segments_intersect(first, second, reduce=False, chunk=INTERSECT_CHUNK):
+    """
+    Check all pairs of two sets of segments for intersection.
+
+    Same as calling Line.intersect() on every pair: segments sharing an
+    end point do not intersect. Coordinates are compared as int64, or
+    as Python integers if they are too large for that.
+
+    Parameters:
+    -----------
+    first: numpy.ndarray
+        k x 4 array of segments (x1, y1, x2, y2)
+    second: numpy.ndarray
+        m x 4 array of segments (x1, y1, x2, y2)
+    reduce: bool
+        only report for each segment of first if it intersects any
+    chunk: int
+        maximal number of pairs tested at once
+
+    Returns
+    -------
+    numpy.ndarray
+        k x m bool array, or k bool array if reduce is set
+    """
+    first = np.asarray(first).reshape(-1, 4)
+    second = np.asarray(second).reshape(-1, 4)
+    k, m = len(first), len(second)
+    result = np.zeros(k if reduce else (k, m), dtype=bool)
+    if (k == 0 or m == 0):
+        return result
+    dtype = _dtype(first, second)
+    first = first.astype(dtype)
+    cx, cy, dx, dy = (c[None, :] for c in second.astype(dtype).T)
+    rows = max(1, chunk // m)
+    for s in range(0, k, rows):
+        ax, ay, bx, by = (c[:, None] for c in first[s:s + rows].T)
+        touching = _same_point(ax, ay, cx, cy) | _same_point(ax, ay, dx, dy) \
+            | _same_point(bx, by, cx, cy) | _same_point(bx, by, dx, dy)
+        block = (_is_clockwise(ax, ay, cx, cy, dx, dy)
+                 != _is_clockwise(bx, by, cx, cy, dx, dy)) \
+            & (_is_clockwise(ax, ay, bx, by, cx, cy)
+               != _is_clockwise(ax, ay, bx, by, dx, dy)) & ~touching
+        if (reduce):
+            result[s:s + rows] = block.any(axis=1)
+        else:
+            result[s:s + rows] = block
+    return result
+
+
+def segment_pairs_intersect(first, second):
+    """
+    Check pairs of segments for intersection, the i-th segment of first
+    with the i-th segment of second.
+
+    Same predicate as segments_intersect().
+
+    Parameters:
+    -----------
+    first: numpy.ndarray
+        k x 4 array of segments (x1, y1, x2, y2)
+    second: numpy.ndarray
+        k x 4 array of segments (x1, y1, x2, y2)
+
+    Returns
+    -------
+    numpy.ndarray
+        k bool array
+    """
+    first = np.asarray(first).reshape(-1, 4)
+    second = np.asarray(second).reshape(-1, 4)
+    if (len(first) == 0):
+        return np.zeros(0, dtype=bool)
+    dtype = _dtype(first, second)
+    ax, ay, bx, by = first.astype(dtype).T
+    cx, cy, dx, dy = second.astype(dtype).T
+    touching = _same_point(ax, ay, cx, cy) | _same_point(ax, ay, dx, dy) \
+        | _same_point(bx, by, cx, cy) | _same_point(bx, by, dx, dy)
+    return (_is_clockwise(ax, ay, cx, cy, dx, dy)
+            != _is_clockwise(bx, by, cx, cy, dx, dy)) \
+        & (_is_clockwise(ax, ay, bx, by, cx, cy)
+           != _is_clockwise(ax, ay, bx, by, dx, dy)) & ~touching
+
+
+# The loops below are plain Python. If Numba is installed they are
+# compiled at import, otherwise the NumPy versions (or the loops
+# themselves where there is nothing to vectorize) are used.
+
+
+def _orientation_loop(coords, triples):
+    out = np.zeros(len(triples), dtype=np.int8)
+    for t in range(len(triples)):
+        a, b, c = triples[t, 0], triples[t, 1], triples[t, 2]
+        d = (coords[b, 0] - coords[a, 0]) * (coords[c, 1] - coords[a, 1]) \
+            - (coords[b, 1] - coords[a, 1]) * (coords[c, 0] - coords[a, 0])
+        if (d > 0):
+            out[t] = 1
+        elif (d < 0):
+            out[t] = -1
+    return out
+
+
+def _orientation_numpy(coords, triples):
+    coords = coords.astype(_dtype(coords))
+    a, b, c = coords[triples[:, 0]], coords[triples[:, 1]], coords[triples[:, 2]]
+    d = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) \
+        - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    return np.asarray(d > 0, dtype=np.int8) - np.asarray(d < 0, dtype=np.int8)
+
+
+def _cross_any_loop(first, second):
+    out = np.zeros(len(first), dtype=np.bool_)
+    for i in range(len(first)):
+        ax, ay, bx, by = first[i, 0], first[i, 1], first[i, 2], first[i, 3]
+        for j in range(len(second)):
+            cx, cy = second[j, 0], second[j, 1]
+            dx, dy = second[j, 2], second[j, 3]
+            if ((ax == cx and ay == cy) or (ax == dx and ay == dy)
+                    or (bx == cx and by == cy) or (bx == dx and by == dy)):
+                continue
+            if (((cy - ay) * (bx - ax) > (by - ay) * (cx - ax))
+                    == ((dy - ay) * (bx - ax) > (by - ay) * (dx - ax))):
+                continue
+            if (((dy - ay) * (cx - ax) > (cy - ay) * (dx - ax))
+                    != ((dy - by) * (cx - bx) > (cy - by) * (dx - bx))):
+                out[i] = True
+                break
+    return out
+
+
+def _cross_any_numpy(first, second):
+    return segments_intersect(first, second, reduce=True)
+
+
+def _hull_scan(coords, order):
+    stack = np.empty(len(order), dtype=np.int64)
+    top = 0
+    for k in range(len(order)):
+        p = order[k]
+        # pop while (stack[-2], stack[-1], p) is a right turn
+        while (k >= 3 and top >= 2):
+            a, b = stack[top - 2], stack[top - 1]
+            ux, uy = coords[a, 0] - coords[b, 0], coords[a, 1] - coords[b, 1]
+            wx, wy = coords[p, 0] - coords[b, 0], coords[p, 1] - coords[b, 1]
+            if (wx * uy - wy * ux >= 0):
+                break
+            top -= 1
+        stack[top] = p
+        top += 1
+    return stack[:top].copy()
+
+
+def _walk_loop(neighbours, start):
+    n = len(neighbours)
+    order = np.empty(n, dtype=np.int64)
+    seen = np.zeros(n, dtype=np.bool_)
+    k = 0
+    v = start
+    while (v >= 0 and not seen[v]):
+        order[k] = v
+        k += 1
+        seen[v] = True
+        following = -1
+        for w in neighbours[v]:
+            if (w >= 0 and not seen[w]):
+                following = w
+                break
+        v = following
+    return order[:k].copy()
+
+
+if (numba is not None):
+    BACKEND = "numba " + numba.__version__
+    _orientation_kernel = numba.njit(cache=True)(_orientation_loop)
+    _cross_any_kernel = numba.njit(cache=True)(_cross_any_loop)
+    _hull_kernel = numba.njit(cache=True)(_hull_scan)
+    _walk_kernel = numba.njit(cache=True)(_walk_loop)
+else:
+    BACKEND = "python"
+    _orientation_kernel = _orientation_numpy
+    _cross_any_kernel = _cross_any_numpy
+    _hull_kernel = _hull_scan
+    _walk_kernel = _walk_loop
+
+
+def orientations(coords, triples):
+    """
+    Get the orientation of triples of points.
+
+    Parameters:
+    -----------
+    coords: numpy.ndarray
+        n x 2 array of coordinates
+    triples: numpy.ndarray
+        t x 3 array of point indices (a, b, c)
+
+    Returns
+    -------
+    numpy.ndarray
+        t int8 array, the sign of the cross product (b - a) x (c - a)
+    """
+    coords = np.asarray(coords).reshape(-1, 2)
+    triples = np.asarray(triples, dtype=np.int64).reshape(-1, 3)
+    if (_dtype(coords) is object):
+        return _orientation_numpy(coords, triples)
+    return _orientation_kernel(coords.astype(np.int64), triples)
+
+
+def cross_any(first, second):
+    """
+    Check for each segment of first if it intersects any of second.
+
+    Same result as segments_intersect(first, second, reduce=True).
+
+    Parameters:
+    -----------
+    first: numpy.ndarray
+        k x 4 array of segments (x1, y1, x2, y2)
+    second: numpy.ndarray
+        m x 4 array of segments (x1, y1, x2, y2)
+
+    Returns
+    -------
+    numpy.ndarray
+        k bool array
+    """
+    first = np.asarray(first).reshape(-1, 4)
+    second = np.asarray(second).reshape(-1, 4)
+    if (_dtype(first, second) is object):
+        return _cross_any_numpy(first, second)
+    return _cross_any_kernel(first.astype(np.int64), second.astype(np.int64))
+
+
+def convex_hull(coords):
+    """
+    Graham scan over points given by their coordinates.
+
+    The scan starts at the first point with the largest y, the others are
+    sorted by their angle to it. Collinear points on the hull are kept.
+
+    Parameters:
+    -----------
+    coords: numpy.ndarray
+        n x 2 array of coordinates, n >= 3
+
+    Returns
+    -------
+    numpy.ndarray
+        indices of the points on the hull, in order
+    """
+    coords = np.asarray(coords, dtype=np.int64).reshape(-1, 2)
+    first = int(np.argmax(coords[:, 1]))
+    rest = np.delete(np.arange(len(coords)), first)
+    d = coords[rest] - coords[first]
+    angle = np.arctan2(d[:, 1].astype(float), d[:, 0].astype(float))
+    # ties keep the order of decreasing y, then of the input
+    rest = rest[np.lexsort((rest, -coords[rest, 1], angle))]
+    order = np.concatenate(([first], rest)).astype(np.int64)
+    return _hull_kernel(coords, order)
+
+
+def neighbour_table(edges, n):
+    """
+    Get the neighbours of every vertex as a table.
+
+    Parameters:
+    -----------
+    edges: numpy.ndarray
+        m x 2 array of vertex indices
+    n: int
+        number of vertices
+
+    Returns
+    -------
+    numpy.ndarray
+        n x d int64 array, row i holds the neighbours of vertex i in
+        increasing order, padded with -1
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    both = np.concatenate((edges, edges[:, ::-1]))
+    both = both[np.lexsort((both[:, 1], both[:, 0]))]
+    deg = np.bincount(both[:, 0], minlength=n)
+    table = np.full((n, max(int(deg.max(initial=0)), 1)), -1, dtype=np.int64)
+    starts = np.cumsum(deg) - deg
+    table[both[:, 0], np.arange(len(both)) - starts[both[:, 0]]] = both[:, 1]
+    return table
+
+
+def path_walk(edges, n, start):
+    """
+    Walk along a path from one of its end points.
+
+    Parameters:
+    -----------
+    edges: numpy.ndarray
+        m x 2 array of vertex indices
+    n: int
+        number of vertices
+    start: int
+        the vertex to start from
+
+    Returns
+    -------
+    numpy.ndarray
+        indices of the visited vertices in order, the walk stops at
+        a vertex without unvisited neighbours
+    """
+    return _walk_kernel(neighbour_table(edges, n), np.int64(start))
+
+
+def diagnostics():
+    """
+    Report the selected backend and the function behind each kernel,
+    compiled by Numba if the backend is Numba.
+
+    Returns
+    -------
+    str
+        one line for the backend and one for each kernel
+    """
+    kernels = {"orientation": _orientation_kernel,
+               "intersection": _cross_any_kernel,
+               "hull": _hull_kernel,
+               "path walk": _walk_kernel}
+    lines = ["geometry kernels: " + BACKEND]
+    for name, kernel in kernels.items():
+        lines.append("  " + name + ": " + kernel.__name__)
+    return "\n".join(lines)
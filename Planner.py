@@ -0,0 +1,225 @@
+from collections import deque
+
+import numpy as np
+
+
+class FlipPlanner:
+    # paths looked at by the fallback search for one vertex of the target
+    SEARCH_LIMIT = 2048
+    # paths looked at by all fallback searches of one plan
+    PLAN_LIMIT = 4 * SEARCH_LIMIT
+
+    def __init__(self, table):
+        """
+        The FlipPlanner class.
+
+        Plans the flips from a plane spanning path to a given target path
+        (e.g. a canonical path of TargetPaths) without touching the Graph.
+        A flip removes one edge of the path and adds one, such that the
+        result is a plane spanning path again.
+
+        The plan first makes the start of the target an end of the path,
+        then grows the common prefix one vertex at a time: the next target
+        vertex is moved to the far end of the path by reversing the part
+        after it, and then joined to the prefix by reversing the rest.
+        That is at most two flips per vertex. If one of these flips would
+        cross an edge, the longest part after the prefix which can be
+        reversed is reversed until the vertex comes next, and if that
+        fails, a breadth first search over the flips keeping the prefix
+        is done, limited to SEARCH_LIMIT paths per vertex and PLAN_LIMIT
+        paths per plan.
+
+        For points in convex position and a target running around the
+        hull from an end of the path (the canonical path), a path is given
+        by the side of the visited vertices every next vertex is added on,
+        and every flip merges the last two runs of equal sides, so at most
+        n - 2 flips are needed. Other targets may need more, and for other
+        point sets there is no such bound and a plan may fail.
+
+        Parameters
+        ----------
+        table: CrossingTable
+            the CrossingTable of the point set
+        """
+        self._table = table
+        # paths the fallback searches of the current plan may still look at
+        self._budget = self.PLAN_LIMIT
+
+    def _edges(self, order):
+        return np.column_stack((order[:-1], order[1:]))
+
+    def _flip(self, mask, remove, add):
+        """
+        Try a flip on a path.
+
+        Returns the mask after the flip, None if the added edge crosses
+        one of the edges left.
+        """
+        mask = mask ^ self._table.mask(np.array([remove]))
+        if (self._table.crosses(np.array([add]), mask)[0]):
+            return None
+        return mask | self._table.mask(np.array([add]))
+
+    def moves(self, order, mask, keep):
+        """
+        Get the flips of a path which keep its first keep vertices.
+
+        Only flips without a crossing are given, with keep = 0 these are
+        all flips of the path.
+
+        Parameters
+        ----------
+        order: list[int]
+            indices of the points in the order of the path
+        mask: numpy.ndarray
+            CrossingTable.mask() of the edges of the path
+        keep: int
+            number of vertices at the start of the path to keep
+
+        Returns
+        -------
+        list[tuple]
+            the flips (remove, add, new order), new order is the order of
+            the path after the flip
+        """
+        n = len(order)
+        moves = [((order[i], order[i + 1]), (order[i], order[-1]),
+                  order[:i + 1] + order[:i:-1])
+                 for i in range(max(keep - 1, 0), n - 2)]
+        if (keep == 0):
+            moves += [((order[i], order[i + 1]), (order[0], order[i + 1]),
+                       order[i::-1] + order[i + 1:])
+                      for i in range(1, n - 1)]
+        if (moves):
+            # the added edge shares an end with the removed one, so the
+            # removed edge does not need to be left out of the test
+            crossing = self._table.crosses(
+                np.array([add for _, add, _ in moves]), mask)
+            moves = [move for move, c in zip(moves, crossing) if not c]
+        if (keep == 0 and n > 2):
+            add = (order[0], order[-1])
+            free = not self._table.crosses(np.array([add]), mask)[0]
+            for i in range(n - 1):
+                remove = (order[i], order[i + 1])
+                if (free or self._flip(mask, remove, add) is not None):
+                    moves.append((remove, add, order[i + 1:] + order[:i + 1]))
+        return moves
+
+    def _search(self, order, mask, keep, goal):
+        """
+        Find the fewest flips keeping the first keep vertices which lead
+        to a path fulfilling goal.
+
+        Returns (flips, order, mask), None if no such path is found among
+        the first SEARCH_LIMIT paths or the budget of the plan is used up.
+        """
+        seen = {tuple(order)}
+        queue = deque([(order, mask, [])])
+        looked = 0
+        while (queue and looked < min(self.SEARCH_LIMIT, self._budget)):
+            order, mask, flips = queue.popleft()
+            looked += 1
+            self._budget -= 1
+            for remove, add, new in self.moves(order, mask, keep):
+                if (tuple(new) in seen):
+                    continue
+                seen.add(tuple(new))
+                new_mask = (mask ^ self._table.mask(np.array([remove]))
+                            | self._table.mask(np.array([add])))
+                new_flips = flips + [(remove, add)]
+                if (goal(new)):
+                    return new_flips, new, new_mask
+                queue.append((new, new_mask, new_flips))
+        return None
+
+    def _reverse_longest(self, order, mask, k, target):
+        """
+        Reverse the longest part of the path after its first k + 1
+        vertices which can be reversed, until the next vertex is the one
+        of the target.
+
+        Returns (flips, order, mask), None if the path repeats or no
+        flip is left.
+        """
+        flips = []
+        seen = {tuple(order)}
+        for _ in range(len(order)):
+            moves = [move for move in self.moves(order, mask, k + 1)
+                     if tuple(move[2]) not in seen]
+            if (not moves):
+                return None
+            remove, add, order = moves[0]
+            mask = (mask ^ self._table.mask(np.array([remove]))
+                    | self._table.mask(np.array([add])))
+            flips.append((remove, add))
+            seen.add(tuple(order))
+            if (order[k + 1] == target[k + 1]):
+                return flips, order, mask
+        return None
+
+    def plan(self, order, target):
+        """
+        Plan the flips from a path to a target path.
+
+        Parameters
+        ----------
+        order: list[int]
+            indices of the points in the order of the path
+        target: list[int]
+            indices of the points in the order of the target path
+
+        Returns
+        -------
+        list[tuple]
+            the flips (remove, add), each a pair of point indices,
+            None if no plan is found
+        """
+        order = list(order)
+        n = len(order)
+        if (sorted(order) != sorted(target)):
+            raise ValueError("The paths must be on the same points")
+        if (n < 3):
+            return []
+        mask = self._table.mask(self._edges(order))
+        flips = []
+        self._budget = self.PLAN_LIMIT
+        if (order[-1] == target[0]):
+            order.reverse()
+        if (order[0] != target[0]):
+            found = self._search(
+                order, mask, 0, lambda new: target[0] in [new[0], new[-1]])
+            if (found is None):
+                return None
+            flips, order, mask = found
+            if (order[-1] == target[0]):
+                order.reverse()
+        for k in range(n - 2):
+            # the first k + 1 vertices are those of the target
+            if (order[k + 1] == target[k + 1]):
+                continue
+            j = order.index(target[k + 1])
+            steps = []
+            new_order, new_mask = order, mask
+            if (j < n - 1):
+                remove, add = (order[j - 1], order[j]), (order[j - 1], order[-1])
+                new_mask = self._flip(mask, remove, add)
+                new_order = order[:j] + order[:j - 1:-1]
+                steps.append((remove, add))
+            if (new_mask is not None):
+                remove = (new_order[k], new_order[k + 1])
+                add = (new_order[k], new_order[-1])
+                new_mask = self._flip(new_mask, remove, add)
+                new_order = new_order[:k + 1] + new_order[:k:-1]
+                steps.append((remove, add))
+            if (new_mask is None):
+                found = self._reverse_longest(order, mask, k, target)
+                if (found is None):
+                    found = self._search(
+                        order, mask, k + 1,
+                        lambda new: new[k + 1] == target[k + 1])
+                if (found is None):
+                    return None
+                steps, new_order, new_mask = found
+            flips.extend(steps)
+            order, mask = new_order, new_mask
+        return flips
@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+import queue
+from time import monotonic
+
+from GraphClass import LayerIndex
+from GraphClass import Path
+from GraphClass import PointSet
+from Planner import FlipPlanner
+
+
+def _search_attempt(coords, order, layers, strategy, seed):
+    """
+    Run a SearchStrategy in a worker process.
+
+    Returns (flips, report), flips is None if the search failed.
+    """
+    points = PointSet(coords)
+    path = Path.from_order(order, points)
+    search = strategy(path, LayerIndex.from_arrays(coords, layers), seed)
+    flips = search.run(order)
+    return flips, search.report()
+
+
+def _plan_attempt(coords, order, target, k):
+    """
+    Plan the flips to the target path k in a worker process.
+
+    Returns (flips, report), flips is None if no plan was found.
+    """
+    points = PointSet(coords)
+    path = Path.from_order(order, points)
+    start = monotonic()
+    flips = FlipPlanner(path.crossing_table()).plan(order, target)
+    return flips, {"strategy": "plan", "target": k, "points": len(order),
+                   "steps": 0 if flips is None else len(flips),
+                   "seconds": monotonic() - start,
+                   "success": flips is not None}
+
+
+class Portfolio:
+    # seconds to wait for the attempts
+    DEADLINE = 60.0
+    # seconds between two checks of stopped
+    POLL = 0.1
+
+    def __init__(self, attempts=None, deadline=None, shortest=False,
+                 workers=None):
+        """
+        The Portfolio class.
+
+        Runs several independent attempts at the same flip sequence in a
+        pool of worker processes, since the time a randomized search
+        takes varies widely between seeds. The first attempt to succeed
+        is taken, or with shortest the one with the fewest flips among
+        those done before the deadline. The workers still running are
+        terminated then.
+
+        Workers are started with the "spawn" method, so they do not
+        inherit the state of the Qt application.
+
+        Parameters
+        ----------
+        attempts: int
+            number of attempts of solve(), the number of workers by default
+        deadline: float
+            seconds to wait, DEADLINE by default
+        shortest: bool
+            wait for all attempts and take the shortest flip sequence,
+            instead of the first one
+        workers: int
+            number of worker processes, the number of CPUs by default
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.attempts = attempts or max(self.workers, 2)
+        self.deadline = self.DEADLINE if deadline is None else deadline
+        self.shortest = shortest
+        # reports of the attempts done
+        self.reports = []
+        # report of the attempt taken
+        self.report = None
+
+    def _race(self, func, jobs, stopped=None):
+        """
+        Run the jobs in the pool and pick the result.
+        """
+        self.reports = []
+        self.report = None
+        results = queue.Queue()
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(min(self.workers, len(jobs)))
+        try:
+            for job in jobs:
+                pool.apply_async(func, job, callback=results.put,
+                                 error_callback=lambda e: results.put(
+                                     (None, {"success": False,
+                                             "error": repr(e)})))
+            end = monotonic() + self.deadline
+            best = None
+            for _ in jobs:
+                flips = None
+                while (monotonic() < end):
+                    if (stopped is not None and stopped()):
+                        return None
+                    wait = max(min(self.POLL, end - monotonic()), 0)
+                    try:
+                        flips, report = results.get(timeout=wait)
+                        break
+                    except queue.Empty:
+                        continue
+                else:
+                    print("Portfolio deadline reached")
+                    break
+                self.reports.append(report)
+                if (flips is not None
+                        and (best is None or len(flips) < len(best))):
+                    best = flips
+                    self.report = report
+                    if (not self.shortest):
+                        break
+            return best
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _orders(self, path):
+        """
+        Get the order of the path from its start and from its end, as
+        point indices.
+        """
+        nodes = path.getNodes()
+        index = {id(node): i for i, node in enumerate(nodes)}
+        order = [index[id(node)] for node in path.path_node_order()]
+        return order, order[::-1]
+
+    def _layers(self, path, layers):
+        """
+        Get the point indices of every layer, in the order of the layer.
+        """
+        index = {node.get_coord(): i for i, node in enumerate(path.getNodes())}
+        return [[index[node.get_coord()] for node in layer.getNodes()]
+                for layer in layers]
+
+    def solve(self, path, layers, strategies, stopped=None):
+        """
+        Search for flips from a path to a canonical path.
+
+        Attempt k runs strategies[k % len(strategies)] with seed k,
+        starting from the start of the path or, every second round of
+        the strategies, from its end.
+
+        Parameters
+        ----------
+        path: Path
+            the path, a plane spanning path
+        layers: LayerIndex
+            the layer set of its points
+        strategies: list[type]
+            SearchStrategy classes to mix
+        stopped: callable
+            returns True if the attempts should be given up
+
+        Returns
+        -------
+        list[tuple]
+            the flips (remove, add), each a pair of point indices,
+            None if no attempt succeeded
+        """
+        coords = path.coord_array()
+        orders = self._orders(path)
+        layer_ids = self._layers(path, layers)
+        jobs = []
+        for k in range(self.attempts):
+            strategy = strategies[k % len(strategies)]
+            order = orders[(k // len(strategies)) % 2]
+            jobs.append((coords, order, layer_ids, strategy, k))
+        return self._race(_search_attempt, jobs, stopped)
+
+    def plan(self, path, targets, stopped=None):
+        """
+        Plan the flips from a path to one of several target paths, one
+        attempt per target.
+
+        Parameters
+        ----------
+        path: Path
+            the path, a plane spanning path
+        targets: list[list[int]]
+            indices of the points in the order of every target path
+        stopped: callable
+            returns True if the attempts should be given up
+
+        Returns
+        -------
+        tuple
+            the flips (remove, add), each a pair of point indices, and
+            the index of the target reached, None if no plan was found
+        """
+        coords = path.coord_array()
+        order = self._orders(path)[0]
+        jobs = [(coords, order, target, k) for k, target in enumerate(targets)]
+        flips = self._race(_plan_attempt, jobs, stopped)
+        if (flips is None):
+            return None
+        return flips, self.report["target"]
@@ -1,5 +1,4 @@
-from copy import deepcopy
-from random import shuffle
+from random import randrange
 from time import sleep
 
 from PyQt5.QtCore import pyqtSignal
@@ -10,6 +9,8 @@ from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtWidgets import QPushButton
 
 from GraphClass import Path
+from Worker import WorkerProcess
+from Worker import randomize_worker
 
 class Randomizer(QObject):
     randomize_done = pyqtSignal()
@@ -29,66 +30,51 @@ class Randomizer(QObject):
         super().__init__()
         self._canvas = canvas
         self.stopped = True
+        # the WorkerProcess of the running search
+        self.worker = None
 
     @pyqtSlot()
     def run(self):
         """
         Generate a random non-crossing spanning path.
+
+        The path is searched for in a WorkerProcess, which kill() ends
+        at once. If no random path is found within RANDOM_TRIES tries,
+        the path through the points sorted by x is taken.
         """
-        nodelist = self._canvas.graph.getNodes()
+        nodelist = list(self._canvas.graph.getNodes())
         self.stopped = False
         n = len(nodelist)
         if (n == 0):
             self._canvas.message.emit("The graph is empty.")
         else:
-            sample_graph = Path()
-            past_nodelist = []
-            x = 0
-            while (True):
-                x += 1
-                shuffle(nodelist)
-                if (nodelist in past_nodelist):
-                    continue
-                print("Step:", str(x))
-                first_node = nodelist[0]
-                sample_graph = Path(
-                    Nodes=[first_node],
-                    start=first_node,
-                    end=first_node,
-                    Lines=[])
-                for i in range(1, n):
-                    node = nodelist[i]
-                    sample_graph.expandPath(node)
-                    if (sample_graph.crosses()
-                            or not sample_graph.is_spanning_path()):
-                        break
-                if (self.stopped):
-                    path = deepcopy(self._canvas.graph)
-                    nodes = path.getNodes()
-                    path_start = path.getStart()
-                    path_end = path.getEnd()
-                    lines = path.getLines()
-                    self._canvas.graph = Path(
-                        Nodes=nodes, start=path_start, end=path_end, Lines=[])
-                    for line in lines:
-                        points = self._canvas.graph.whichNodes(line)
-                        self._canvas.graph.connect(points[0], points[1])
-                    self._canvas.drawGraph()
-                    self.randomize_forced_stop.emit()
-                    self._canvas.message.emit("Forced stop")
-                    break
-                if (len(sample_graph.getNodes()) < n or (
-                        sample_graph.crosses() or not sample_graph.is_spanning_path())):
-                    past_nodelist.append(deepcopy(nodelist))
-                    continue
-                else:
-                    break
-            if (not self.stopped):
-                self._canvas.last_graphs.append(self._canvas.graph)
-                self._canvas.graph = deepcopy(sample_graph)
+            self.worker = WorkerProcess(
+                randomize_worker,
+                {"coords": self._canvas.graph.coord_array()},
+                (randrange(2 ** 32),))
+            result = self.worker.run(
+                progress=lambda info: print("Step:", str(info["steps"])),
+                stopped=lambda: self.stopped)
+            self.worker = None
+            if (result is None):
+                path = self._canvas.graph
+                restored = Path.from_lines(path.getNodes(), path.getLines())
+                restored.setEnds(path.getStart(), path.getEnd())
+                self._canvas.replace_graph(restored)
+                self._canvas.drawGraph()
+                self.randomize_forced_stop.emit()
+                self._canvas.message.emit("Forced stop")
+            else:
+                order, found = result
+                self._canvas.replace_graph(
+                    Path.from_order([nodelist[i] for i in order]))
                 self._canvas.drawGraph()
                 self.randomize_done.emit()
-                self._canvas.message.emit("Done")
+                if (found):
+                    self._canvas.message.emit("Done")
+                else:
+                    self._canvas.message.emit(
+                        "No random path found, took the path sorted by x")
 
     @pyqtSlot()
     def change_stop(self):
@@ -97,6 +83,15 @@ class Randomizer(QObject):
         """
         self.stopped = True
 
+    def kill(self):
+        """
+        Kill the running search at once, from the GUI thread.
+        """
+        self.stopped = True
+        worker = self.worker
+        if (worker is not None):
+            worker.kill()
+
 
 class RandomizerThread(QThread):
     stopped = pyqtSignal()
@@ -132,9 +127,9 @@ class RandomizerThread(QThread):
     @pyqtSlot()
     def force_stop(self):
         """
-        Force the thread to stop.
+        Force the thread to stop, killing the search.
         """
-        self._randomizer.change_stop()
+        self._randomizer.kill()
         self.requestInterruption()
         self.wait()
         self.stopped.emit()
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# number of flips a shortcut of compact() may replace at most
+SHORTCUT_WINDOW = 8
+
+
+def _toggle(edges, op):
+    """
+    Apply an operation to a set of edges, given as pairs (i, j), i < j.
+    """
+    edge = (min(op[1], op[2]), max(op[1], op[2]))
+    if (op[0] == "connect"):
+        edges.add(edge)
+    else:
+        edges.discard(edge)
+    return edge
+
+
+def _erase_loops(ops, edges):
+    """
+    Cut out the operations between two visits of the same set of edges.
+    """
+    current = {(min(i, j), max(i, j)) for i, j in edges}
+    h = 0
+    for edge in current:
+        h ^= hash(edge)
+    kept = []
+    hashes = [h]
+    seen = {h: 0}
+    for op in ops:
+        h ^= hash(_toggle(current, op))
+        kept.append(op)
+        k = seen.get(h)
+        if (k is not None):
+            # the hash only points at a candidate, the edges toggled in
+            # between must cancel out
+            toggled = {}
+            for other in kept[k:]:
+                edge = (min(other[1], other[2]), max(other[1], other[2]))
+                toggled[edge] = not toggled.get(edge, False)
+            if (not any(toggled.values())):
+                for t in range(k + 1, len(hashes)):
+                    if (seen.get(hashes[t]) == t):
+                        del seen[hashes[t]]
+                del kept[k:]
+                del hashes[k + 1:]
+                continue
+        seen.setdefault(h, len(kept))
+        hashes.append(h)
+    return kept
+
+
+def _shortcut(ops, edges):
+    """
+    Replace a run of flips which in sum only removes one edge and adds
+    another one by that single flip.
+    """
+    current = {(min(i, j), max(i, j)) for i, j in edges}
+    size = len(current)
+    # positions where the operations before form whole flips
+    balanced = [0]
+    count = size
+    for t, op in enumerate(ops):
+        count += 1 if op[0] == "connect" else -1
+        if (count == size):
+            balanced.append(t + 1)
+    if (balanced[-1] != len(ops)):
+        return list(ops)
+    result = []
+    k = 0
+    while (k < len(balanced) - 1):
+        a = balanced[k]
+        toggled = {}
+        best, best_edges = None, None
+        for l in range(k + 1, len(balanced)):
+            b = balanced[l]
+            if (b - a > 2 * SHORTCUT_WINDOW):
+                break
+            for op in ops[balanced[l - 1]:b]:
+                edge = (min(op[1], op[2]), max(op[1], op[2]))
+                if (edge in toggled):
+                    del toggled[edge]
+                else:
+                    toggled[edge] = op
+            if (len(toggled) <= 2 and b - a > len(toggled)):
+                best, best_edges = l, dict(toggled)
+        if (best is None):
+            for op in ops[a:balanced[k + 1]]:
+                _toggle(current, op)
+                result.append(op)
+            k += 1
+            continue
+        removed = [op for edge, op in best_edges.items() if edge in current]
+        added = [op for edge, op in best_edges.items()
+                 if edge not in current]
+        for op in [("disconnect",) + op[1:] for op in removed] + \
+                [("connect",) + op[1:] for op in added]:
+            _toggle(current, op)
+            result.append(op)
+        k = best
+    return result
+
+
+def compact(ops, edges):
+    """
+    Shorten a flip sequence without changing where it leads.
+
+    Operations between two visits of the same set of edges are cut out,
+    which includes a connect right after the disconnect of the same edge
+    and the other way round. Then every run of at most SHORTCUT_WINDOW
+    flips which in sum removes one edge and adds another one becomes
+    that single flip. The sets of edges in between are all sets of edges
+    the original sequence passes through.
+
+    Parameters
+    ----------
+    ops: list[tuple]
+        operations ("connect" or "disconnect", i, j) on Node indices,
+        as recorded by a FlipRecorder
+    edges: numpy.ndarray
+        m x 2 array of Node indices, the edges before the sequence
+
+    Returns
+    -------
+    list[tuple]
+        the shorter sequence
+    """
+    ops = list(ops)
+    while (True):
+        shorter = _shortcut(_erase_loops(ops, edges), edges)
+        if (len(shorter) == len(ops)):
+            return shorter
+        ops = shorter
+
+
+class FlipRecorder:
+
+    def __init__(self, graph):
+        """
+        The FlipRecorder class.
+
+        Records the edges a Graph gains and loses as a list of operations
+        ("connect" or "disconnect", i, j) on Node indices. Connecting and
+        disconnecting the same pair of Nodes right after each other (as
+        the trial edits of Canvas.problem_edge() do) cancel out.
+
+        Parameters
+        ----------
+        graph: Graph
+            the graph, recording starts at once
+        """
+        self._graph = graph
+        self._edges = graph.edge_array()
+        self.ops = []
+        graph.add_listener(self)
+
+    def detach(self):
+        """
+        Stop recording.
+        """
+        self._graph.remove_listener(self)
+
+    def compacted(self):
+        """
+        Get the recorded operations shortened by compact().
+
+        Returns
+        -------
+        list[tuple]
+            operations ("connect" or "disconnect", i, j) on Node indices
+        """
+        return compact(self.ops, self._edges)
+
+    def _record(self, kind, node1, node2):
+        nodes = self._graph.getNodes()
+        op = (kind, nodes.index(node1), nodes.index(node2))
+        if (self.ops and self.ops[-1][0] != kind
+                and set(self.ops[-1][1:]) == set(op[1:])):
+            self.ops.pop()
+        else:
+            self.ops.append(op)
+
+    def on_connect(self, node1, node2):
+        self._record("connect", node1, node2)
+
+    def on_disconnect(self, node1, node2):
+        self._record("disconnect", node1, node2)
+
+    def on_add_node(self, node, i):
+        pass
+
+    def on_remove_node(self, node, i):
+        pass
+
+
+class ResultCache:
+    # default place of the results on disk
+    DIRECTORY = os.path.join(os.path.expanduser("~"), ".flipgraph", "results")
+
+    def __init__(self, directory=DIRECTORY):
+        """
+        The ResultCache class.
+
+        Flip sequences found by the Solver and the Wrapper, stored by the
+        order type of the point set (see OrderType.signature()) and the
+        edges of the start path in the canonical labels of the points.
+
+        Point sets with the same order type have the same flip graph, so
+        a sequence found for one of them is replayed on the other through
+        the relabeling. Results are kept in memory and as one JSON file
+        per key in the directory.
+
+        Parameters
+        ----------
+        directory: str
+            directory of the files, DIRECTORY if not given,
+            None to keep results in memory only
+        """
+        self._directory = directory
+        self._results = {}
+
+    def key(self, mode, graph):
+        """
+        Get the key of a start path.
+
+        Parameters
+        ----------
+        mode: str
+            what the result is for, e.g. "solve" or "wrap"
+        graph: Graph
+            the start path
+
+        Returns
+        -------
+        tuple[str, numpy.ndarray]
+            the key and the permutation from canonical labels to Node
+            indices, None if the point set is too large for a signature
+        """
+        signature = graph.order_type().signature()
+        if (signature is None):
+            return None
+        order_key, perm = signature
+        label = np.empty(len(perm), dtype=np.int64)
+        label[perm] = np.arange(len(perm))
+        edges = np.sort(label[graph.edge_array()], axis=1)
+        edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+        digest = hashlib.sha1(
+            (mode + ":" + order_key + ":").encode() + edges.tobytes()).hexdigest()
+        return digest, perm
+
+    def _file(self, digest):
+        return os.path.join(self._directory, digest + ".json")
+
+    def get(self, key):
+        """
+        Get the stored flip sequence for a key.
+
+        Parameters
+        ----------
+        key: tuple[str, numpy.ndarray]
+            the key, see key()
+
+        Returns
+        -------
+        list[tuple]
+            the operations on Node indices of the current graph,
+            None if there is no result
+        """
+        if (key is None):
+            return None
+        digest, perm = key
+        ops = self._results.get(digest)
+        if (ops is None and self._directory is not None):
+            try:
+                with open(self._file(digest), "r") as f:
+                    ops = [tuple(op) for op in json.load(f)["ops"]]
+                self._results[digest] = ops
+            except (OSError, ValueError, KeyError):
+                return None
+        if (ops is None):
+            return None
+        return [(kind, int(perm[i]), int(perm[j])) for kind, i, j in ops]
+
+    def put(self, key, ops):
+        """
+        Store a flip sequence.
+
+        Parameters
+        ----------
+        key: tuple[str, numpy.ndarray]
+            the key of the start path, see key()
+        ops: list[tuple]
+            the operations on Node indices, as recorded by a FlipRecorder
+        """
+        if (key is None):
+            return
+        digest, perm = key
+        label = np.empty(len(perm), dtype=np.int64)
+        label[perm] = np.arange(len(perm))
+        ops = [(kind, int(label[i]), int(label[j])) for kind, i, j in ops]
+        self._results[digest] = ops
+        if (self._directory is not None):
+            try:
+                os.makedirs(self._directory, exist_ok=True)
+                temp = self._file(digest) + ".tmp"
+                with open(temp, "w") as f:
+                    json.dump({"ops": ops}, f)
+                os.replace(temp, self._file(digest))
+            except OSError as e:
+                print("Result not saved:", e)
+
+    def __len__(self):
+        return len(self._results)
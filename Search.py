@@ -0,0 +1,510 @@
+from collections import deque
+from math import exp
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from Planner import FlipPlanner
+
+MASK64 = (1 << 64) - 1
+
+
+class ZobristKeys:
+
+    def __init__(self, n, seed=0):
+        """
+        The ZobristKeys class.
+
+        A random 64 bit key for every edge a path on n points can have.
+        The hash of a path is the XOR of the keys of its edges, so a flip
+        changes it by the keys of the removed and the added edge, in O(1).
+
+        The keys are derived from the edge with splitmix64 when they are
+        first asked for, the same seed gives the same keys.
+
+        Parameters
+        ----------
+        n: int
+            number of points
+        seed: int
+            seed of the keys
+        """
+        self._n = n
+        self._seed = seed & MASK64
+        self._keys = {}
+
+    def key(self, edge):
+        """
+        Get the key of an edge.
+
+        Parameters
+        ----------
+        edge: tuple[int]
+            the end points of the edge, in any order
+
+        Returns
+        -------
+        int
+        """
+        i, j = edge
+        k = min(i, j) * self._n + max(i, j)
+        if (k not in self._keys):
+            z = (self._seed + (k + 1) * 0x9E3779B97F4A7C15) & MASK64
+            z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+            z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+            self._keys[k] = z ^ (z >> 31)
+        return self._keys[k]
+
+    def hash(self, edges):
+        """
+        Get the hash of a set of edges.
+
+        Parameters
+        ----------
+        edges: list[tuple[int]]
+            the edges
+
+        Returns
+        -------
+        int
+        """
+        h = 0
+        for edge in edges:
+            h ^= self.key(edge)
+        return h
+
+
+class SearchStrategy:
+    # name in the reports
+    NAME = "search"
+    # steps before the search gives up
+    STEP_LIMIT = 1000
+    # steps between two calls of progress
+    PROGRESS_EVERY = 25
+
+    def __init__(self, path, layers, seed=0):
+        """
+        The SearchStrategy class.
+
+        Base of the strategies searching for flips from a plane spanning
+        path to a canonical path without touching the Graph. A strategy
+        implements search(), run() calls it and keeps a report.
+
+        All strategies use the same objective, the distance of a path to
+        a canonical path: the sum of the absolute differences between
+        its layer edge vector and LayerIndex.bound_target() and between
+        its layer connectivity matrix and LayerIndex.reference_matrix().
+        A plane spanning path is canonical iff the distance is 0, and a
+        flip changes it by at most 4, computed in O(1) by delta().
+
+        Parameters
+        ----------
+        path: Path
+            the path, a plane spanning path
+        layers: LayerIndex
+            the layer set of its points
+        seed: int
+            seed of the random choices and the ZobristKeys
+        """
+        nodes = path.getNodes()
+        n = len(nodes)
+        self._table = path.crossing_table()
+        self._planner = FlipPlanner(self._table)
+        self._keys = ZobristKeys(n, seed)
+        self._random = Random(seed)
+        self._points = n
+        ids, pos = layers.node_arrays(nodes)
+        self._ids = ids
+        sizes = np.bincount(ids, minlength=len(layers))
+        d = np.abs(pos[:, None] - pos[None, :])
+        self._on_layer = (ids[:, None] == ids[None, :]) & (
+            (d == 1) | (d == sizes[ids][:, None] - 1))
+        # the layer edge vector and the layer connectivity matrix of a
+        # canonical path, flattened into one array
+        self._layer_count = len(layers)
+        self._goal = np.concatenate((layers.bound_target(),
+                                     layers.reference_matrix().ravel()))
+        self.steps = 0
+        self.seconds = 0.0
+        self.success = False
+        # called with a dict of the strategy name, the steps so far and
+        # the distance to a canonical path every PROGRESS_EVERY steps
+        self.progress = None
+
+    def _slots(self, edge):
+        """
+        Get the entries of the flattened counts an edge adds one to.
+        """
+        i, j = edge
+        a, b = int(self._ids[i]), int(self._ids[j])
+        if (self._on_layer[i, j]):
+            return [a]
+        L = self._layer_count
+        return [L + a * L + b, L + b * L + a]
+
+    def counts(self, order):
+        """
+        Get the layer edge vector and the layer connectivity matrix of
+        a path, flattened into one array.
+
+        Parameters
+        ----------
+        order: list[int]
+            indices of the points in the order of the path
+
+        Returns
+        -------
+        numpy.ndarray(int)
+        """
+        counts = np.zeros(len(self._goal), dtype=int)
+        for edge in zip(order[:-1], order[1:]):
+            for k in self._slots(edge):
+                counts[k] += 1
+        return counts
+
+    def distance(self, counts):
+        """
+        Get the distance of a path to a canonical path.
+
+        Parameters
+        ----------
+        counts: numpy.ndarray(int)
+            counts() of the path
+
+        Returns
+        -------
+        int
+        """
+        return int(np.abs(counts - self._goal).sum())
+
+    def delta(self, counts, remove, add):
+        """
+        Get the change of the distance to a canonical path by a flip.
+
+        Parameters
+        ----------
+        counts: numpy.ndarray(int)
+            counts() of the path
+        remove: tuple[int]
+            the edge to remove
+        add: tuple[int]
+            the edge to add
+
+        Returns
+        -------
+        int
+        """
+        change = {}
+        for k in self._slots(remove):
+            change[k] = change.get(k, 0) - 1
+        for k in self._slots(add):
+            change[k] = change.get(k, 0) + 1
+        return sum(abs(counts[k] + c - self._goal[k])
+                   - abs(counts[k] - self._goal[k])
+                   for k, c in change.items())
+
+    def _apply(self, counts, mask, remove, add):
+        """
+        Update the counts in place and get the mask after a flip.
+        """
+        for k in self._slots(remove):
+            counts[k] -= 1
+        for k in self._slots(add):
+            counts[k] += 1
+        return (mask ^ self._table.mask(np.array([remove]))
+                | self._table.mask(np.array([add])))
+
+    def _step(self, distance):
+        """
+        Count a step of the search and report the progress.
+        """
+        self.steps += 1
+        if (self.progress is not None
+                and self.steps % self.PROGRESS_EVERY == 0):
+            self.progress({"strategy": self.NAME, "steps": self.steps,
+                           "distance": distance})
+
+    def _record(self, flips, hashes, reached, h, flip):
+        """
+        Append a flip to a flip sequence, or cut the flips out if the
+        path with hash h was reached before.
+
+        hashes holds the hash of the path after every flip and reached
+        the number of flips each of these was reached with.
+        """
+        k = reached.get(h)
+        if (k is not None):
+            for g in hashes[k + 1:]:
+                del reached[g]
+            del flips[k:]
+            del hashes[k + 1:]
+        else:
+            flips.append(flip)
+            hashes.append(h)
+            reached[h] = len(flips)
+
+    def _mask(self, order):
+        return self._table.mask(
+            np.column_stack((order[:-1], order[1:])).reshape(-1, 2))
+
+    def search(self, order):
+        """
+        Search for flips from a path to a canonical path.
+
+        Parameters
+        ----------
+        order: list[int]
+            indices of the points in the order of the path
+
+        Returns
+        -------
+        list[tuple]
+            the flips (remove, add), each a pair of point indices,
+            None if no canonical path is reached within STEP_LIMIT steps
+        """
+        raise NotImplementedError
+
+    def run(self, order):
+        """
+        Run search() and keep the number of steps, the wall time and
+        whether a canonical path was reached for report().
+
+        Parameters
+        ----------
+        order: list[int]
+            indices of the points in the order of the path
+
+        Returns
+        -------
+        list[tuple]
+            the flips, see search()
+        """
+        self.steps = 0
+        start = perf_counter()
+        flips = self.search(list(order))
+        self.seconds = perf_counter() - start
+        self.success = flips is not None
+        print("Strategy:", self.NAME, "points:", self._points,
+              "steps:", self.steps, "time: %.3fs" % self.seconds,
+              "success:", self.success)
+        return flips
+
+    def report(self):
+        """
+        Get the report of the last run().
+
+        Returns
+        -------
+        dict
+            strategy name, number of points, steps, wall time in
+            seconds and success
+        """
+        return {"strategy": self.NAME, "points": self._points,
+                "steps": self.steps, "seconds": self.seconds,
+                "success": self.success}
+
+
+class TabuSearch(SearchStrategy):
+    NAME = "tabu"
+    # number of recent paths which may not be visited again
+    STATE_TENURE = 256
+    # number of flips a removed edge may not be added again and an added
+    # edge may not be removed again
+    EDGE_TENURE = 7
+
+    def __init__(self, path, layers, seed=0):
+        """
+        The TabuSearch class.
+
+        Every step takes the flip which brings the path closest to a
+        canonical path, see SearchStrategy.
+
+        A flip is tabu if it leads to one of the last STATE_TENURE paths,
+        told apart by their ZobristKeys hash, or if it adds one of the
+        edges removed or removes one of the edges added during the last
+        EDGE_TENURE flips. The latter is ignored for a flip leading
+        closer to a canonical path than any path before. Of the best
+        flips one is taken at random, the seed makes it repeatable. If
+        every flip is tabu, the ones leading to no recent path come first.
+
+        Parameters
+        ----------
+        path: Path
+            the path, a plane spanning path
+        layers: LayerIndex
+            the layer set of its points
+        seed: int
+            seed of the random choices and the ZobristKeys
+        """
+        super().__init__(path, layers, seed)
+
+    def search(self, order):
+        counts = self.counts(order)
+        distance = self.distance(counts)
+        best = distance
+        mask = self._mask(order)
+        h = self._keys.hash(zip(order[:-1], order[1:]))
+        recent = deque([h], maxlen=self.STATE_TENURE)
+        # edge -> step until which it may not be added or removed
+        added, removed = {}, {}
+        # flips without the loops, and where every path was reached
+        flips = []
+        hashes = [h]
+        reached = {h: 0}
+        while (distance > 0):
+            if (self.steps >= self.STEP_LIMIT):
+                return None
+            self._step(distance)
+            step = self.steps
+            candidates = []
+            for remove, add, new in self._planner.moves(order, mask, 0):
+                key = self._keys.key(remove) ^ self._keys.key(add)
+                delta = self.delta(counts, remove, add)
+                edge_tabu = (removed.get(frozenset(add), 0) >= step
+                             or added.get(frozenset(remove), 0) >= step)
+                # 0 for a flip which is not tabu, 1 if only its edges are,
+                # 2 if it leads to a recent path
+                tabu = 2 if h ^ key in recent else int(
+                    edge_tabu and distance + delta >= best)
+                candidates.append((tabu, delta, remove, add, new, key))
+            if (not candidates):
+                return None
+            low = min(c[:2] for c in candidates)
+            _, delta, remove, add, order, key = self._random.choice(
+                [c for c in candidates if c[:2] == low])
+            mask = self._apply(counts, mask, remove, add)
+            distance += delta
+            best = min(best, distance)
+            h ^= key
+            recent.append(h)
+            removed[frozenset(remove)] = step + self.EDGE_TENURE
+            added[frozenset(add)] = step + self.EDGE_TENURE
+            self._record(flips, hashes, reached, h, (remove, add))
+        return flips
+
+
+class SimulatedAnnealing(SearchStrategy):
+    NAME = "annealing"
+    STEP_LIMIT = 20000
+    # temperature at the start, and its factor per step
+    TEMPERATURE = 2.0
+    COOLING = 0.999
+
+    def __init__(self, path, layers, seed=0):
+        """
+        The SimulatedAnnealing class.
+
+        Every step proposes a random flip and takes it if it does not
+        lead away from a canonical path, see SearchStrategy, otherwise
+        with probability exp(-delta / T). The temperature T starts at
+        TEMPERATURE and is multiplied by COOLING after every step. The
+        flips between two visits of the same path are cut out of the
+        result.
+
+        Parameters
+        ----------
+        path: Path
+            the path, a plane spanning path
+        layers: LayerIndex
+            the layer set of its points
+        seed: int
+            seed of the random choices and the ZobristKeys
+        """
+        super().__init__(path, layers, seed)
+
+    def search(self, order):
+        counts = self.counts(order)
+        distance = self.distance(counts)
+        mask = self._mask(order)
+        h = self._keys.hash(zip(order[:-1], order[1:]))
+        temperature = self.TEMPERATURE
+        flips = []
+        hashes = [h]
+        reached = {h: 0}
+        moves = None
+        while (distance > 0):
+            if (self.steps >= self.STEP_LIMIT):
+                return None
+            self._step(distance)
+            temperature *= self.COOLING
+            if (moves is None):
+                moves = self._planner.moves(order, mask, 0)
+            if (not moves):
+                return None
+            remove, add, new = self._random.choice(moves)
+            delta = self.delta(counts, remove, add)
+            if (delta > 0 and self._random.random()
+                    >= exp(-delta / max(temperature, 1e-9))):
+                continue
+            mask = self._apply(counts, mask, remove, add)
+            distance += delta
+            order, moves = new, None
+            h ^= self._keys.key(remove) ^ self._keys.key(add)
+            self._record(flips, hashes, reached, h, (remove, add))
+        return flips
+
+
+class BeamSearch(SearchStrategy):
+    NAME = "beam"
+    STEP_LIMIT = 500
+    # number of paths kept per step
+    WIDTH = 8
+
+    def __init__(self, path, layers, seed=0, width=None):
+        """
+        The BeamSearch class.
+
+        Every step looks at all flips of the paths in the beam and keeps
+        the width paths closest to a canonical path, see SearchStrategy,
+        which were not in a beam before. Of paths with the same distance
+        the ones kept are chosen at random. A step is one level of the
+        search, so the flips found are as many as the steps.
+
+        Parameters
+        ----------
+        path: Path
+            the path, a plane spanning path
+        layers: LayerIndex
+            the layer set of its points
+        seed: int
+            seed of the random choices and the ZobristKeys
+        width: int
+            number of paths kept per step, WIDTH by default
+        """
+        super().__init__(path, layers, seed)
+        self.width = self.WIDTH if width is None else width
+
+    def search(self, order):
+        counts = self.counts(order)
+        h = self._keys.hash(zip(order[:-1], order[1:]))
+        # (distance, order, mask, counts, hash, flips)
+        beam = [(self.distance(counts), order, self._mask(order), counts,
+                 h, [])]
+        seen = {h}
+        while (beam[0][0] > 0):
+            if (self.steps >= self.STEP_LIMIT):
+                return None
+            self._step(beam[0][0])
+            candidates = []
+            for b, (distance, order, mask, counts, h, flips) in enumerate(beam):
+                for remove, add, new in self._planner.moves(order, mask, 0):
+                    key = h ^ self._keys.key(remove) ^ self._keys.key(add)
+                    if (key in seen):
+                        continue
+                    seen.add(key)
+                    candidates.append(
+                        (distance + self.delta(counts, remove, add),
+                         self._random.random(), b, remove, add, new, key))
+            if (not candidates):
+                return None
+            candidates.sort(key=lambda c: c[:2])
+            new_beam = []
+            for distance, _, b, remove, add, new, key in \
+                    candidates[:self.width]:
+                counts = beam[b][3].copy()
+                mask = self._apply(counts, beam[b][2], remove, add)
+                new_beam.append((distance, new, mask, counts, key,
+                                 beam[b][5] + [(remove, add)]))
+            beam = new_beam
+        return beam[0][5]
@@ -1,5 +1,7 @@
-from copy import deepcopy
+from enum import IntEnum
+from random import randint
 from random import shuffle
+from time import perf_counter
 from time import sleep
 
 import numpy as np
@@ -12,16 +14,53 @@ from PyQt5.QtGui import QPen
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtWidgets import QPushButton
 
+from GraphClass import CanonicalTracker
 from GraphClass import Line
 from GraphClass import Node
 from GraphClass import Path
+from Planner import FlipPlanner
+from Portfolio import Portfolio
+from ResultCache import FlipRecorder
+from Search import BeamSearch
+from Search import SimulatedAnnealing
+from Search import TabuSearch
+from Worker import WorkerProcess
+from Worker import path_arrays
+from Worker import search_worker
+
+
+class SolveMode(IntEnum):
+    """
+    SolveMode Enum class.
+
+    How the Solver gets on when there is no planned flip sequence
+    """
+    HEURISTIC = 0
+    TABU = 1
+    ANNEALING = 2
+    BEAM = 3
+    PORTFOLIO = 4
+
+
+# the SearchStrategy of every SolveMode but HEURISTIC and PORTFOLIO,
+# PORTFOLIO mixes all of them
+STRATEGIES = {SolveMode.TABU: TabuSearch,
+              SolveMode.ANNEALING: SimulatedAnnealing,
+              SolveMode.BEAM: BeamSearch}
+
 
 class Solver(QObject):
     solved = pyqtSignal()
     forced_stop = pyqtSignal()
     message = pyqtSignal(str)
+    # seconds a search may take
+    DEADLINE = 120.0
+    # vertices of the outermost layer besides the ends of the path tried
+    # as start of a planned canonical path
+    PLAN_STARTS = 4
 
-    def __init__(self, canvas, parent=None):
+    def __init__(self, canvas, mode=SolveMode.HEURISTIC, deadline=None,
+                 parent=None):
         """
         The Solver Object.
 
@@ -31,11 +70,24 @@ class Solver(QObject):
         ----------
         canvas: Canvas
             the Canvas class defined in Canvas.py
+        mode: SolveMode
+            HEURISTIC, the default, runs the boundary algorithm with
+            random steps, PORTFOLIO a Portfolio of all STRATEGIES, the
+            others the SearchStrategy in STRATEGIES
+        deadline: float
+            seconds a search may take, DEADLINE by default
         """
         super().__init__()
         self._canvas = canvas
+        self.mode = mode
+        self.deadline = self.DEADLINE if deadline is None else deadline
+        self.timed_out = False
+        # the WorkerProcess of the running search
+        self.worker = None
+        # steps, wall time and success of the last strategy run
+        self.report = None
         self.stopped = True
-        self.previous_steps = [deepcopy(self._canvas.graph)]
+        self.tracker = None
 
     def NodeWhichlayer(self, layers, node):
         """
@@ -43,7 +95,7 @@ class Solver(QObject):
 
         Parameters
         ----------
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         node: Node
@@ -54,10 +106,10 @@ class Solver(QObject):
         layer: Graph
             the layer, where the node lies.
         """
-        for layer in layers:
-            if (node in layer.getNodes()):
-                return layer
-        return None
+        i = layers.node_layer(node)
+        if (i is None):
+            return None
+        return layers[i]
 
     def LineWhichlayer(self, layers, line):
         """
@@ -65,7 +117,7 @@ class Solver(QObject):
 
         Parameters
         ----------
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         line: Line
@@ -76,10 +128,10 @@ class Solver(QObject):
         layer: Graph
             the layer, where the line lies.
         """
-        for layer in layers:
-            if (line in layer.getLines()):
-                return layer
-        return None
+        i = layers.line_layer(line)
+        if (i is None):
+            return None
+        return layers[i]
 
     def boundary_alg(self, path: Path, layers, node: Node):
         """
@@ -93,7 +145,7 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         node: Node
@@ -107,7 +159,7 @@ class Solver(QObject):
         # find which layer the point is in
         layer = self.NodeWhichlayer(layers, node)
         if (not len(layer.getNodes()) in [1, 2]):
-            node_i_layer = layer.getNodes().index(node)
+            node_i_layer = layers.node_position(node)
             neighbor_node = [layer.getNodes()[node_i_layer - 1],
                              layer.getNodes()[(node_i_layer + 1) % len(layer.getNodes())]]
             neighbor_node = [node0 for node0 in neighbor_node if not Line(
@@ -120,40 +172,34 @@ class Solver(QObject):
             for i in range(2, len(node_in_order)):
                 other_node = node_in_order[i]
                 if (other_node in neighbor_node):
+                    if (not path.evaluate_flip(
+                            (node_in_order[i - 1], other_node),
+                            (node, other_node))):
+                        print("Path invalid: Skipping change")
+                        continue
                     self._canvas.delete_edge(
                         painter, pen, node_in_order[i - 1], other_node)
                     print("Disconnected:", str(
                         node_in_order[i - 1]), ",", str(other_node))
                     self._canvas.draw_edge(painter, pen, node, other_node)
                     print("Connected: ", str(node), ",", str(other_node))
-                    if (not (path.is_spanning_path() and not path.crosses())):
-                        # Revert change
-                        print("Path invalid: Reverting change")
-                        self._canvas.delete_edge(
-                            painter, pen, node, other_node)
-                        self._canvas.draw_edge(
-                            painter, pen, node_in_order[i - 1], other_node)
-                        continue
-                    else:
-                        break
+                    break
         elif (len(layer.getNodes()) == 2):
             first = layer.getNodes()[0]
             second = layer.getNodes()[1]
             if (not path.is_connected(first, second)):
-                self._canvas.draw_edge(painter, pen, first, second)
-                bad_edge = self._canvas.problem_edge()
+                bad_edge = [line for line in path.getLines()
+                            if path.evaluate_flip(path.whichNodes(line),
+                                                  (first, second))]
                 if (bad_edge):
                     shuffle(bad_edge)
                     del_edge = bad_edge[0]
-                    del_points = self._canvas.graph.whichNodes(del_edge)
+                    del_points = path.whichNodes(del_edge)
+                    self._canvas.draw_edge(painter, pen, first, second)
                     self._canvas.delete_edge(
                         painter, pen, del_points[0], del_points[1])
-                else:
-                    self._canvas.delete_edge(painter, pen, first, second)
         self._canvas.update()
         painter.end()
-        if (not path == self.previous_steps[-1]):
-            self.previous_steps.append(deepcopy(path))
 
     def allocate_edge(
             self,
@@ -180,19 +226,18 @@ class Solver(QObject):
         """
         print("Allocating edges:", line)
         points = path.whichNodes(line)
-        self._canvas.delete_edge(painter, pen, points[0], points[1])
-        toadd_edge = self._canvas.problem_edge()
-        toadd_edge = [line0 for line0 in toadd_edge if line0 != line]
+        toadd_edge = [pair for pair in path.reconnections(points[0], points[1])
+                      if path.evaluate_flip(points, pair)]
         if (toadd_edge):
             shuffle(toadd_edge)
-            readd_edge = toadd_edge[0]
-            print("Edge added:", readd_edge)
-            readd_points = path.whichNodes(readd_edge)
+            readd_points = toadd_edge[0]
+            print("Edge added:", Line(readd_points[0].get_coord(),
+                                      readd_points[1].get_coord()))
+            self._canvas.delete_edge(painter, pen, points[0], points[1])
             self._canvas.draw_edge(
                 painter, pen, readd_points[0], readd_points[1])
         else:
-            print("Path invalid: Reverting change")
-            self._canvas.draw_edge(painter, pen, points[0], points[1])
+            print("Path invalid: Keeping edge")
 
     def boundary_alg_alt(self, path: Path, layers, node: Node):
         """
@@ -205,7 +250,7 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         node: Node
@@ -220,7 +265,7 @@ class Solver(QObject):
         layer = self.NodeWhichlayer(layers, node)
         if (not len(layer.getNodes()) in [1, 2]):
             # detect neighboring nodes in this layer
-            node_i_layer = layer.getNodes().index(node)
+            node_i_layer = layers.node_position(node)
             neighbor_node = [layer.getNodes()[node_i_layer - 1],
                              layer.getNodes()[(node_i_layer + 1) % len(layer.getNodes())]]
             neighbor_node = [node0 for node0 in neighbor_node if not Line(
@@ -234,44 +279,35 @@ class Solver(QObject):
             for i in range(2, len(node_in_order)):
                 other_node = node_in_order[i]
                 if (other_node in neighbor_node):
-                    self._canvas.draw_edge(painter, pen, node, other_node)
-                    print("Connected: ", str(node), ",", str(other_node))
-                    # if cross
-                    if (not (path.is_spanning_path() and not path.crosses())):
-                        bad_edge = self._canvas.problem_edge()
-                        bad_edge = [
-                            line for line in bad_edge if line != Line(
-                                node.get_coord(), other_node.get_coord())]
-                        if (bad_edge):
-                            shuffle(bad_edge)
-                            allocated_edge = bad_edge[0]
-                            alloc_points = path.whichNodes(allocated_edge)
-                            self._canvas.delete_edge(
-                                painter, pen, alloc_points[0], alloc_points[1])
-                            continue
-                        else:
-                            self._canvas.delete_edge(
-                                painter, pen, node, other_node)
-                    else:
-                        break
+                    # edges whose removal makes up for the new one
+                    bad_edge = [line for line in path.getLines()
+                                if path.evaluate_flip(path.whichNodes(line),
+                                                      (node, other_node))]
+                    if (bad_edge):
+                        shuffle(bad_edge)
+                        allocated_edge = bad_edge[0]
+                        alloc_points = path.whichNodes(allocated_edge)
+                        self._canvas.draw_edge(painter, pen, node, other_node)
+                        print("Connected: ", str(node), ",", str(other_node))
+                        self._canvas.delete_edge(
+                            painter, pen, alloc_points[0], alloc_points[1])
+                        continue
         elif (len(layer.getNodes()) == 2):
             first = layer.getNodes()[0]
             second = layer.getNodes()[1]
             if (not path.is_connected(first, second)):
-                self._canvas.draw_edge(painter, pen, first, second)
-                bad_edge = self._canvas.problem_edge()
+                bad_edge = [line for line in path.getLines()
+                            if path.evaluate_flip(path.whichNodes(line),
+                                                  (first, second))]
                 if (bad_edge):
                     shuffle(bad_edge)
                     del_edge = bad_edge[0]
-                    del_points = self._canvas.graph.whichNodes(del_edge)
+                    del_points = path.whichNodes(del_edge)
+                    self._canvas.draw_edge(painter, pen, first, second)
                     self._canvas.delete_edge(
                         painter, pen, del_points[0], del_points[1])
-                else:
-                    self._canvas.delete_edge(painter, pen, first, second)
         self._canvas.update()
         painter.end()
-        if (not path == self.previous_steps[-1]):
-            self.previous_steps.append(deepcopy(path))
 
     def allocate_non_layer(self, path: Path, layers, mode=0):
         """
@@ -288,7 +324,7 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set
 
         mode: int
@@ -298,8 +334,7 @@ class Solver(QObject):
         painter = QPainter(self._canvas.pixmap())
         pen = QPen()
         linelist = [
-            line for line in path.getLines() if self.LineWhichlayer(
-                layers, line) is None]
+            line for line in path.getLines() if layers.line_layer(line) is None]
         if (mode == 1):
             shuffle(linelist)
             line = linelist[0]
@@ -315,13 +350,9 @@ class Solver(QObject):
                     arr == check_element)[1][0]
                 possible_line = []
                 for line in linelist:
-                    nodes = path.whichNodes(line)
-                    node_i = layers.index(
-                        self.NodeWhichlayer(
-                            layers, nodes[0]))
-                    node_j = layers.index(
-                        self.NodeWhichlayer(
-                            layers, nodes[1]))
+                    points = line.getPoints()
+                    node_i = layers.point_layer(points[0])
+                    node_j = layers.point_layer(points[1])
                     if ((node_i, node_j) in [(i, j), (j, i)]):
                         possible_line.append(line)
                 line = possible_line[0]
@@ -331,8 +362,6 @@ class Solver(QObject):
         self.allocate_edge(painter, pen, path, line)
         self._canvas.update()
         painter.end()
-        if (not path == self.previous_steps[-1]):
-            self.previous_steps.append(deepcopy(path))
 
     def check_bound(self, path: Path, layers):
         """
@@ -343,19 +372,14 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
 
         Returns
         ----------
-        list[int]
-            list of integers representing the number of edges on a layer
+        numpy.ndarray(int)
+            array of integers representing the number of edges on a layer
         """
-        num_path_layers = [0] * len(layers)
-        for line in path.getLines():
-            if (self.LineWhichlayer(layers, line) is not None):
-                line_i = layers.index(self.LineWhichlayer(layers, line))
-                num_path_layers[line_i] += 1
-        return num_path_layers
+        return layers.layer_edge_vector(path)
 
     def check_if_bound(self, path: Path, layers):
         """
@@ -366,23 +390,15 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         Returns
         ---------
         bool
         """
-        num_in_layers = []
-        for layer in layers:
-            num_in_layers.append(len(layer.getLines()))
-        num_path_layers = self.check_bound(path, layers)
-        if (len(layers[-1].getNodes()) in [1, 2]):
-            return all([x - y == 1 for x, y in zip(num_in_layers[:-1],
-                       num_path_layers[:-1])] + [num_in_layers[-1] == num_path_layers[-1]])
-        else:
-            return all(
-                [x - y == 1 for x, y in zip(num_in_layers, num_path_layers)])
+        return np.array_equal(
+            self.check_bound(path, layers), layers.bound_target())
 
     def check_layercross(self, path: Path, layers):
         """
@@ -393,7 +409,7 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set
 
         Returns
@@ -402,18 +418,7 @@ class Solver(QObject):
             A matrix of integers representing the number of edges
             that are between two layers
         """
-        n = len(layers)
-        arr = np.zeros((n, n), dtype=int)
-        linelist = [
-            line for line in path.getLines() if self.LineWhichlayer(
-                layers, line) is None]
-        for line in linelist:
-            nodes = path.whichNodes(line)
-            node_i = layers.index(self.NodeWhichlayer(layers, nodes[0]))
-            node_j = layers.index(self.NodeWhichlayer(layers, nodes[1]))
-            arr[node_i][node_j] += 1
-            arr[node_j][node_i] += 1
-        return arr
+        return layers.layer_cross_matrix(path)
 
     def check_if_layercross(self, path: Path, layers):
         """
@@ -424,17 +429,15 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set
 
         Returns
         ----------
         bool
         """
-        n = len(layers)
-        arr = self.check_layercross(path, layers)
-        sample_arr = np.eye(n, k=1, dtype=int) + np.eye(n, k=-1, dtype=int)
-        return np.all(arr == sample_arr)
+        return np.array_equal(
+            self.check_layercross(path, layers), layers.reference_matrix())
 
     def valid_canonical(self, path: Path, layers):
         """
@@ -445,17 +448,245 @@ class Solver(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
+            The layer set
+
+        Returns
+        ----------
+        bool
+        """
+        if (self.tracker is not None and self.tracker.tracks(path, layers)):
+            canonical = self.tracker.is_canonical()
+        else:
+            canonical = self.check_if_bound(
+                path, layers) and self.check_if_layercross(path, layers)
+        return canonical and (
+            path.is_spanning_path() and not path.has_crossing())
+
+    def follow_plan(self, path: Path, layers):
+        """
+        Flip the path into a canonical path along a planned flip sequence.
+
+        The canonical paths starting at an end of the path are tried
+        first and the shortest plan is taken. If there is none, the ones
+        starting at the PLAN_STARTS other vertices of the outermost layer
+        closest to an end of the path are tried, in that order. Together
+        with the limits of the FlipPlanner this bounds the time taken.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        layers: LayerIndex
             The layer set
 
         Returns
         ----------
         bool
+            True if a plan was found and carried out
+        """
+        if (not (path.is_spanning_path() and not path.has_crossing())):
+            return False
+        targets = self._canvas.target_paths()
+        planner = FlipPlanner(path.crossing_table())
+        nodes = path.getNodes()
+        index = {id(node): i for i, node in enumerate(nodes)}
+        order = [index[id(node)] for node in path.path_node_order()]
+        n = len(order)
+        ends = [i for i in [order[0], order[-1]] if targets.layer_of(i) == 0]
+        others = sorted(range(n), key=lambda k: min(k, n - 1 - k))
+        others = [order[k] for k in others
+                  if targets.layer_of(order[k]) == 0
+                  and order[k] not in ends][:self.PLAN_STARTS]
+        plans = []
+        for start in ends + others:
+            if (plans and start not in ends):
+                break
+            for clockwise in [True, False]:
+                flips = planner.plan(order, targets.canonical(start, clockwise))
+                if (flips is not None):
+                    plans.append(flips)
+        if (not plans):
+            print("No plan found")
+            return False
+        flips = min(plans, key=len)
+        print("Planned flips:", len(flips))
+        return self.apply_flips(path, flips)
+
+    def apply_flips(self, path: Path, flips):
+        """
+        Carry out flips on the path, given by point indices.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        flips: list[tuple]
+            the flips (remove, add), each a pair of indices into the
+            nodes of the path
+
+        Returns
+        ----------
+        bool
+            True if all flips were carried out
         """
-        return self.check_if_bound(
-            path, layers) and self.check_if_layercross(
-            path, layers) and (
-            path.is_spanning_path() and not path.crosses())
+        nodes = path.getNodes()
+        painter = QPainter(self._canvas.pixmap())
+        pen = QPen()
+        for remove, add in flips:
+            if (self.stopped):
+                break
+            self._canvas.delete_edge(
+                painter, pen, nodes[remove[0]], nodes[remove[1]])
+            self._canvas.draw_edge(painter, pen, nodes[add[0]], nodes[add[1]])
+            print("Flipped:", str(nodes[remove[0]]), ",", str(nodes[remove[1]]),
+                  "->", str(nodes[add[0]]), ",", str(nodes[add[1]]))
+        self._canvas.update()
+        painter.end()
+        return not self.stopped
+
+    def search(self, path: Path, layers, strategy):
+        """
+        Flip the path into a canonical path found by a SearchStrategy.
+
+        The search runs in a WorkerProcess, its progress is shown as
+        message. The path is only flipped after the search is done, so
+        a killed search leaves it as it was.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        layers: LayerIndex
+            The layer set
+
+        strategy: type
+            the SearchStrategy class
+
+        Returns
+        ----------
+        bool
+            True if a canonical path was found and reached
+        """
+        if (not (path.is_spanning_path() and not path.has_crossing())):
+            return False
+        self.worker = WorkerProcess(search_worker, path_arrays(path, layers),
+                                    (strategy, 0), self.deadline)
+        result = self.worker.run(
+            progress=lambda info: self.message.emit(
+                "Searching (" + info["strategy"] + "): step "
+                + str(info["steps"]) + ", distance " + str(info["distance"])),
+            stopped=lambda: self.stopped)
+        self.timed_out = self.worker.timed_out
+        self.worker = None
+        if (result is None):
+            return False
+        flips, self.report = result
+        if (flips is None):
+            return False
+        print("Searched flips:", len(flips))
+        return self.apply_flips(path, flips)
+
+    def run_portfolio(self, path: Path, layers):
+        """
+        Flip the path into a canonical path found by the first of a
+        Portfolio of searches in worker processes.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        layers: LayerIndex
+            The layer set
+
+        Returns
+        ----------
+        bool
+            True if a canonical path was found and reached
+        """
+        if (not (path.is_spanning_path() and not path.has_crossing())):
+            return False
+        portfolio = Portfolio(deadline=self.deadline)
+        flips = portfolio.solve(path, layers, list(STRATEGIES.values()),
+                                stopped=lambda: self.stopped)
+        self.report = portfolio.report
+        print("Portfolio attempts done:", len(portfolio.reports),
+              "taken:", self.report)
+        if (flips is None):
+            return False
+        print("Searched flips:", len(flips))
+        return self.apply_flips(path, flips)
+
+    def boundary_heuristic(self, path: Path, layers):
+        """
+        Flip the path into a canonical path by the boundary algorithm,
+        with random steps to get out of loops.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        layers: LayerIndex
+            The layer set
+
+        Returns
+        ----------
+        bool
+            True if a canonical path was reached
+        """
+        start = perf_counter()
+        rand = 3
+        steps = 0
+        while (not self.valid_canonical(path, layers)):
+            if (self.stopped):
+                break
+            steps += 1
+            print("\nSolve step:", str(steps))
+            candidates = [path.getStart(), path.getEnd()]
+            for anchor_node in candidates:
+                if (self.valid_canonical(path, layers)):
+                    break
+                if (self.stopped):
+                    break
+                if (steps % 5 == 0):
+                    try:
+                        print("Trying:", str(anchor_node))
+                        self.boundary_alg_alt(path, layers, anchor_node)
+                    except AssertionError as e:
+                        print(e)
+                        continue
+                else:
+                    try:
+                        print("Trying:", str(anchor_node))
+                        self.boundary_alg(path, layers, anchor_node)
+                    except AssertionError as e:
+                        print(e)
+                        continue
+            if (steps % 5 == rand):
+                if (steps < 50 and steps > 5):
+                    self.allocate_non_layer(path, layers)
+                    rand = randint(2, 3)
+                elif (steps > 50 and steps < 800):
+                    self.allocate_non_layer(path, layers, 1)
+                    rand = randint(2, 3)
+                else:
+                    self.allocate_non_layer(path, layers, 1)
+                    rand = 1
+            if (steps > 1000):
+                break
+        success = self.valid_canonical(path, layers)
+        self.report = {"strategy": "heuristic",
+                       "points": len(path.getNodes()), "steps": steps,
+                       "seconds": perf_counter() - start, "success": success}
+        print("Strategy: heuristic points:", self.report["points"],
+              "steps:", steps, "time: %.3fs" % self.report["seconds"],
+              "success:", success)
+        return success
 
     @pyqtSlot()
     def solve_to_canonical(self):
@@ -469,68 +700,60 @@ class Solver(QObject):
             path = self._canvas.graph
             layers = self._canvas.layers
             self.stopped = False
-            rand = 3
-            steps = 0
-            layercross = []
-            layercross.append(self.check_layercross(path, layers))
-            while (not self.valid_canonical(path, layers)):
-                if (self.stopped):
-                    break
-                steps += 1
-                print("\nSolve step:", str(steps))
-                candidates = [path.getStart(), path.getEnd()]
-                for anchor_node in candidates:
-                    if (self.valid_canonical(path, layers)):
-                        break
-                    if (self.stopped):
-                        break
-                    if (steps % 5 == 0):
-                        try:
-                            print("Trying:", str(anchor_node))
-                            self.boundary_alg_alt(path, layers, anchor_node)
-                        except AssertionError as e:
-                            print(e)
-                            continue
-                    else:
-                        try:
-                            print("Trying:", str(anchor_node))
-                            self.boundary_alg(path, layers, anchor_node)
-                        except AssertionError as e:
-                            print(e)
-                            continue
-                if (steps % 5 == rand):
-                    if (steps < 50 and steps > 5):
-                        self.allocate_non_layer(path, layers)
-                        rand = randint(2, 3)
-                    elif (steps > 50 and steps < 800):
-                        self.allocate_non_layer(path, layers, 1)
-                        rand = randint(2, 3)
+            # a stored result for the same order type and path is replayed
+            results = self._canvas.results
+            key = results.key("solve", path)
+            cached = results.get(key)
+            replayed = False
+            if (cached is not None):
+                position = self._canvas.history.position()
+                self._canvas.replay(cached)
+                replayed = self.valid_canonical(path, layers)
+                if (not replayed):
+                    print("Stored result does not apply")
+                    self._canvas.seek(position)
+            # the history may have restored the graph without telling its
+            # listeners or given another graph, so the tracker comes after
+            path = self._canvas.graph
+            self.tracker = CanonicalTracker(path, layers)
+            recorder = FlipRecorder(path)
+            if (not self.valid_canonical(path, layers)):
+                # the steps below are only needed without a plan
+                self.follow_plan(path, layers)
+            if (not self.valid_canonical(path, layers)
+                    and not self.stopped):
+                if (self.mode == SolveMode.HEURISTIC):
+                    self.boundary_heuristic(path, layers)
+                elif (self.mode == SolveMode.PORTFOLIO):
+                    self.run_portfolio(path, layers)
+                else:
+                    self.search(path, layers, STRATEGIES[self.mode])
+                if (not self.valid_canonical(path, layers)
+                        and not self.stopped):
+                    if (self.timed_out):
+                        self._canvas.message.emit("Forced stop: Deadline")
                     else:
-                        self.allocate_non_layer(path, layers, 1)
-                        rand = 1
-                if (steps > 1000):
-                    self._canvas.message.emit("Forced stop: Too many steps")
+                        self._canvas.message.emit(
+                            "Forced stop: Too many steps")
                     self.forced_stop.emit()
-                    break
-                layercross.append(self.check_layercross(path, layers))
+            recorder.detach()
             if (self.valid_canonical(path, layers)):
+                if (not replayed):
+                    ops = recorder.compacted()
+                    print("Flips recorded:", len(recorder.ops),
+                          "compacted:", len(ops))
+                    results.put(key, ops)
                 self._canvas.message.emit("Solved")
                 self.solved.emit()
             elif (self.stopped):
-                path = deepcopy(self._canvas.graph)
-                nodes = path.getNodes()
-                path_start = path.getStart()
-                path_end = path.getEnd()
-                lines = path.getLines()
-                self._canvas.graph = Path(
-                    Nodes=nodes, start=path_start, end=path_end, Lines=[])
-                for line in lines:
-                    points = self._canvas.graph.whichNodes(line)
-                    self._canvas.graph.connect(points[0], points[1])
+                path = self._canvas.graph
+                restored = Path.from_lines(path.getNodes(), path.getLines())
+                restored.setEnds(path.getStart(), path.getEnd())
+                self._canvas.replace_graph(restored)
                 self._canvas.drawGraph()
                 self._canvas.message.emit("Forced stop: Cancel")
                 self.forced_stop.emit()
-            self._canvas.last_graphs = self.previous_steps
+            self.tracker.detach()
             self.stopped = True
 
     @pyqtSlot()
@@ -547,6 +770,18 @@ class Solver(QObject):
         """
         self.stopped = True
 
+    def kill(self):
+        """
+        Kill the running search at once.
+
+        It is called from the GUI thread, the Solver then ends as if
+        stopped, with the path before the search.
+        """
+        self.stopped = True
+        worker = self.worker
+        if (worker is not None):
+            worker.kill()
+
 
 class SolverThread(QThread):
     stopped = pyqtSignal()
@@ -582,8 +817,11 @@ class SolverThread(QThread):
     def force_stop(self):
         """
         Force the thread to stop.
+
+        A search in a worker process is killed, so the thread ends
+        without waiting for the next step of the search.
         """
-        self._solver.change_stop()
+        self._solver.kill()
         self.requestInterruption()
         self.wait()
         self.stopped.emit()
@@ -0,0 +1,209 @@
+import numpy as np
+
+
+class TargetPaths:
+
+    def __init__(self, graph, layers):
+        """
+        The TargetPaths class.
+
+        The canonical path and the wrapping path of a point set, built
+        directly from the layers instead of being searched for.
+
+        The canonical path runs around the outermost layer from the start
+        vertex, jumps to a vertex of the next layer visible from its last
+        vertex, runs around that layer in the same orientation and so on,
+        a spiral over all layers. It takes O(n) after the layers are known.
+        Layers with collinear vertices are run around in the order they
+        are given in, the path is then only as good as that order.
+
+        The wrapping path starts with the same edge and then always takes
+        the remaining point with the widest angle, as Wrapper.get_wrapping()
+        does, one AngularOrder.widest() scan per point.
+
+        Paths are cached per start vertex and orientation, the object
+        belongs to one point set (see matches()).
+
+        Parameters
+        ----------
+        graph: Graph
+            a graph on the point set
+        layers: LayerIndex
+            the layers of the point set
+        """
+        self._order = graph.order_type()
+        self._angular = graph.angular_order()
+        coords = graph.coord_array()
+        self._points = [tuple(c) for c in coords.tolist()]
+        index = {c: i for i, c in enumerate(self._points)}
+        self._layers = [[index[node.get_coord()] for node in layer.getNodes()]
+                        for layer in layers]
+        self._layer_of = {}
+        for k, layer in enumerate(self._layers):
+            for i in layer:
+                self._layer_of[i] = k
+        self._paths = {}
+
+    def matches(self, coords):
+        """
+        Check if the paths belong to a point set.
+
+        Parameters
+        ----------
+        coords: numpy.ndarray
+            n x 2 array of coordinates
+
+        Returns
+        -------
+        bool
+        """
+        return self._order.matches(coords)
+
+    def _turn(self, a, b, c):
+        """
+        Orientation of three points, looked up in the OrderType.
+        """
+        return int(self._order.orientation(a, b, c))
+
+    def _dist(self, a, b):
+        (ax, ay), (bx, by) = self._points[a], self._points[b]
+        return (ax - bx) * (ax - bx) + (ay - by) * (ay - by)
+
+    def _oriented(self, layer, sign):
+        """
+        Get the vertices of a layer in the order of the given orientation.
+        """
+        for k in range(len(layer) - 2):
+            turn = self._turn(layer[k], layer[k + 1], layer[k + 2])
+            if (turn != 0):
+                return list(layer) if turn == sign else list(reversed(layer))
+        return list(layer)
+
+    def _entry(self, v, layer, sign):
+        """
+        Get the vertex of a layer where a path coming from v enters it.
+
+        It is the tangent point from v after which the layer turns in
+        the orientation of the path, v sees it without crossing the
+        layer. Of several tangent points on one ray the nearest is taken.
+        """
+        w = layer[0]
+        for x in layer[1:]:
+            turn = self._turn(v, w, x)
+            if (turn == -sign or (turn == 0
+                                  and self._dist(v, x) < self._dist(v, w))):
+                w = x
+        return w
+
+    def _check_start(self, start):
+        if (self._layer_of.get(start) != 0):
+            raise ValueError("The start must be a vertex of the outer layer")
+
+    def canonical(self, start, clockwise=True):
+        """
+        Get the canonical path from a start vertex.
+
+        Parameters
+        ----------
+        start: int
+            index of the start point, a vertex of the outermost layer
+        clockwise: bool
+            orientation every layer is run around in, in the sense of
+            OrderType.is_clockwise()
+
+        Returns
+        -------
+        list[int]
+            indices of the points in the order of the path
+        """
+        key = ("canonical", start, clockwise)
+        if (key not in self._paths):
+            self._check_start(start)
+            sign = 1 if clockwise else -1
+            order = []
+            for k, layer in enumerate(self._layers):
+                layer = self._oriented(layer, sign)
+                first = start if k == 0 else self._entry(order[-1], layer, sign)
+                i = layer.index(first)
+                order.extend(layer[i:] + layer[:i])
+            self._paths[key] = order
+        return list(self._paths[key])
+
+    def wrapping(self, start, clockwise=True):
+        """
+        Get the wrapping path from a start vertex.
+
+        The second vertex is the neighbour of start on the outermost
+        layer in the given orientation. Of points with the same angle
+        the one coming first along the canonical path is taken.
+
+        Parameters
+        ----------
+        start: int
+            index of the start point, a vertex of the outermost layer
+        clockwise: bool
+            orientation of the first edge, in the sense of
+            OrderType.is_clockwise()
+
+        Returns
+        -------
+        list[int]
+            indices of the points in the order of the path
+        """
+        key = ("wrapping", start, clockwise)
+        if (key not in self._paths):
+            canonical = self.canonical(start, clockwise)
+            if (len(canonical) < 2):
+                self._paths[key] = canonical
+            else:
+                position = np.empty(len(canonical), dtype=int)
+                position[canonical] = np.arange(len(canonical))
+                self._paths[key] = self.wrap(
+                    canonical[0], canonical[1], position)
+        return list(self._paths[key])
+
+    def wrap(self, first, second, position):
+        """
+        Get the wrapping path for a given first edge, without caching.
+
+        Parameters
+        ----------
+        first: int
+            index of the start point
+        second: int
+            index of the second point
+        position: numpy.ndarray
+            n array, of the points with the same angle the one with the
+            smallest position is taken
+
+        Returns
+        -------
+        list[int]
+            indices of the points in the order of the path
+        """
+        alive = np.ones(len(self._points), dtype=bool)
+        alive[[first, second]] = False
+        order = [first, second]
+        while (alive.any()):
+            x = self._angular.widest(order[-1], order[-2], alive, position)
+            alive[x] = False
+            order.append(x)
+        return order
+
+    def layer_of(self, i):
+        """
+        Get the layer id of a point.
+
+        Parameters
+        ----------
+        i: int
+            index of the point
+
+        Returns
+        -------
+        int
+        """
+        return self._layer_of.get(i)
+
+    def __len__(self):
+        return len(self._points)
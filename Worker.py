@@ -0,0 +1,275 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from random import Random
+from time import monotonic
+
+import numpy as np
+
+from GraphClass import CrossingTable
+from GraphClass import EdgeMask
+from GraphClass import LayerIndex
+from GraphClass import Path
+from GraphClass import PointSet
+
+# random orders randomize_worker() tries before it takes the sorted one
+RANDOM_TRIES = 10000
+
+
+class SharedArrays:
+
+    def __init__(self, arrays):
+        """
+        The SharedArrays class.
+
+        Copies numpy arrays into shared memory blocks, one per array, so
+        a worker process gets them without pickling them. The blocks
+        live until close() is called.
+
+        Parameters
+        ----------
+        arrays: dict[str, numpy.ndarray]
+            the arrays by name
+        """
+        self._blocks = []
+        # name -> (block name, shape, dtype), all a worker needs to attach
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(
+                create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    @staticmethod
+    def attach(spec):
+        """
+        Get copies of the arrays in a worker process.
+
+        Parameters
+        ----------
+        spec: dict
+            the spec of the SharedArrays
+
+        Returns
+        -------
+        dict[str, numpy.ndarray]
+            the arrays by name
+        """
+        arrays = {}
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            arrays[name] = np.ndarray(
+                shape, np.dtype(dtype), buffer=block.buf).copy()
+            block.close()
+        return arrays
+
+    def close(self):
+        """
+        Free the shared memory blocks.
+        """
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def path_arrays(path, layers=None):
+    """
+    Get the arrays a worker needs to rebuild a path and its layer set.
+
+    Parameters
+    ----------
+    path: Path
+        the path
+    layers: LayerIndex
+        the layer set of its points
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        coordinates, order of the path as point indices and, with layers,
+        the point indices of all layers one after the other and the
+        size of every layer
+    """
+    nodes = path.getNodes()
+    index = {id(node): i for i, node in enumerate(nodes)}
+    arrays = {"coords": path.coord_array(),
+              "order": np.array([index[id(node)]
+                                 for node in path.path_node_order()],
+                                dtype=np.intp)}
+    if (layers is not None):
+        position = {node.get_coord(): i for i, node in enumerate(nodes)}
+        ids = [[position[node.get_coord()] for node in layer.getNodes()]
+               for layer in layers]
+        arrays["layers"] = np.array(sum(ids, []), dtype=np.intp)
+        arrays["sizes"] = np.array([len(layer) for layer in ids],
+                                   dtype=np.intp)
+    return arrays
+
+
+def search_worker(conn, spec, strategy, seed):
+    """
+    Run a SearchStrategy in a worker process, on the arrays of
+    path_arrays().
+
+    Sends ("progress", dict) while searching and ("done", (flips, report))
+    at the end.
+    """
+    arrays = SharedArrays.attach(spec)
+    coords = arrays["coords"]
+    order = arrays["order"].tolist()
+    ids = np.split(arrays["layers"], np.cumsum(arrays["sizes"])[:-1])
+    layers = LayerIndex.from_arrays(coords, [layer.tolist() for layer in ids])
+    search = strategy(Path.from_order(order, PointSet(coords)), layers, seed)
+    search.progress = lambda info: conn.send(("progress", info))
+    flips = search.run(order)
+    conn.send(("done", (flips, search.report())))
+
+
+def randomize_worker(conn, spec, seed, tries=RANDOM_TRIES):
+    """
+    Find a random plane spanning path in a worker process, on the array
+    "coords".
+
+    Random orders are tried until one is a plane path. If none of the
+    first tries is, the points are taken in the order of their x and
+    then y coordinate, that path is always plane.
+
+    Sends ("progress", dict) every 1000 tries and ("done", (order, found))
+    at the end, order being the point indices in the order of the path
+    and found False for the fallback path.
+    """
+    coords = SharedArrays.attach(spec)["coords"]
+    table = CrossingTable(coords)
+    n = len(coords)
+    order = list(range(n))
+    random = Random(seed)
+    # tried paths, a path and its reverse have the same EdgeMask
+    past_paths = set()
+    for x in range(1, tries + 1):
+        if (x % 1000 == 0):
+            conn.send(("progress", {"steps": x}))
+        random.shuffle(order)
+        sample = EdgeMask.from_order(table, order)
+        if (sample in past_paths):
+            continue
+        # extend the path edge by edge, each new edge is checked against
+        # the edges so far
+        mask = table.mask([])
+        complete = True
+        for i in range(1, n):
+            edge = [(order[i - 1], order[i])]
+            if (table.crosses(edge, mask)[0]):
+                complete = False
+                break
+            mask |= table.mask(edge)
+        if (complete):
+            conn.send(("done", (order, True)))
+            return
+        past_paths.add(sample)
+    order = np.lexsort((coords[:, 1], coords[:, 0])).tolist()
+    conn.send(("done", (order, False)))
+
+
+class WorkerProcess:
+    # seconds between two checks for messages, stop and deadline
+    POLL = 0.05
+
+    def __init__(self, target, arrays, args=(), deadline=None):
+        """
+        The WorkerProcess class.
+
+        Runs a function in a separate process, which unlike a QThread can
+        be killed at any time. The arrays are handed over in shared
+        memory (SharedArrays), the function streams ("progress", value)
+        messages through a pipe and ends with ("done", result).
+
+        The worker is started with the "spawn" method, so it does not
+        inherit the state of the Qt application. Nothing of the caller
+        is changed by the worker, so a killed worker leaves the last
+        consistent state behind.
+
+        Parameters
+        ----------
+        target: callable
+            module level function called as target(conn, spec, *args)
+        arrays: dict[str, numpy.ndarray]
+            the arrays to share
+        args: tuple
+            further arguments of target
+        deadline: float
+            seconds after which the worker is killed, None for no limit
+        """
+        self._target = target
+        self._arrays = arrays
+        self._args = args
+        self.deadline = deadline
+        self._process = None
+        self.timed_out = False
+        self.killed = False
+
+    def run(self, progress=None, stopped=None):
+        """
+        Run the worker and wait for its result.
+
+        Parameters
+        ----------
+        progress: callable
+            called with the value of every progress message
+        stopped: callable
+            returns True if the worker should be killed
+
+        Returns
+        -------
+        object
+            the result, None if the worker was killed, ran past the
+            deadline or died
+        """
+        context = multiprocessing.get_context("spawn")
+        shared = SharedArrays(self._arrays)
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=self._target, args=(sender, shared.spec) + self._args,
+            daemon=True)
+        end = None if self.deadline is None else monotonic() + self.deadline
+        try:
+            self._process.start()
+            sender.close()
+            while (True):
+                if (stopped is not None and stopped()):
+                    self.kill()
+                if (self.killed):
+                    return None
+                if (end is not None and monotonic() > end):
+                    self.timed_out = True
+                    self.kill()
+                    return None
+                if (receiver.poll(self.POLL)):
+                    try:
+                        kind, value = receiver.recv()
+                    except EOFError:
+                        # the worker died without a result
+                        return None
+                    if (kind == "done"):
+                        return value
+                    if (progress is not None):
+                        progress(value)
+        finally:
+            if (self._process.is_alive()):
+                self._process.kill()
+            if (self._process.pid is not None):
+                self._process.join()
+            receiver.close()
+            shared.close()
+
+    def kill(self):
+        """
+        Kill the worker at once, run() then returns None.
+
+        It may be called from another thread than run().
+        """
+        process = self._process
+        if (process is not None and process.is_alive()):
+            self.killed = True
+            process.kill()
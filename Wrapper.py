@@ -1,6 +1,8 @@
+from functools import cmp_to_key
 from random import shuffle
 from time import sleep
 
+import numpy as np
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtCore import pyqtSlot
 from PyQt5.QtCore import QObject
@@ -13,6 +15,8 @@ from PyQt5.QtWidgets import QPushButton
 from GraphClass import Line
 from GraphClass import Node
 from GraphClass import Path
+from Portfolio import Portfolio
+from ResultCache import FlipRecorder
 
 
 class Wrapper(QObject):
@@ -20,7 +24,7 @@ class Wrapper(QObject):
     forced_stop = pyqtSignal()
     message = pyqtSignal(str)
 
-    def __init__(self, canvas, parent=None):
+    def __init__(self, canvas, portfolio=False, parent=None):
         """
         The Wrapper Object.
 
@@ -30,10 +34,14 @@ class Wrapper(QObject):
         ----------
         canvas: Canvas
             the Canvas class defined in Canvas.py
+        portfolio: bool
+            plan the flips to the wrapping paths from both ends in a
+            Portfolio of worker processes before the heuristic
         """
         super().__init__()
         self._canvas = canvas
         self.stopped = True
+        self.portfolio = portfolio
 
     def NodeWhichlayer(self, layers, node):
         """
@@ -41,7 +49,7 @@ class Wrapper(QObject):
 
         Parameters
         ----------
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         node: Node
@@ -52,10 +60,10 @@ class Wrapper(QObject):
         layer: Graph
             the layer, where the node lies.
         """
-        for layer in layers:
-            if (node in layer.getNodes()):
-                return layer
-        return None
+        i = layers.node_layer(node)
+        if (i is None):
+            return None
+        return layers[i]
 
     def get_wrapping(self, path, layers, start):
         """
@@ -66,7 +74,7 @@ class Wrapper(QObject):
         path: Path
             The path
 
-        layers: list[Graph]
+        layers: LayerIndex
             The layer set.
 
         start: Node
@@ -82,26 +90,118 @@ class Wrapper(QObject):
         if (start == nodes_in_order[-1]):
             nodes_in_order.reverse()
         assert (
-            layers.index(
-                self.NodeWhichlayer(
-                    layers,
-                    nodes_in_order[0])) == 0)
+            layers.node_layer(nodes_in_order[0]) == 0)
         wrapping_path_order = [nodes_in_order[0]]
         other_nodes = nodes_in_order[1:]
-        second = next(node for node in other_nodes if layers.index(
-            self.NodeWhichlayer(layers, nodes_in_order[0])) == 0)
+        second = next(node for node in other_nodes if layers.node_layer(
+            nodes_in_order[0]) == 0)
         wrapping_path_order.append(second)
         other_nodes = [node for node in other_nodes if node != second]
-        while (other_nodes):
-            other_nodes.sort(key=lambda node:
-                             min(path.angle(wrapping_path_order[-2], wrapping_path_order[-1], node),
-                                 path.angle(node, wrapping_path_order[-1], wrapping_path_order[-2])),
-                             reverse=True)
-            x = other_nodes.pop(0)
-            wrapping_path_order.append(x)
+        nodes = path.getNodes()
+        index = {id(node): i for i, node in enumerate(nodes)}
+        # a first edge along the outer layer gives a stored target path
+        targets = self._canvas.target_paths()
+        for clockwise in [True, False]:
+            target = targets.canonical(index[id(nodes_in_order[0])], clockwise)
+            if (target[1] == index[id(second)]):
+                wrapping_path_order = [
+                    nodes[i] for i in targets.wrapping(target[0], clockwise)]
+                print(wrapping_path_order, "\n")
+                return wrapping_path_order
+        # next is the node with the widest angle at the last node, ties go
+        # to the node coming first along the path
+        angular = path.angular_order()
+        alive = np.zeros(len(nodes), dtype=bool)
+        position = np.full(len(nodes), len(nodes))
+        for k, node in enumerate(other_nodes):
+            alive[index[id(node)]] = True
+            position[index[id(node)]] = k
+        while (alive.any()):
+            x = angular.widest(index[id(wrapping_path_order[-1])],
+                               index[id(wrapping_path_order[-2])],
+                               alive, position)
+            alive[x] = False
+            wrapping_path_order.append(nodes[x])
         print(wrapping_path_order, "\n")
         return wrapping_path_order
 
+    def is_wrapped(self, path, layers):
+        """
+        Check if the path already is the wrapping path from one of its ends.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        layers: LayerIndex
+            The layer set.
+
+        Returns
+        -------
+        bool
+        """
+        candidates = [node for node in [path.getStart(), path.getEnd()]
+                      if layers.node_layer(node) == 0]
+        for start in candidates:
+            try:
+                old_path = path.path_node_order()
+                new_path = self.get_wrapping(path, layers, start)
+            except AssertionError:
+                return False
+            if (old_path[0] != new_path[0]):
+                old_path.reverse()
+            if (old_path == new_path):
+                return True
+        return False
+
+    def plan_wrapping(self, path, layers):
+        """
+        Flip the path into the wrapping path from one of its ends, along
+        the shortest of the plans made by a Portfolio.
+
+        Parameters
+        ----------
+        path: Path
+            The path
+
+        layers: LayerIndex
+            The layer set.
+
+        Returns
+        -------
+        Node
+            the start of the wrapping path reached, None if there is no
+            plan
+        """
+        nodes = path.getNodes()
+        index = {id(node): i for i, node in enumerate(nodes)}
+        targets = self._canvas.target_paths()
+        wrappings = [targets.wrapping(index[id(node)], clockwise)
+                     for node in [path.getStart(), path.getEnd()]
+                     if layers.node_layer(node) == 0
+                     for clockwise in [True, False]]
+        planned = Portfolio(shortest=True).plan(
+            path, wrappings, stopped=lambda: self.stopped)
+        if (planned is None):
+            print("No plan found")
+            return None
+        flips, k = planned
+        print("Planned flips:", len(flips))
+        painter = QPainter(self._canvas.pixmap())
+        pen = QPen()
+        for remove, add in flips:
+            if (self.stopped):
+                break
+            self._canvas.delete_edge(
+                painter, pen, nodes[remove[0]], nodes[remove[1]])
+            self._canvas.draw_edge(painter, pen, nodes[add[0]], nodes[add[1]])
+        self._canvas.update()
+        painter.end()
+        if (self.stopped):
+            return None
+        return nodes[wrappings[k][0]]
+
     def try_edge(
             self,
             painter: QPainter,
@@ -140,14 +240,11 @@ class Wrapper(QObject):
         print("Trying Edge...")
         print("Connecting:", node1, node2)
         if (not Line(node1.get_coord(), node2.get_coord()) in path.getLines()):
-            self._canvas.draw_edge(painter, pen, node1, node2)
-            bad_edges = self._canvas.problem_edge()
             bad_edges = [
-                line for line in bad_edges if line != Line(
-                    node1.get_coord(),
-                    node2.get_coord())]
-            def comp(line): return layer.index(self.NodeWhichlayer(layer, path.whichNodes(
-                line)[0])) + layer.index(self.NodeWhichlayer(layer, path.whichNodes(line)[1]))
+                line for line in path.getLines() if path.evaluate_flip(
+                    path.whichNodes(line), (node1, node2))]
+            def comp(line): return layer.point_layer(
+                line.getPoints()[0]) + layer.point_layer(line.getPoints()[1])
             print("Can delete:", bad_edges)
             if (bad_edges):
                 bad_edges.sort(key=comp, reverse=True)
@@ -160,15 +257,14 @@ class Wrapper(QObject):
                 shuffle(bad_edges)
                 todel_edge = bad_edges[0]
                 todel_points = path.whichNodes(todel_edge)
+                self._canvas.draw_edge(painter, pen, node1, node2)
                 print("Disconnecting:", todel_points[0], todel_points[1])
                 self._canvas.delete_edge(
                     painter, pen, todel_points[0], todel_points[1])
                 self._canvas.update()
                 return 1
             else:
-                print("Reverting change.")
-                self._canvas.delete_edge(painter, pen, node1, node2)
-                self._canvas.update()
+                print("Nothing to delete.")
                 return 0
         else:
             print("Already connected.")
@@ -213,14 +309,12 @@ class Wrapper(QObject):
         print("Trying to delete Edge...")
         print("Disconnecting:", node1, node2)
         if (Line(node1.get_coord(), node2.get_coord()) in path.getLines()):
-            self._canvas.delete_edge(painter, pen, node1, node2)
-            bad_edges = self._canvas.problem_edge()
             bad_edges = [
-                line for line in bad_edges if line != Line(
-                    node1.get_coord(),
-                    node2.get_coord())]
-            def comp(line): return layer.index(self.NodeWhichlayer(layer, path.whichNodes(
-                line)[0])) + layer.index(self.NodeWhichlayer(layer, path.whichNodes(line)[1]))
+                Line(first.get_coord(), second.get_coord())
+                for first, second in path.reconnections(node1, node2)
+                if path.evaluate_flip((node1, node2), (first, second))]
+            def comp(line): return layer.point_layer(
+                line.getPoints()[0]) + layer.point_layer(line.getPoints()[1])
             print("Can add:", bad_edges)
             if (bad_edges):
                 bad_edges.sort(key=comp, reverse=True)
@@ -233,15 +327,14 @@ class Wrapper(QObject):
                 shuffle(bad_edges)
                 toadd_edge = bad_edges[0]
                 toadd_points = path.whichNodes(toadd_edge)
+                self._canvas.delete_edge(painter, pen, node1, node2)
                 print("Connecting:", toadd_points[0], toadd_points[1])
                 self._canvas.draw_edge(
                     painter, pen, toadd_points[0], toadd_points[1])
                 self._canvas.update()
                 return 1
             else:
-                print("Reverting change.")
-                self._canvas.draw_edge(painter, pen, node1, node2)
-                self._canvas.update()
+                print("Nothing to add.")
                 return 0
         else:
             print("Already disconnected.")
@@ -386,20 +479,17 @@ class Wrapper(QObject):
         shuffle(adj_list)
         for other in adj_list:
             print("Scanning second node:", other)
-            print("Disconnected:", node, other)
-            self._canvas.delete_edge(painter, pen, node, other)
-            bad_edges = self._canvas.problem_edge()
             bad_edges = [
-                line for line in bad_edges if line != Line(
-                    node.get_coord(),
-                    other.get_coord())]
+                Line(first.get_coord(), second.get_coord())
+                for first, second in path.reconnections(node, other)
+                if path.evaluate_flip((node, other), (first, second))]
             '''
             if (path_start != None):
                 bad_edges = [line for line in bad_edges if not path_start in path.whichNodes(line)]
             '''
             print("Can add:", bad_edges)
-            def comp(line): return layer.index(self.NodeWhichlayer(layer, path.whichNodes(
-                line)[0])) + layer.index(self.NodeWhichlayer(layer, path.whichNodes(line)[1]))
+            def comp(line): return layer.point_layer(
+                line.getPoints()[0]) + layer.point_layer(line.getPoints()[1])
             if (bad_edges):
                 bad_edges.sort(key=comp, reverse=True)
                 val = comp(bad_edges[0])
@@ -411,6 +501,8 @@ class Wrapper(QObject):
                 shuffle(bad_edges)
                 toadd_edge = bad_edges[0]
                 toadd_points = path.whichNodes(toadd_edge)
+                print("Disconnected:", node, other)
+                self._canvas.delete_edge(painter, pen, node, other)
                 print("Connecting:", toadd_points[0], toadd_points[1])
                 self._canvas.draw_edge(
                     painter, pen, toadd_points[0], toadd_points[1])
@@ -427,9 +519,7 @@ class Wrapper(QObject):
                             painter, pen, path, layer, path_start, others)
                     return 1
             else:
-                print("Reverting change.")
-                self._canvas.draw_edge(painter, pen, node, other)
-                self._canvas.update()
+                print("Nothing to add.")
         return 0
 
     def node_partition(self, path: Path, layer):
@@ -441,7 +531,7 @@ class Wrapper(QObject):
         path: Path
             The path
 
-        layer: list[Graph]
+        layer: LayerIndex
             The
 
         Returns
@@ -450,14 +540,12 @@ class Wrapper(QObject):
             The node partition
         """
         node_order = path.path_node_order()
-        if (layer.index(self.NodeWhichlayer(layer, node_order[0])) != 0):
+        if (layer.node_layer(node_order[0]) != 0):
             node_order.reverse()
         partition = []
         for i in range(len(layer)):
             temp_list = [
-                node for node in node_order if layer.index(
-                    self.NodeWhichlayer(
-                        layer, node)) == i]
+                node for node in node_order if layer.node_layer(node) == i]
             partition.append(temp_list)
         return partition
 
@@ -471,7 +559,7 @@ class Wrapper(QObject):
         path: Path
             The current path
 
-        layer: list[Graph]
+        layer: LayerIndex
             The layer set
 
         old_path_order: list[Node]
@@ -490,21 +578,22 @@ class Wrapper(QObject):
         nodes_to_be_checked = old_path_order[i:]
         print("Current:", current)
         print("Next: ", old_next)
+        angular = path.angular_order()
+        nodes = path.getNodes()
+
+        def compare(node1, node2): return angular.compare(
+            nodes.index(current), nodes.index(to_be_connected),
+            nodes.index(node1), nodes.index(node2))
         nodes_to_be_checked = [
-            node for node in nodes_to_be_checked if min(
-                path.angle(
-                    old_next, current, to_be_connected), path.angle(
-                    to_be_connected, current, old_next)) >= min(
-                path.angle(
-                    node, current, to_be_connected), path.angle(
-                    to_be_connected, current, node))]
+            node for node in nodes_to_be_checked
+            if compare(node, old_next) <= 0]
         """
         nodes_to_be_checked = [node for node in nodes_to_be_checked if node != old_next]
-        nodes_to_be_checked.sort(key = lambda node: layer.index(self.NodeWhichlayer(layer,node)))
+        nodes_to_be_checked.sort(key = lambda node: layer.node_layer(node))
         new_nodes = []
         for x in range(len(layer)):
             temp_nodelist = [node for node in nodes_to_be_checked
-                             if layer.index(self.NodeWhichlayer(layer,node)) == x]
+                             if layer.node_layer(node) == x]
             temp_nodelist.sort(key = lambda node:
                                 min(path.angle(node, current, to_be_connected),
                                 path.angle(to_be_connected, current, node)))
@@ -515,11 +604,7 @@ class Wrapper(QObject):
                                     path.angle(to_be_connected, current, node)))
         '''
         """
-        nodes_to_be_checked.sort(
-            key=lambda node: min(
-                path.angle(
-                    node, current, to_be_connected), path.angle(
-                    to_be_connected, current, node)))
+        nodes_to_be_checked.sort(key=cmp_to_key(compare))
         print("Nodes to be checked:", nodes_to_be_checked)
         painter = QPainter(self._canvas.pixmap())
         pen = QPen()
@@ -566,7 +651,7 @@ class Wrapper(QObject):
         path: Path
             The current path
 
-        layer: list[Graph]
+        layer: LayerIndex
             The layer set
 
         old_path_order: list[Node]
@@ -585,21 +670,22 @@ class Wrapper(QObject):
         nodes_to_be_checked = old_path_order[i:]
         print("Current:", current)
         print("Next: ", old_next)
+        angular = path.angular_order()
+        nodes = path.getNodes()
+
+        def compare(node1, node2): return angular.compare(
+            nodes.index(current), nodes.index(to_be_connected),
+            nodes.index(node1), nodes.index(node2))
         nodes_to_be_checked = [
-            node for node in nodes_to_be_checked if min(
-                path.angle(
-                    old_next, current, to_be_connected), path.angle(
-                    to_be_connected, current, old_next)) >= min(
-                path.angle(
-                    node, current, to_be_connected), path.angle(
-                    to_be_connected, current, node))]
+            node for node in nodes_to_be_checked
+            if compare(node, old_next) <= 0]
         """
         nodes_to_be_checked = [node for node in nodes_to_be_checked if node != old_next]
-        nodes_to_be_checked.sort(key = lambda node: layer.index(self.NodeWhichlayer(layer,node)))
+        nodes_to_be_checked.sort(key = lambda node: layer.node_layer(node))
         new_nodes = []
         for x in range(len(layer)):
             temp_nodelist = [node for node in nodes_to_be_checked
-                             if layer.index(self.NodeWhichlayer(layer,node)) == x]
+                             if layer.node_layer(node) == x]
             temp_nodelist.sort(key = lambda node:
                                 min(path.angle(node, current, to_be_connected),
                                 path.angle(to_be_connected, current, node)))
@@ -610,11 +696,7 @@ class Wrapper(QObject):
                                     path.angle(to_be_connected, current, node)))
         '''
         """
-        nodes_to_be_checked.sort(
-            key=lambda node: min(
-                path.angle(
-                    node, current, to_be_connected), path.angle(
-                    to_be_connected, current, node)))
+        nodes_to_be_checked.sort(key=cmp_to_key(compare))
         print("Nodes to be checked:", nodes_to_be_checked)
         painter = QPainter(self._canvas.pixmap())
         pen = QPen()
@@ -667,7 +749,7 @@ class Wrapper(QObject):
         path: Path
             The current path
 
-        layer: list[Graph]
+        layer: LayerIndex
             The layer set
 
         start: Node
@@ -698,7 +780,7 @@ class Wrapper(QObject):
         path: Path
             The current path
 
-        layer: list[Graph]
+        layer: LayerIndex
             The layer set
         """
         partition = self.node_partition(path, layer)
@@ -707,20 +789,23 @@ class Wrapper(QObject):
         painter = QPainter(self._canvas.pixmap())
         pen = QPen()
         if (len(next_layer) > 2):
-            def is_clockwise(A, B, C): return (
-                C[1] - A[1]) * (B[0] - A[0]) > (B[1] - A[1]) * (C[0] - A[0])
-            if (is_clockwise(outer_layer[0].get_coord(), outer_layer[1].get_coord(), outer_layer[2].get_coord(
-            )) != is_clockwise(outer_layer[-2].get_coord(), outer_layer[-1].get_coord(), next_layer[0].get_coord())):
+            order = path.order_type()
+            nodes = path.getNodes()
+
+            def is_clockwise(A, B, C): return order.is_clockwise(
+                nodes.index(A), nodes.index(B), nodes.index(C))
+            if (is_clockwise(outer_layer[0], outer_layer[1], outer_layer[2])
+                    != is_clockwise(outer_layer[-2], outer_layer[-1], next_layer[0])):
                 self.try_edge(painter, pen, path, layer,
                               outer_layer[-1], next_layer[0])
             if (
                 is_clockwise(
-                    outer_layer[0].get_coord(),
-                    outer_layer[1].get_coord(),
-                    outer_layer[2].get_coord()) != is_clockwise(
-                    next_layer[0].get_coord(),
-                    next_layer[1].get_coord(),
-                    next_layer[2].get_coord())):
+                    outer_layer[0],
+                    outer_layer[1],
+                    outer_layer[2]) != is_clockwise(
+                    next_layer[0],
+                    next_layer[1],
+                    next_layer[2])):
                 self.try_del_edge(painter, pen, path, layer,
                                   outer_layer[-1], outer_layer[-2])
 
@@ -734,7 +819,7 @@ class Wrapper(QObject):
         path: Path
             The current path
 
-        layer: list[Graph]
+        layer: LayerIndex
             The layer set
 
         i: int
@@ -766,15 +851,32 @@ class Wrapper(QObject):
             self.stopped = False
             path = self._canvas.graph
             candidates = [path.getStart(), path.getEnd()]
-            if (not any([layers.index(self.NodeWhichlayer(
-                    layers, node)) == 0 for node in candidates])):
+            if (not any([layers.node_layer(node) == 0 for node in candidates])):
                 self.message.emit("Try SOLVE it first.")
             else:
+                # a stored result for the same order type and path is replayed
+                results = self._canvas.results
+                key = results.key("wrap", path)
+                cached = results.get(key)
+                replayed = False
+                if (cached is not None):
+                    position = self._canvas.history.position()
+                    self._canvas.replay(cached)
+                    replayed = self.is_wrapped(path, layers)
+                    if (not replayed):
+                        print("Stored result does not apply")
+                        self._canvas.seek(position)
+                # seeking may put another graph object on the canvas
+                path = self._canvas.graph
+                recorder = FlipRecorder(path)
+                candidates = [path.getStart(), path.getEnd()]
                 candidates = [
-                    node for node in candidates if layers.index(
-                        self.NodeWhichlayer(
-                            layers, node)) == 0]
+                    node for node in candidates if layers.node_layer(node) == 0]
                 start = candidates[0]
+                if (self.portfolio and not self.is_wrapped(path, layers)):
+                    planned = self.plan_wrapping(path, layers)
+                    if (planned is not None):
+                        start = planned
                 old_path = path.path_node_order()
                 new_path = self.get_wrapping(path, layers, start)
                 if (old_path[0] != new_path[0]):
@@ -789,8 +891,7 @@ class Wrapper(QObject):
                         break
                     i = next(j for j in range(len(old_path))
                              if old_path[j] != new_path[j])
-                    if (layers.index(self.NodeWhichlayer(
-                            layers, new_path[i - 1])) == 0):
+                    if (layers.node_layer(new_path[i - 1]) == 0):
                         print("FIRST STEP:")
                         self.wrap_path_step_first(path, layers)
                     if (steps % 2 == 0):
@@ -805,9 +906,7 @@ class Wrapper(QObject):
                     candidates = [path.getStart(), path.getEnd()]
                     try:
                         candidates = [
-                            node for node in candidates if layers.index(
-                                self.NodeWhichlayer(
-                                    layers, node)) == 0]
+                            node for node in candidates if layers.node_layer(node) == 0]
                         start = candidates[0]
                         new_path = self.get_wrapping(path, layers, start)
                         if (old_path[0] != new_path[0]):
@@ -847,23 +946,23 @@ class Wrapper(QObject):
                             break
                     '''
                     print("\n")
+                recorder.detach()
                 if (old_path == new_path):
+                    if (not replayed):
+                        ops = recorder.compacted()
+                        print("Flips recorded:", len(recorder.ops),
+                              "compacted:", len(ops))
+                        results.put(key, ops)
                     self._canvas.message.emit("Success")
                     self.wrapped.emit()
                 elif (self.stopped or old_path != new_path):
-                    path = deepcopy(self._canvas.graph)
-                    nodes = path.getNodes()
-                    path_start = path.getStart()
-                    path_end = path.getEnd()
-                    lines = path.getLines()
-                    self._canvas.graph = Path(
-                        Nodes=nodes, start=path_start, end=path_end, Lines=[])
-                    for line in lines:
-                        points = self._canvas.graph.whichNodes(line)
-                        self._canvas.graph.connect(points[0], points[1])
+                    path = self._canvas.graph
+                    restored = Path.from_lines(path.getNodes(), path.getLines())
+                    restored.setEnds(path.getStart(), path.getEnd())
+                    self._canvas.replace_graph(restored)
                     self._canvas.drawGraph()
-                    if ((layers.index(self.NodeWhichlayer(layers, old_path[0])) != 0 and
-                            layers.index(self.NodeWhichlayer(layers, old_path[-1])) != 0)):
+                    if ((layers.node_layer(old_path[0]) != 0 and
+                            layers.node_layer(old_path[-1]) != 0)):
                         self._canvas.message.emit(
                             "Path invalid. Consider SOLVE it again.")
                     else:
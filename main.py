@@ -3,20 +3,25 @@ import sys
 from PyQt5.QtCore import QSize
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QComboBox
 from PyQt5.QtWidgets import QLabel
 from PyQt5.QtWidgets import QMainWindow
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtWidgets import QPushButton
+from PyQt5.QtWidgets import QSlider
 from PyQt5.QtWidgets import QToolBar
 
 from Canvas import Canvas
 from Canvas import MainMode
 from Canvas import SubMode
 
+from Kernels import diagnostics
+
 from Randomizer import Randomizer
 from Randomizer import RandomizerThread
 from Randomizer import RandomizerWaitBox
 
+from Solver import SolveMode
 from Solver import Solver
 from Solver import SolverThread
 from Solver import SolverWaitBox
@@ -89,7 +94,11 @@ class MainWindow(QMainWindow):
         self.button16 = QPushButton("LOAD")
         self.button17 = QPushButton("ABOUT")
         self.button18 = QPushButton("HELP")
+        self.solveMode = QComboBox()
         self.statusText = QLabel("Welcome")
+        self.historySlider = QSlider(Qt.Horizontal)
+        self.historySlider.setFixedWidth(200)
+        self.historySlider.setRange(0, 0)
         self.buttons = [self.button1, self.button2, self.button3, self.button4]
         self.check_dict = {SubMode.DRAW_NODE: 0, SubMode.DRAW_EDGE: 1,
                            SubMode.DEL_NODE: 2, SubMode.DEL_EDGE: 3}
@@ -111,6 +120,10 @@ class MainWindow(QMainWindow):
         # Flip graph specific functions
         self.toolbar1.addWidget(self.button12)
         self.toolbar1.addWidget(self.button13)
+        self.toolbar1.addWidget(self.solveMode)
+        for mode in SolveMode:
+            self.solveMode.addItem(mode.name, mode)
+        self.solveMode.setCurrentIndex(SolveMode.HEURISTIC)
         self.toolbar1.addWidget(self.button14)
 
         # Advanced functions
@@ -119,6 +132,7 @@ class MainWindow(QMainWindow):
         self.toolbar2.addWidget(self.button9)
         self.toolbar2.addWidget(self.button10)
         self.toolbar2.addWidget(self.button11)
+        self.toolbar2.addWidget(self.historySlider)
         self.toolbar2.addWidget(self.button7)
         self.toolbar2.addSeparator()
 
@@ -160,6 +174,9 @@ class MainWindow(QMainWindow):
         self.canvas.message.connect(self.statusText.setText)
         self.canvas.main_mode_change.connect(self.switch_flip_mode)
         self.canvas.sub_mode_change.connect(self.check_sub_mode)
+        self.canvas.history_change.connect(self.update_history_slider)
+        self.historySlider.valueChanged.connect(
+            lambda value: self.canvas.seek(value))
 
         # disabled
         self.button12.setEnabled(False)
@@ -168,6 +185,22 @@ class MainWindow(QMainWindow):
 
     # Methods for buttons
 
+    def update_history_slider(self, position, length):
+        """
+        Move the history slider to the current step of the Canvas.
+
+        Parameters:
+        -----------
+        position: int
+            number of steps done
+        length: int
+            number of steps in the history
+        """
+        self.historySlider.blockSignals(True)
+        self.historySlider.setRange(0, length)
+        self.historySlider.setValue(position)
+        self.historySlider.blockSignals(False)
+
     def check_sub_mode(self, mode_after=None):
         """
         Check the mode of the program based on the buttons clicked.
@@ -259,7 +292,7 @@ class MainWindow(QMainWindow):
         if (self.main_mode_ == MainMode.EDIT_MODE):
             self.canvas.message.emit("Not available in EDIT mode.")
         else:
-            self.solver = Solver(self.canvas)
+            self.solver = Solver(self.canvas, self.solveMode.currentData())
             self.solver.message.connect(self.statusText.setText)
             self.thread = SolverThread(self.solver)
             self.waitbox = SolverWaitBox(self.thread)
@@ -272,7 +305,9 @@ class MainWindow(QMainWindow):
         if (self.main_mode_ == MainMode.EDIT_MODE):
             self.canvas.message.emit("Not available in EDIT mode.")
         else:
-            self.wrapper = Wrapper(self.canvas)
+            self.wrapper = Wrapper(
+                self.canvas,
+                self.solveMode.currentData() == SolveMode.PORTFOLIO)
             self.wrapper.message.connect(self.statusText.setText)
             self.thread = WrapperThread(self.wrapper)
             self.waitbox = WrapperWaitBox(self.thread)
@@ -298,12 +333,17 @@ class MainWindow(QMainWindow):
         msg += "UNDO: Undo previous change\n"
         msg += "REDO: Redo next change\n"
         msg += "TO_START: Undo until it's not undoable\n"
-        msg += "TO_END: Redo until it's not redoable\n\n"
+        msg += "TO_END: Redo until it's not redoable\n"
+        msg += "SLIDER: Jump to any step of the history\n\n"
         msg += "Flip graph specific Functionality: \n\n"
         msg += "FLIP: Switch to Flip Mode\n"
         msg += "LAYERS: Show the iteratively constructed convex layers\n"
         msg += "RANDOM: Randomly generate a path fulfilling all conditions\n"
         msg += "SOLVE: Reconfigure the graph into a canonical path\n"
+        msg += "HEURISTIC/TABU/ANNEALING/BEAM: Strategy of SOLVE without a"
+        msg += " planned flip sequence\n"
+        msg += "PORTFOLIO: Race several seeded strategies in parallel for"
+        msg += " SOLVE, plan in parallel for WRAP\n"
         msg += "WRAP: Reconfigure a canonical path into a wrapping path\n\n"
         msg += "Miscellaneous Functionality:\n\n"
         msg += "SAVE: Save the graph into a .grph file\n"
@@ -348,6 +388,7 @@ if __name__ == '__main__':
     """
     The main function.
     """
+    print(diagnostics())
     app = QApplication(sys.argv)
     size = app.primaryScreen().size()
     window = MainWindow(size.width(), size.height())
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the modules of the program are not a package, they are imported from
+# the top directory of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
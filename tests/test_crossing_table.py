@@ -0,0 +1,192 @@
+import random
+
+import numpy as np
+import pytest
+
+from GraphClass import CrossingCache
+from GraphClass import CrossingTable
+from GraphClass import EdgeMask
+from GraphClass import Line
+
+
+def random_coords(rnd, n, size):
+    # a small grid, so that collinear points occur
+    return np.array(sorted({(rnd.randrange(size), rnd.randrange(size))
+                            for _ in range(n)}))
+
+
+def intersect(coords, first, second):
+    return Line(tuple(coords[first[0]]), tuple(coords[first[1]])).intersect(
+        Line(tuple(coords[second[0]]), tuple(coords[second[1]])))
+
+
+def random_edges(rnd, n, m):
+    edges = []
+    while (len(edges) < m):
+        i, j = rnd.sample(range(n), 2)
+        if ({i, j} not in [{a, b} for a, b in edges]):
+            edges.append((i, j))
+    return edges
+
+
+@pytest.fixture(params=[True, False], ids=["rows", "pairs"])
+def rows(request, monkeypatch):
+    if (not request.param):
+        # no rows, every pair goes through the CrossingCache
+        monkeypatch.setattr(CrossingTable, "MAX_SEGMENTS", 0)
+    return request.param
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_crossing_matrix_matches_line_intersect(rows, seed):
+    rnd = random.Random(seed)
+    coords = random_coords(rnd, 12, 6)
+    table = CrossingTable(coords)
+    edges = random_edges(rnd, len(coords), 12)
+    # the segments go from the first to the second point of each edge
+    expected = np.array([[a != b and intersect(coords, a, b) for b in edges]
+                         for a in edges])
+    assert np.array_equal(table.crossing_matrix(edges), expected)
+    # again, now from the CrossingCache
+    assert np.array_equal(table.crossing_matrix(edges), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_crosses_matches_line_intersect(rows, seed):
+    rnd = random.Random(seed)
+    coords = random_coords(rnd, 12, 6)
+    table = CrossingTable(coords)
+    n = len(coords)
+    edges = random_edges(rnd, n, 8)
+    others = random_edges(rnd, n, 10)
+    # the table holds the segments from the smaller index to the other
+    low = [(min(a), max(a)) for a in edges]
+    expected = [any(intersect(coords, a, (min(b), max(b))) for b in others)
+                for a in low]
+    assert table.crosses(edges, table.mask(others)).tolist() == expected
+    assert table.has_crossing(low) == any(
+        intersect(coords, a, b) for a in low for b in low if a != b)
+
+
+def test_segment_ids(rows):
+    table = CrossingTable(np.arange(14).reshape(7, 2))
+    edges = np.column_stack(np.triu_indices(7, 1))
+    ids = table.segment_ids(edges)
+    assert ids.tolist() == list(range(21))
+    assert np.array_equal(table.segment_ids(edges[:, ::-1]), ids)
+    assert np.array_equal(table.endpoints(ids), edges)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edge_mask_independent_of_direction(seed):
+    rnd = random.Random(seed)
+    coords = random_coords(rnd, 12, 20)
+    table = CrossingTable(coords)
+    order = list(range(len(coords)))
+    rnd.shuffle(order)
+    mask = EdgeMask.from_order(table, order)
+    reverse = EdgeMask.from_order(table, order[::-1])
+    assert mask == reverse
+    assert hash(mask) == hash(reverse)
+    assert len({mask, reverse}) == 1
+    assert mask == EdgeMask.from_edges(
+        table, [(j, i) for i, j in zip(order[:-1], order[1:])])
+    # a table of another object on the same points gives the same set
+    assert mask == EdgeMask.from_order(CrossingTable(coords), order)
+    assert len(mask) == len(coords) - 1
+    assert mask.distance(reverse) == 0
+
+
+def test_edge_mask_differs_for_other_paths():
+    coords = np.array([[0, 0], [1, 3], [2, 1], [4, 4], [5, 0]])
+    table = CrossingTable(coords)
+    first = EdgeMask.from_order(table, [0, 1, 2, 3, 4])
+    second = EdgeMask.from_order(table, [0, 2, 1, 3, 4])
+    assert first != second
+    # (0, 1), (2, 3) are exchanged for (0, 2), (1, 3)
+    assert first.distance(second) == 4
+    assert first != EdgeMask.from_order(CrossingTable(coords + 1),
+                                        [0, 1, 2, 3, 4])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edge_mask_crossings(seed):
+    rnd = random.Random(seed)
+    coords = random_coords(rnd, 10, 20)
+    table = CrossingTable(coords)
+    order = list(range(len(coords)))
+    rnd.shuffle(order)
+    mask = EdgeMask.from_order(table, order)
+    low = [(min(e), max(e)) for e in zip(order[:-1], order[1:])]
+    assert mask.has_crossing() == any(
+        intersect(coords, a, b) for a in low for b in low if a != b)
+    edges = random_edges(rnd, len(coords), 6)
+    assert mask.crosses(edges).tolist() == [
+        any(intersect(coords, (min(a), max(a)), b) for b in low)
+        for a in edges]
+
+
+class Parity:
+    """
+    compute() of a CrossingCache, the result of a key is its parity.
+    """
+
+    def __init__(self):
+        self.computed = []
+
+    def __call__(self, keys):
+        def compute(positions):
+            self.computed.extend(keys[positions].tolist())
+            return keys[positions] % 2 == 1
+        return compute
+
+
+def test_cache_hit_and_miss():
+    cache = CrossingCache(64)
+    keys = np.arange(20, dtype=np.int64)
+    parity = Parity()
+    assert cache.lookup(keys, parity(keys)).tolist() == (keys % 2 == 1).tolist()
+    assert sorted(parity.computed) == keys.tolist()
+    assert (cache.hits, cache.misses) == (0, 20)
+    parity.computed = []
+    assert cache.lookup(keys, parity(keys)).tolist() == (keys % 2 == 1).tolist()
+    assert parity.computed == []
+    assert (cache.hits, cache.misses) == (20, 20)
+    assert cache.hit_rate() == 0.5
+
+
+def test_cache_keeps_keys_of_one_set_in_one_call():
+    cache = CrossingCache(64)
+    # keys hashed to the same set, as many as the set has entries
+    keys = np.arange(10000, dtype=np.int64)
+    sets = cache._sets(keys)
+    keys = keys[sets == sets[0]][:CrossingCache.WAYS]
+    keys = np.concatenate((keys, keys[:1]))
+    parity = Parity()
+    cache.lookup(keys, parity(keys))
+    assert len(cache) == CrossingCache.WAYS
+    parity.computed = []
+    assert cache.lookup(keys, parity(keys)).tolist() == (keys % 2 == 1).tolist()
+    assert parity.computed == []
+
+
+def test_cache_eviction():
+    cache = CrossingCache(16)
+    parity = Parity()
+    keys = np.arange(1000, dtype=np.int64)
+    for start in range(0, 1000, 7):
+        part = keys[start:start + 7]
+        assert cache.lookup(part, parity(part)).tolist() == \
+            (part % 2 == 1).tolist()
+    assert len(cache) == cache.capacity() == 16
+    # a key looked up again is kept while new keys come in
+    kept = keys[-1:]
+    for start in range(2000, 2040, 2):
+        cache.lookup(kept, parity(kept))
+        part = np.arange(start, start + 2, dtype=np.int64)
+        cache.lookup(part, parity(part))
+    parity.computed = []
+    cache.lookup(kept, parity(kept))
+    assert parity.computed == []
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+import pytest
+
+from GraphClass import Path
+from GraphClass import PointSet
+
+
+def random_path(rnd, n, size):
+    """
+    A Path through random points of a small grid, in random order, so
+    that collinear points and crossings occur.
+    """
+    coords = np.array(sorted({(rnd.randrange(size), rnd.randrange(size))
+                              for _ in range(n)}))
+    order = list(range(len(coords)))
+    rnd.shuffle(order)
+    return Path.from_order(order, PointSet(coords))
+
+
+def flipped(path, remove, add):
+    clone = path.clone()
+    nodes = clone.getNodes()
+    index = {id(node): i for i, node in enumerate(path.getNodes())}
+    clone.disconnect(nodes[index[id(remove[0])]], nodes[index[id(remove[1])]])
+    clone.connect(nodes[index[id(add[0])]], nodes[index[id(add[1])]])
+    return clone
+
+
+def flips(path, rnd, count):
+    nodes = path.getNodes()
+    order = path.path_node_order()
+    for _ in range(count):
+        i = rnd.randrange(len(order) - 1)
+        remove = (order[i], order[i + 1])
+        if (rnd.random() < 0.5):
+            # shares an end with the removed edge
+            add = (order[i], rnd.choice(nodes))
+        else:
+            add = tuple(rnd.sample(nodes, 2))
+        if (add[0] is add[1] or (path.is_connected(*add)
+                                 and set(add) != set(remove))):
+            continue
+        yield remove, add
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_evaluate_flip_matches_flip(seed):
+    rnd = random.Random(seed)
+    for _ in range(10):
+        path = random_path(rnd, 8, 5)
+        for remove, add in flips(path, rnd, 20):
+            evaluation = path.evaluate_flip(remove, add)
+            after = flipped(path, remove, add)
+            assert evaluation.spanning == after.is_spanning_path()
+            assert evaluation.crossing == after.has_crossing()
+            assert bool(evaluation) == (after.is_spanning_path()
+                                        and not after.has_crossing())
+
+
+def test_evaluate_flip_collinear():
+    # 0 - 1 - 2 on a line, the added edge (0, 2) runs through point 1
+    coords = np.array([[0, 0], [2, 0], [4, 0], [2, 3]])
+    path = Path.from_order([3, 0, 1, 2], PointSet(coords))
+    nodes = path.getNodes()
+    for remove, add in [((nodes[1], nodes[2]), (nodes[0], nodes[2])),
+                        ((nodes[3], nodes[0]), (nodes[3], nodes[2])),
+                        ((nodes[0], nodes[1]), (nodes[3], nodes[1]))]:
+        evaluation = path.evaluate_flip(remove, add)
+        after = flipped(path, remove, add)
+        assert evaluation.spanning == after.is_spanning_path()
+        assert evaluation.crossing == after.has_crossing()
+
+
+def test_evaluate_flip_leaves_path():
+    rnd = random.Random(0)
+    path = random_path(rnd, 8, 5)
+    edges = path.edge_array().copy()
+    for remove, add in flips(path, rnd, 20):
+        path.evaluate_flip(remove, add)
+    assert np.array_equal(path.edge_array(), edges)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_reconnections(seed):
+    rnd = random.Random(seed)
+    path = random_path(rnd, 8, 6)
+    nodes = path.getNodes()
+    order = path.path_node_order()
+    for i in range(len(order) - 1):
+        remove = (order[i], order[i + 1])
+        pairs = path.reconnections(*remove)
+        # every pair makes a spanning path again, and only these do
+        spanning = [(a, b) for a in nodes for b in nodes
+                    if a is not b and (not path.is_connected(a, b)
+                                       or {a, b} == set(remove))
+                    and {a, b} != set(remove)
+                    and flipped(path, remove, (a, b)).is_spanning_path()]
+        assert {frozenset(pair) for pair in pairs} \
+            == {frozenset(pair) for pair in spanning}
+    assert path.reconnections(order[0], order[2]) == []
@@ -0,0 +1,181 @@
+import random
+
+import numpy as np
+import pytest
+
+from GraphClass import Node
+from GraphClass import Path
+from GraphClass import PointSet
+from History import EditStep
+from History import History
+
+
+def state(graph):
+    """
+    What a position of the history has to give back: edges and ends,
+    by coordinates, since a replaced graph has other Node objects.
+    """
+    edges = {frozenset((a.get_coord(), b.get_coord()))
+             for a in graph.getNodes() for b in graph.getNodes()
+             if a is not b and graph.is_connected(a, b)}
+    ends = (graph.getStart() and graph.getStart().get_coord(),
+            graph.getEnd() and graph.getEnd().get_coord())
+    return edges, ends
+
+
+class Session:
+    """
+    Does what the Canvas does around the History.
+    """
+
+    def __init__(self, graph):
+        self.history = History()
+        self.graph = graph
+        self.main_mode = 0
+        self.sub_mode = 0
+        # graph object, state and modes at every position
+        self.recorded = []
+
+    def step(self, edit, main_mode, sub_mode):
+        self.history.begin(self.graph, self.main_mode, self.sub_mode)
+        edit(self)
+        self.main_mode, self.sub_mode = main_mode, sub_mode
+
+    def record(self):
+        # the recorded position is the one after closing the open step
+        self.recorded.append((self.graph, state(self.graph),
+                              self.main_mode, self.sub_mode))
+
+    def seek(self, position):
+        self.graph, self.main_mode, self.sub_mode = self.history.seek(
+            self.graph, self.main_mode, self.sub_mode, position)
+
+    def check(self, position):
+        graph, expected, main_mode, sub_mode = self.recorded[position]
+        assert self.history.position() == position
+        assert self.graph is graph
+        assert state(self.graph) == expected
+        assert (self.main_mode, self.sub_mode) == (main_mode, sub_mode)
+
+
+def flip(rnd):
+    def edit(session):
+        graph = session.graph
+        order = graph.path_node_order()
+        i = rnd.randrange(len(order) - 1)
+        graph.disconnect(order[i], order[i + 1])
+        graph.connect(order[i], order[-1])
+        graph.setEnds(order[0], order[i + 1])
+    return edit
+
+
+def replace(session):
+    coords = session.graph.coord_array()[::-1]
+    graph = Path.from_order(list(range(len(coords))), PointSet(coords))
+    old_graph = session.graph
+    session.graph = graph
+    session.history.replace(old_graph, graph)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(History, "CHECKPOINT_INTERVAL", 4)
+    rnd = random.Random(0)
+    coords = np.array([[i, (i * 7) % 11] for i in range(9)])
+    session = Session(Path.from_order(list(range(9)), PointSet(coords)))
+    # position 0 is the graph before any step
+    session.record()
+    for k in range(15):
+        if (k == 6):
+            session.step(replace, 1, 0)
+        else:
+            session.step(flip(rnd), k % 2, k % 3)
+        # seeking closes the open step, like the next step would
+        session.seek(session.history.position())
+        session.record()
+    return session
+
+
+def test_steps_and_checkpoints(session):
+    assert len(session.history) == 15
+    assert session.history.position() == 15
+    assert len(session.history._checkpoints) > 1
+
+
+def test_seek_backwards_and_forwards(session):
+    for position in list(range(15, -1, -1)) + list(range(16)):
+        session.seek(position)
+        session.check(position)
+
+
+def test_seek_random(session):
+    rnd = random.Random(1)
+    for _ in range(100):
+        position = rnd.randint(0, 15)
+        session.seek(position)
+        session.check(position)
+
+
+def test_seek_clamps(session):
+    session.seek(-3)
+    session.check(0)
+    session.seek(99)
+    session.check(15)
+
+
+def test_undo_redo(session):
+    for position in range(14, -1, -1):
+        session.graph, session.main_mode, session.sub_mode = \
+            session.history.undo(session.graph, session.main_mode,
+                                 session.sub_mode)
+        session.check(position)
+    assert not session.history.can_undo()
+    for position in range(1, 16):
+        session.graph, session.main_mode, session.sub_mode = \
+            session.history.redo(session.graph, session.main_mode,
+                                 session.sub_mode)
+        session.check(position)
+    assert not session.history.can_redo()
+
+
+def test_new_step_discards_redo(session):
+    session.seek(9)
+    session.step(flip(random.Random(2)), 0, 0)
+    session.seek(session.history.position())
+    assert len(session.history) == 10
+    session.recorded[10:] = []
+    session.record()
+    for position in [3, 10, 0, 7]:
+        session.seek(position)
+        session.check(position)
+
+
+def test_record_cancels_trial_edits():
+    a, b, c = Node("a", (0, 0)), Node("b", (1, 0)), Node("c", (0, 1))
+    step = EditStep(0, 0, a, b)
+    step.record(("connect", a, b))
+    step.record(("disconnect", b, a))
+    assert step.ops == []
+    step.record(("connect", a, b))
+    step.record(("connect", b, c))
+    step.record(("disconnect", a, b))
+    assert step.ops == [("connect", b, c)]
+    # a node operation in between keeps both
+    step.record(("add_node", c, 2))
+    step.record(("disconnect", b, c))
+    assert step.ops[-1] == ("disconnect", b, c)
+    step.after = step.before
+    assert not step.is_empty()
+
+
+def test_empty_step_is_dropped():
+    coords = np.array([[0, 0], [1, 2], [3, 1]])
+    graph = Path.from_order([0, 1, 2], PointSet(coords))
+    history = History()
+    history.begin(graph, 0, 0)
+    nodes = graph.getNodes()
+    graph.disconnect(nodes[0], nodes[1])
+    graph.connect(nodes[0], nodes[1])
+    history.begin(graph, 0, 0)
+    history.seek(graph, 0, 0, 1)
+    assert len(history) == 0
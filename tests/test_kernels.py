@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+import Kernels
+
+
+@pytest.fixture
+def rnd():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def coords(rnd):
+    # small coordinates, so that collinear points and shared end points
+    # occur
+    coords = np.unique(rnd.integers(0, 40, (80, 2)), axis=0)
+    return coords[rnd.permutation(len(coords))]
+
+
+@pytest.fixture
+def segments(rnd, coords):
+    return coords[rnd.integers(0, len(coords), (120, 2))].reshape(-1, 4)
+
+
+def test_orientation_loop_matches_numpy(rnd, coords):
+    triples = rnd.integers(0, len(coords), (500, 3))
+    assert np.array_equal(Kernels._orientation_loop(coords, triples),
+                          Kernels._orientation_numpy(coords, triples))
+
+
+def test_orientations_match_reference(rnd, coords):
+    triples = rnd.integers(0, len(coords), (500, 3))
+    assert np.array_equal(Kernels.orientations(coords, triples),
+                          Kernels._orientation_numpy(coords, triples))
+
+
+def test_orientations_of_large_coordinates():
+    big = Kernels.SAFE_COORD * 4
+    coords = np.array([[0, 0], [big, 1], [2 * big, 2], [big, big]],
+                      dtype=np.int64)
+    triples = np.array([[0, 1, 2], [0, 1, 3], [0, 3, 1]])
+    assert Kernels.orientations(coords, triples).tolist() == [0, 1, -1]
+
+
+def test_cross_any_loop_matches_numpy(segments):
+    assert np.array_equal(
+        Kernels._cross_any_loop(segments, segments[:40]),
+        Kernels._cross_any_numpy(segments, segments[:40]))
+
+
+def test_cross_any_matches_reference(segments):
+    assert np.array_equal(
+        Kernels.cross_any(segments, segments[:40]),
+        Kernels.segments_intersect(segments, segments[:40], reduce=True))
+
+
+def test_segment_pairs_match_all_pairs(segments):
+    first, second = segments[:40], segments[40:80]
+    assert np.array_equal(
+        Kernels.segment_pairs_intersect(first, second),
+        np.diagonal(Kernels.segments_intersect(first, second)))
+
+
+def test_segments_intersect_chunks(segments):
+    assert np.array_equal(
+        Kernels.segments_intersect(segments, segments, chunk=7),
+        Kernels.segments_intersect(segments, segments))
+
+
+def test_segments_sharing_an_end_do_not_intersect():
+    first = np.array([[0, 0, 10, 10]])
+    second = np.array([[10, 10, 20, 0], [0, 10, 10, 0]])
+    assert Kernels.segments_intersect(first, second).tolist() == [[False,
+                                                                   True]]
+
+
+def test_convex_hull_in_general_position(rnd):
+    points = rnd.integers(0, 1 << 20, (200, 2))
+    hull = Kernels.convex_hull(points)
+    cycle = np.column_stack((hull, np.roll(hull, -1), np.roll(hull, -2)))
+    inside = np.array([[a, b, p] for a, b in zip(hull, np.roll(hull, -1))
+                       for p in range(len(points))])
+    turns = Kernels._orientation_numpy(points, cycle)
+    sides = Kernels._orientation_numpy(points, inside)
+    assert np.all(turns > 0) or np.all(turns < 0)
+    assert np.all(sides >= 0) or np.all(sides <= 0)
+
+
+def test_convex_hull_finds_extreme_points(rnd):
+    # a point is a vertex of the hull if all other points lie on one
+    # side of a line through it and another point, in general position
+    points = rnd.integers(0, 1 << 20, (40, 2))
+    n = len(points)
+    extreme = set()
+    for p in range(n):
+        for q in range(n):
+            if (p == q):
+                continue
+            others = [r for r in range(n) if r not in (p, q)]
+            sides = Kernels._orientation_numpy(
+                points, np.array([[p, q, r] for r in others]))
+            if (np.all(sides > 0) or np.all(sides < 0)):
+                extreme.add(p)
+    hull = Kernels.convex_hull(points)
+    assert len(hull) == len(extreme)
+    assert set(hull.tolist()) == extreme
+
+
+def test_path_walk_follows_path(rnd, coords):
+    order = rnd.permutation(len(coords))
+    edges = np.column_stack((order[:-1], order[1:]))
+    assert np.array_equal(Kernels.path_walk(edges, len(coords), order[0]),
+                          order)
+    assert np.array_equal(Kernels.path_walk(edges, len(coords), order[-1]),
+                          order[::-1])
+
+
+@pytest.mark.skipif(Kernels.numba is None, reason="Numba is not installed")
+def test_compiled_kernels_match_loops(rnd, coords, segments):
+    triples = rnd.integers(0, len(coords), (500, 3))
+    assert np.array_equal(Kernels._orientation_kernel(coords, triples),
+                          Kernels._orientation_loop(coords, triples))
+    assert np.array_equal(
+        Kernels._cross_any_kernel(segments, segments[:40]),
+        Kernels._cross_any_loop(segments, segments[:40]))
+    # the scan keeps the quirks of Graph.compute_ch() for ties, the
+    # compiled one must keep them too
+    order = np.arange(len(coords), dtype=np.int64)
+    assert np.array_equal(Kernels._hull_kernel(coords, order),
+                          Kernels._hull_scan(coords, order))
+    order = rnd.permutation(len(coords)).astype(np.int64)
+    edges = np.column_stack((order[:-1], order[1:]))
+    table = Kernels.neighbour_table(edges, len(coords))
+    assert np.array_equal(Kernels._walk_kernel(table, order[0]),
+                          Kernels._walk_loop(table, order[0]))
+
+
+def test_diagnostics_reports_backend():
+    report = Kernels.diagnostics().splitlines()
+    assert report[0] == "geometry kernels: " + Kernels.BACKEND
+    assert len(report) == 5
@@ -0,0 +1,95 @@
+import random
+
+import numpy as np
+import pytest
+
+from GraphClass import OrderType
+from Kernels import convex_hull
+
+
+def random_coords(rnd, n):
+    coords = np.array(sorted({(rnd.randrange(1000), rnd.randrange(1000))
+                              for _ in range(n)}))
+    return coords[rnd.sample(range(len(coords)), len(coords))]
+
+
+def check_labels(coords, other):
+    """
+    The labels of both signatures name points with the same orientations.
+    """
+    _, perm = OrderType(coords).signature()
+    _, other_perm = OrderType(other).signature()
+    first = OrderType(coords[perm])
+    second = OrderType(other[other_perm])
+    n = len(coords)
+    triples = np.array([[a, b, c] for a in range(n) for b in range(n)
+                        for c in range(n)])
+    orientation = first.orientation(triples[:, 0], triples[:, 1],
+                                    triples[:, 2])
+    other_orientation = second.orientation(triples[:, 0], triples[:, 1],
+                                           triples[:, 2])
+    # a mirror image has all orientations reversed
+    assert np.array_equal(orientation, other_orientation) \
+        or np.array_equal(orientation, -other_orientation)
+
+
+TRANSFORMS = {
+    "translate": lambda c: c + [123, -45],
+    "scale": lambda c: c * 3,
+    "translate and scale": lambda c: c * 2 + 7,
+    "mirror x": lambda c: c * [-1, 1],
+    "mirror y": lambda c: c * [1, -1],
+    "rotate": lambda c: c[:, ::-1] * [-1, 1],
+}
+
+
+@pytest.mark.parametrize("name", TRANSFORMS)
+@pytest.mark.parametrize("seed", range(3))
+def test_signature_invariant(name, seed):
+    coords = random_coords(random.Random(seed), 9)
+    other = TRANSFORMS[name](coords)
+    assert OrderType(coords).signature()[0] == OrderType(other).signature()[0]
+    check_labels(coords, other)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_signature_invariant_under_relabeling(seed):
+    rnd = random.Random(seed)
+    coords = random_coords(rnd, 9)
+    relabel = rnd.sample(range(len(coords)), len(coords))
+    other = coords[relabel]
+    assert OrderType(coords).signature()[0] == OrderType(other).signature()[0]
+    check_labels(coords, other)
+
+
+def test_signature_differs_for_other_order_types():
+    # points in convex position and a triangle with points inside
+    convex = np.array([[0, 0], [10, 0], [14, 8], [5, 14], [-4, 8]])
+    inside = np.array([[0, 0], [20, 0], [10, 20], [9, 5], [11, 8]])
+    # convex position with one collinear triple on the hull
+    collinear = np.array([[0, 0], [5, 0], [10, 0], [12, 8], [-2, 8]])
+    keys = {OrderType(c).signature()[0] for c in [convex, inside, collinear]}
+    assert len(keys) == 3
+
+
+def test_signature_differs_for_random_sets():
+    rnd = random.Random(0)
+    sets = [random_coords(rnd, 7) for _ in range(30)]
+    compared = 0
+    for first in sets:
+        for second in sets:
+            # a different number of points on the hull, a different
+            # order type
+            if (len(convex_hull(first)) != len(convex_hull(second))):
+                compared += 1
+                assert OrderType(first).signature()[0] \
+                    != OrderType(second).signature()[0]
+    assert compared > 0
+
+
+def test_signature_of_small_sets():
+    assert OrderType(np.zeros((0, 2))).signature() is not None
+    one = OrderType(np.array([[3, 4]])).signature()
+    assert one[1].tolist() == [0]
+    assert OrderType(np.array([[0, 0], [1, 1]])).signature()[0] \
+        == OrderType(np.array([[5, 5], [9, 2]])).signature()[0]
@@ -0,0 +1,133 @@
+import random
+
+import numpy as np
+import pytest
+
+from GraphClass import CrossingTable
+from Kernels import segments_intersect
+from Planner import FlipPlanner
+
+
+def convex_points(n):
+    # points on a parabola are in convex position, in the order of x
+    return np.array([[i, i * i] for i in range(n)])
+
+
+def random_plane_path(n, rnd, start=None):
+    """
+    A random plane spanning path on points in convex position: every
+    next vertex is a neighbour of the visited ones on the hull.
+    """
+    first = rnd.randrange(n) if start is None else start
+    order = [first]
+    low, high = first, first
+    while (len(order) < n):
+        if (rnd.random() < 0.5):
+            low = (low - 1) % n
+            order.append(low)
+        else:
+            high = (high + 1) % n
+            order.append(high)
+    return order
+
+
+def check_flips(coords, order, flips, target):
+    """
+    Carry out the flips on the edges of the path and check that every
+    path in between is plane and spanning and the last one is target.
+    """
+    n = len(coords)
+    edges = {frozenset(e) for e in zip(order[:-1], order[1:])}
+    for remove, add in flips:
+        assert frozenset(remove) in edges
+        edges.remove(frozenset(remove))
+        assert frozenset(add) not in edges
+        edges.add(frozenset(add))
+        pairs = np.array([sorted(e) for e in edges])
+        degree = np.bincount(pairs.ravel(), minlength=n)
+        assert len(edges) == n - 1 and degree.max() <= 2
+        # n - 1 edges without a cycle: connected if the walk sees all
+        neighbours = {i: [] for i in range(n)}
+        for i, j in pairs:
+            neighbours[i].append(j)
+            neighbours[j].append(i)
+        seen, todo = {pairs[0][0]}, [pairs[0][0]]
+        while (todo):
+            for w in neighbours[todo.pop()]:
+                if (w not in seen):
+                    seen.add(w)
+                    todo.append(w)
+        assert len(seen) == n
+        segments = coords[pairs].reshape(-1, 4)
+        assert not np.triu(segments_intersect(segments, segments), 1).any()
+    assert edges == {frozenset(e) for e in zip(target[:-1], target[1:])}
+
+
+@pytest.mark.parametrize("n", [3, 5, 8, 12])
+def test_convex_position_within_bound(n):
+    # the canonical path of points in convex position runs around the
+    # hull, from an end of the path
+    rnd = random.Random(n)
+    coords = convex_points(n)
+    planner = FlipPlanner(CrossingTable(coords))
+    for _ in range(50):
+        order = random_plane_path(n, rnd)
+        start = order[rnd.choice([0, -1])]
+        step = rnd.choice([1, -1])
+        target = [(start + step * k) % n for k in range(n)]
+        flips = planner.plan(order, target)
+        assert flips is not None
+        assert len(flips) <= n - 2
+        check_flips(coords, order, flips, target)
+
+
+@pytest.mark.parametrize("n", [5, 8])
+def test_convex_position_any_target(n):
+    rnd = random.Random(n)
+    coords = convex_points(n)
+    planner = FlipPlanner(CrossingTable(coords))
+    for _ in range(20):
+        order = random_plane_path(n, rnd)
+        target = random_plane_path(n, rnd)
+        flips = planner.plan(order, target)
+        assert flips is not None
+        check_flips(coords, order, flips, target)
+
+
+def test_general_position_keeps_path_plane():
+    rnd = random.Random(0)
+    for _ in range(20):
+        coords = np.array(sorted({(rnd.randrange(50), rnd.randrange(50))
+                                  for _ in range(9)}))
+        n = len(coords)
+        planner = FlipPlanner(CrossingTable(coords))
+        # the x-sorted path is plane, so is the one sorted by y
+        target = sorted(range(n), key=lambda i: (coords[i][1], coords[i][0]))
+        flips = planner.plan(list(range(n)), target)
+        if (flips is not None):
+            check_flips(coords, list(range(n)), flips, target)
+
+
+def test_budget_bounds_the_searches(monkeypatch):
+    rnd = random.Random(1)
+    used = []
+    for _ in range(20):
+        coords = np.array(sorted({(rnd.randrange(50), rnd.randrange(50))
+                                  for _ in range(9)}))
+        n = len(coords)
+        target = sorted(range(n), key=lambda i: (coords[i][1], coords[i][0]))
+        monkeypatch.setattr(FlipPlanner, "PLAN_LIMIT", 5)
+        planner = FlipPlanner(CrossingTable(coords))
+        flips = planner.plan(list(range(n)), target)
+        assert 0 <= planner._budget <= 5
+        used.append(5 - planner._budget)
+        if (flips is not None):
+            check_flips(coords, list(range(n)), flips, target)
+    # some of the plans needed the fallback search
+    assert max(used) > 0
+
+
+def test_different_points():
+    planner = FlipPlanner(CrossingTable(convex_points(4)))
+    with pytest.raises(ValueError):
+        planner.plan([0, 1, 2, 3], [0, 1, 2, 2])
@@ -0,0 +1,148 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from GraphClass import CrossingTable
+from GraphClass import Path
+from GraphClass import PointSet
+from Planner import FlipPlanner
+from ResultCache import ResultCache
+from ResultCache import compact
+
+# points in general position, the x-sorted path through them is plane
+COORDS = np.array([[0, 0], [10, 40], [20, 5], [35, 30], [50, 10], [60, 45]])
+ORDER = [0, 1, 2, 3, 4, 5]
+# a flip of the path: remove (2, 3), add (2, 5), then 3 ... 5 is reversed
+OPS = [("disconnect", 2, 3), ("connect", 2, 5)]
+
+
+def path(coords, order):
+    return Path.from_order(order, PointSet(coords))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(directory=str(tmp_path))
+
+
+def test_round_trip(cache, tmp_path):
+    key = cache.key("solve", path(COORDS, ORDER))
+    cache.put(key, OPS)
+    assert cache.get(key) == OPS
+    assert len(os.listdir(tmp_path)) == 1
+    # a new cache on the same directory reads the file
+    assert ResultCache(directory=str(tmp_path)).get(key) == OPS
+
+
+def test_round_trip_through_relabeling(cache):
+    # the same points in another order, the ops name the same points
+    relabel = np.array([3, 0, 5, 1, 4, 2])
+    coords = COORDS[relabel]
+    index = {k: i for i, k in enumerate(relabel.tolist())}
+    cache.put(cache.key("solve", path(COORDS, ORDER)), OPS)
+    found = cache.get(cache.key("solve", path(coords, [index[k] for k in ORDER])))
+    assert found is not None
+    assert [(kind, relabel[i], relabel[j]) for kind, i, j in found] \
+        in (OPS, [(kind, j, i) for kind, i, j in OPS])
+
+
+@pytest.mark.parametrize("transform", [lambda c: c + [7, -3],
+                                       lambda c: c * 3,
+                                       lambda c: c * [-1, 1] + [100, 0]])
+def test_hit_for_same_order_type(cache, transform):
+    cache.put(cache.key("solve", path(COORDS, ORDER)), OPS)
+    found = cache.get(cache.key("solve", path(transform(COORDS), ORDER)))
+    assert found is not None
+    assert [(kind, min(i, j), max(i, j)) for kind, i, j in found] == OPS
+
+
+def test_miss_for_other_path_or_mode(cache):
+    cache.put(cache.key("solve", path(COORDS, ORDER)), OPS)
+    assert cache.get(cache.key("solve", path(COORDS, [1, 0, 2, 3, 4, 5]))) \
+        is None
+    assert cache.get(cache.key("wrap", path(COORDS, ORDER))) is None
+
+
+def test_memory_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResultCache, "_file", lambda self, digest: pytest.fail(
+        "memory only cache touched the disk"))
+    cache = ResultCache(directory=None)
+    key = cache.key("solve", path(COORDS, ORDER))
+    assert cache.get(key) is None
+    cache.put(key, OPS)
+    assert cache.get(key) == OPS
+    assert len(cache) == 1
+
+
+def random_walk(coords, rnd, steps):
+    """
+    A random sequence of flips of the x-sorted path, as ops recorded by
+    a FlipRecorder. Now and then a flip is undone, so loops occur.
+    """
+    table = CrossingTable(coords)
+    planner = FlipPlanner(table)
+    order = list(range(len(coords)))
+    ops = []
+    for _ in range(steps):
+        mask = table.mask(np.column_stack((order[:-1], order[1:])))
+        remove, add, new = rnd.choice(planner.moves(order, mask, 0))
+        ops += [("disconnect",) + tuple(remove), ("connect",) + tuple(add)]
+        if (rnd.random() < 0.3):
+            ops += [("disconnect",) + tuple(add), ("connect",) + tuple(remove)]
+        else:
+            order = new
+    return ops
+
+
+def edge_sets(edges, ops):
+    """
+    The edge sets a sequence passes through after every connect.
+    """
+    current = {frozenset(e) for e in edges}
+    sets = []
+    for kind, i, j in ops:
+        if (kind == "connect"):
+            current.add(frozenset((i, j)))
+            sets.append(set(current))
+        else:
+            current.discard(frozenset((i, j)))
+    return sets
+
+
+def check_path(coords, edges):
+    n = len(coords)
+    pairs = np.array([sorted(e) for e in edges])
+    path = Path.from_points(PointSet(coords), pairs)
+    assert len(edges) == n - 1
+    assert path.is_spanning_path()
+    assert not path.has_crossing()
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_compact(seed):
+    rnd = random.Random(seed)
+    coords = np.array(sorted({(rnd.randrange(40), rnd.randrange(40))
+                              for _ in range(9)}))
+    edges = np.column_stack((np.arange(len(coords) - 1),
+                             np.arange(1, len(coords))))
+    ops = random_walk(coords, rnd, 30)
+    compacted = compact(ops, edges)
+    assert len(compacted) <= len(ops)
+    visited = edge_sets(edges, ops)
+    passed = edge_sets(edges, compacted)
+    final = visited[-1] if visited else {frozenset(e) for e in edges}
+    assert (passed[-1] if passed else {frozenset(e) for e in edges}) == final
+    for current in passed:
+        # only edge sets the original sequence went through
+        assert current in visited
+        check_path(coords, current)
+
+
+def test_compact_erases_loops():
+    edges = np.array([[0, 1], [1, 2], [2, 3]])
+    flip = [("disconnect", 2, 3), ("connect", 1, 3)]
+    back = [("disconnect", 1, 3), ("connect", 2, 3)]
+    assert compact(flip + back, edges) == []
+    assert compact(flip + back + flip, edges) == flip